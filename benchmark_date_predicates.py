@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日期过滤写法基准测试
+对比 LIKE 'YYYY-MM-DD%'、DATE(col) = ... 与半开区间三种写法在本地MySQL/MariaDB上的耗时，
+并通过 EXPLAIN 报告是否使用了时间列索引。
+
+注意：会在目标库中重建 bench_Daysales / bench_HT_fenxiao 两张表，请勿指向生产库。
+
+用法:
+    python benchmark_date_predicates.py --rows 500000 --days 90
+    python benchmark_date_predicates.py --time-type varchar   # 时间列为字符串时的表现
+环境变量: BENCH_DB_HOST / BENCH_DB_PORT / BENCH_DB_USER / BENCH_DB_PASSWORD / BENCH_DB_NAME
+"""
+
+import os
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+import pymysql
+
+from report_sql import date_range_predicate
+
+# 基准表：表名 -> 时间字段
+BENCH_TABLES = {
+    'bench_Daysales': '交易时间',
+    'bench_HT_fenxiao': '采购单支付时间',
+}
+
+SHOPS = ['京东自营旗舰店', '天猫官方旗舰店', '拼多多海尔专卖店', '抖音海尔官方旗舰店', '卡萨帝官方旗舰店', '苏宁易购旗舰店']
+PRODUCTS = ['冰箱', '洗衣机', '家用空调', '热水器', '冷柜', '洗碗机']
+STATUSES = ['已完成', '已发货', '已付款', '已取消', '未付款']
+
+
+def connect(args, database=None):
+    return pymysql.connect(
+        host=args.host, port=args.port, user=args.user, password=args.password,
+        database=database, charset='utf8mb4', autocommit=True
+    )
+
+
+def create_tables(conn, time_type):
+    column_type = 'DATETIME' if time_type == 'datetime' else 'VARCHAR(19)'
+    cursor = conn.cursor()
+    for table, time_col in BENCH_TABLES.items():
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                {time_col} {column_type} NOT NULL,
+                店铺 VARCHAR(64),
+                货品名称 VARCHAR(64),
+                规格名称 VARCHAR(128),
+                分摊后总价 DECIMAL(12, 2),
+                实发数量 INT,
+                订单状态 VARCHAR(16),
+                KEY idx_time ({time_col})
+            ) DEFAULT CHARSET=utf8mb4
+        """)
+    cursor.close()
+
+
+def generate_rows(rows, days, end_day):
+    """生成合成订单行：时间均匀分布在最近days天"""
+    rng = random.Random(20250810)
+    start = datetime.combine(end_day - timedelta(days=days - 1), datetime.min.time())
+    span_seconds = days * 86400
+    for _ in range(rows):
+        ts = start + timedelta(seconds=rng.randrange(span_seconds))
+        product = rng.choice(PRODUCTS)
+        yield (
+            ts.strftime('%Y-%m-%d %H:%M:%S'),
+            rng.choice(SHOPS),
+            product,
+            f"海尔{product}{rng.randint(100, 999)}型",
+            round(rng.uniform(299, 12999), 2),
+            rng.randint(1, 3),
+            rng.choice(STATUSES),
+        )
+
+
+def load_rows(conn, rows, days, end_day, batch_size=5000):
+    cursor = conn.cursor()
+    for table, time_col in BENCH_TABLES.items():
+        sql = (
+            f"INSERT INTO {table} ({time_col}, 店铺, 货品名称, 规格名称, 分摊后总价, 实发数量, 订单状态) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s)"
+        )
+        batch = []
+        for row in generate_rows(rows, days, end_day):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+        print(f"📥 {table} 已写入 {rows} 行")
+    cursor.close()
+
+
+def predicates(time_col, day_str):
+    return {
+        'LIKE前缀': f"{time_col} LIKE '{day_str}%'",
+        'DATE()函数': f"DATE({time_col}) = '{day_str}'",
+        '半开区间': date_range_predicate(time_col, day_str),
+    }
+
+
+def explain_key(cursor, sql):
+    """返回 (使用的索引, 预估扫描行数)"""
+    cursor.execute(f"EXPLAIN {sql}")
+    columns = [desc[0] for desc in cursor.description]
+    row = dict(zip(columns, cursor.fetchone()))
+    cursor.fetchall()
+    return row.get('key'), row.get('rows')
+
+
+def time_query(cursor, sql, repeat):
+    timings = []
+    result_rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql)
+        result_rows = len(cursor.fetchall())
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], result_rows
+
+
+def run_benchmark(conn, day_str, repeat):
+    cursor = conn.cursor()
+    results = []
+    for table, time_col in BENCH_TABLES.items():
+        for name, predicate in predicates(time_col, day_str).items():
+            sql = f"SELECT * FROM {table} WHERE {predicate}"
+            key, est_rows = explain_key(cursor, sql)
+            median, result_rows = time_query(cursor, sql, repeat)
+            results.append((table, name, median, result_rows, key, est_rows))
+    cursor.close()
+    return results
+
+
+def print_results(results):
+    print(f"\n{'表':<20}{'写法':<12}{'中位耗时(ms)':>14}{'返回行数':>10}{'预估扫描':>12}  索引")
+    for table, name, median, result_rows, key, est_rows in results:
+        index_flag = f"✅ {key}" if key else "❌ 全表扫描"
+        print(f"{table:<20}{name:<12}{median * 1000:>14.1f}{result_rows:>10}{str(est_rows):>12}  {index_flag}")
+
+    # 同一表内不同写法返回行数必须一致，否则说明改写改变了语义
+    for table in BENCH_TABLES:
+        counts = {r[3] for r in results if r[0] == table}
+        if len(counts) > 1:
+            print(f"⚠️ {table} 不同写法返回行数不一致: {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日期过滤写法基准测试（LIKE / DATE() / 半开区间）')
+    parser.add_argument('--host', default=os.environ.get('BENCH_DB_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('BENCH_DB_PORT', 3306)))
+    parser.add_argument('--user', default=os.environ.get('BENCH_DB_USER', 'root'))
+    parser.add_argument('--password', default=os.environ.get('BENCH_DB_PASSWORD', ''))
+    parser.add_argument('--database', default=os.environ.get('BENCH_DB_NAME', 'report_bench'))
+    parser.add_argument('--rows', type=int, default=200000, help='每张表合成行数')
+    parser.add_argument('--days', type=int, default=90, help='数据覆盖天数')
+    parser.add_argument('--repeat', type=int, default=5, help='每种写法执行次数（取中位数）')
+    parser.add_argument('--time-type', choices=['datetime', 'varchar'], default='datetime', help='时间列类型')
+    parser.add_argument('--skip-load', action='store_true', help='复用已有基准表')
+    args = parser.parse_args()
+
+    end_day = datetime.now().date() - timedelta(days=1)
+    server = connect(args)
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}` DEFAULT CHARSET utf8mb4")
+    server.close()
+
+    conn = connect(args, args.database)
+    try:
+        if not args.skip_load:
+            print(f"🔧 重建基准表（时间列类型: {args.time_type}）")
+            create_tables(conn, args.time_type)
+            load_rows(conn, args.rows, args.days, end_day)
+        results = run_benchmark(conn, end_day.strftime('%Y-%m-%d'), args.repeat)
+        print_results(results)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
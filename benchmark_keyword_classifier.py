@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词分类微基准：逐行 .apply 原函数 vs keyword_classifier 整列分类
+使用合成的Daysales订单，不需要数据库。
+
+用法:
+    python benchmark_keyword_classifier.py --rows 100000 1000000
+"""
+
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+from keyword_classifier import (
+    ONLINE_SHOP, SHOP_CHANNEL, FENXIAO_CATEGORY, FENXIAO_CATEGORY_KEYWORDS, map_unique, normalize_category
+)
+from synthetic_data import generate_daysales
+
+
+# ---- 原写法（摘自整体日报数据.py，仅用于对比） ----
+def legacy_is_online_shop(shop_name):
+    if not isinstance(shop_name, str):
+        return False
+    online_keywords = ['京东', '天猫', '拼多多', '抖音', '卡萨帝', '小红书', '淘宝', '苏宁', '国美']
+    return any(kw in shop_name for kw in online_keywords)
+
+
+def legacy_classify_channel(shop_name):
+    if not isinstance(shop_name, str):
+        return "其他"
+    shop_name = shop_name.strip()
+    if "卡萨帝" in shop_name or "小红书" in shop_name:
+        return "卡萨帝"
+    if shop_name.startswith("京东"):
+        return "京东"
+    if shop_name.startswith("天猫") or "淘宝" in shop_name:
+        return "天猫"
+    if shop_name.startswith("拼多多"):
+        return "拼多多"
+    if shop_name.startswith("抖音"):
+        return "抖音"
+    return "其他"
+
+
+def legacy_normalize_category(name):
+    if pd.isna(name) or name == '':
+        return '其他'
+    name_str = str(name).strip()
+    if any(keyword in name_str for keyword in ['热水器', '采暖', '空气能', '多能源', '电热', '燃热']):
+        return '热水器'
+    return name_str
+
+
+def legacy_categorize(product_name):
+    if not isinstance(product_name, str):
+        return '其他'
+    product_name_lower = product_name.lower()
+    for category, keywords in FENXIAO_CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword in product_name_lower:
+                return category
+    return '其他'
+
+
+def legacy_path(df):
+    online = df[df['店铺'].apply(legacy_is_online_shop)]
+    return pd.DataFrame({
+        '渠道': online['店铺'].apply(legacy_classify_channel),
+        '品类': online['货品名称'].apply(legacy_normalize_category),
+        '分销品类': online['规格名称'].apply(legacy_categorize),
+    })
+
+
+def classifier_path(df):
+    online = df[ONLINE_SHOP.mask(df['店铺'])]
+    return pd.DataFrame({
+        '渠道': SHOP_CHANNEL.classify_series(online['店铺']),
+        '品类': map_unique(online['货品名称'], normalize_category),
+        '分销品类': FENXIAO_CATEGORY.classify_series(online['规格名称']),
+    })
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='关键词分类微基准')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000], help='每月订单行数')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = generate_daysales('2025-07-01', '2025-07-30', rows_per_month=rows)[['店铺', '货品名称', '规格名称']]
+        legacy, legacy_seconds = timed(legacy_path, df)
+        vectorized, vectorized_seconds = timed(classifier_path, df)
+        same = legacy.astype(str).equals(vectorized.astype(str))
+        print(f"📊 {len(df)} 行 / {df['店铺'].nunique()} 个店铺 / {df['规格名称'].nunique()} 个型号: "
+              f"逐行 {legacy_seconds * 1000:.1f} ms, 整列分类 {vectorized_seconds * 1000:.1f} ms, "
+              f"加速 {legacy_seconds / max(vectorized_seconds, 1e-9):.0f}x, 结果一致: {'✅' if same else '❌'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
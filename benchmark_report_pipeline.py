@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报表加载与汇总基准测试（离线，使用合成数据 + SQLite后端）
+对每个规模：生成合成库 -> 冷加载(回源) -> 热加载(分区缓存) -> 清洗/压缩/日汇总 -> 各维度排行汇总
+
+用法:
+    python benchmark_report_pipeline.py --scales 10000 100000
+    python benchmark_report_pipeline.py --scales 1000000 --keep
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+WORK_DIR = tempfile.mkdtemp(prefix='report_bench_')
+# 后端与缓存目录须在导入报表模块之前设置
+os.environ['REPORT_DB_BACKEND'] = 'sqlite'
+os.environ['REPORT_DB_PATH'] = os.path.join(WORK_DIR, 'report_bench.db')
+os.environ['REPORT_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+
+import pandas as pd  # noqa: E402
+
+import report_sync  # noqa: E402
+from report_db import get_connection, get_pool  # noqa: E402
+from report_schema import compact_frame  # noqa: E402
+from daily_rollup import build_rollup  # noqa: E402
+from synthetic_data import build_database  # noqa: E402
+
+START_DATE = '2025-07-01'
+END_DATE = '2025-07-31'
+
+
+class Timer:
+    def __init__(self):
+        self.results = []
+
+    def run(self, name, func):
+        start = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - start
+        self.results.append((name, elapsed))
+        return value
+
+
+def clean(df):
+    """与周报/月报一致的核心清洗：金额数量、刷单备注、订单状态、线上店铺、渠道"""
+    df = df.copy()
+    df['分摊后总价'] = pd.to_numeric(df['分摊后总价'], errors='coerce').fillna(0)
+    df['实发数量'] = pd.to_numeric(df['实发数量'], errors='coerce').fillna(0)
+    df = df[(df['分摊后总价'] > 0) & (df['实发数量'] > 0)]
+    remark = df['客服备注'].astype(str)
+    df = df[~(remark.str.contains('抽纸|纸巾', na=False) | (remark == '不发货'))]
+    df = df[~df['订单状态'].astype(str).str.contains('未付款|已取消', na=False)]
+    online = ['京东', '天猫', '拼多多', '抖音', '卡萨帝', '小红书', '淘宝', '苏宁', '国美']
+    df = df[df['店铺'].astype(str).str.contains('|'.join(online), na=False)]
+    shop = df['店铺'].astype(str)
+    df['渠道'] = '其他'
+    for channel, pattern in [('抖音', '^抖音'), ('拼多多', '^拼多多'), ('天猫', '^天猫|淘宝'), ('京东', '^京东'), ('卡萨帝', '卡萨帝|小红书')]:
+        df.loc[shop.str.contains(pattern, na=False), '渠道'] = channel
+    return df
+
+
+def rankings(df):
+    """各维度排行汇总（品类/渠道/店铺/单品）"""
+    return {
+        dim: df.groupby(dim, observed=True)[['分摊后总价', '实发数量']].sum().sort_values('分摊后总价', ascending=False)
+        for dim in ['货品名称', '渠道', '店铺', '规格名称']
+    }
+
+
+def run_scale(rows_per_month):
+    # 连接池里的连接仍指向上一个规模的库文件，先关闭
+    get_pool().close_all()
+    for path in (os.environ['REPORT_DB_PATH'], report_sync.CATALOG_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(os.environ['REPORT_CACHE_DIR'], ignore_errors=True)
+    report_sync._verified_days.clear()
+
+    timer = Timer()
+    timer.run('生成合成库', lambda: build_database(os.environ['REPORT_DB_PATH'], START_DATE, END_DATE, rows_per_month))
+    df = timer.run('冷加载(回源)', lambda: report_sync.load_daysales(START_DATE, END_DATE, connect=get_connection))
+    report_sync._verified_days.clear()
+    timer.run('热加载(水位线+分区)', lambda: report_sync.load_daysales(START_DATE, END_DATE, connect=get_connection))
+    df_clean = timer.run('清洗', lambda: clean(df))
+    df_compact = timer.run('压缩dtype', lambda: compact_frame(df_clean))
+    rollup = timer.run('日汇总', lambda: build_rollup(df_compact))
+    timer.run('排行汇总(明细)', lambda: rankings(df_compact))
+    timer.run('排行汇总(日汇总)', lambda: rankings(rollup))
+
+    print(f"\n📊 规模: 每月 {rows_per_month} 行（明细 {len(df)} 行，清洗后 {len(df_clean)} 行，日汇总 {len(rollup)} 行）")
+    for name, elapsed in timer.results:
+        print(f"   {name:<16}{elapsed * 1000:>10.1f} ms")
+    return timer.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报表加载与汇总离线基准测试')
+    parser.add_argument('--scales', type=int, nargs='+', default=[10000, 100000], help='每月行数')
+    parser.add_argument('--keep', action='store_true', help=f'保留临时目录 {WORK_DIR}')
+    args = parser.parse_args()
+    try:
+        for scale in args.scales:
+            run_scale(scale)
+    finally:
+        if args.keep:
+            print(f"📁 基准数据保留在: {WORK_DIR}")
+        else:
+            shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报表渲染微基准：html += f'...' 逐段拼接 vs report_template 预编译模板 + 列表缓冲
+使用合成的一个月订单（对比期为上一个月），不需要数据库。
+- Part 4 单品对比文本：报表脚本在模块顶层逐行 +=（全局变量不能原地扩展，每次复制整段文本）
+- 店铺单品明细HTML：生成函数内逐行 +=（局部变量，CPython 可原地扩展）
+
+用法:
+    python benchmark_report_render.py --rows 100000 --variants 1 20 100
+"""
+
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from period_compare import calculate_ratio, compare_periods
+from report_template import Template, HtmlWriter, change_background, LIST_OPEN, LIST_CLOSE
+from synthetic_data import generate_daysales
+
+AMOUNT, QTY, SHOP, MODEL = '分摊后总价', '实发数量', '店铺', '规格名称'
+
+# 与整体日报数据.py 中的模板相同
+PRODUCT_COMPARE_LINE = Template('🔸 {product}：本期¥{amount:,}（{qty}件），对比期¥{prev_amount:,}（{prev_qty}件）\n', 'PRODUCT_COMPARE_LINE')
+COMPARE_ROW = Template('<li style="margin-bottom: 5px; {bg}">{label}<br>本期: ¥{amount:,}（{qty}件），对比期: ¥{prev_amount:,}（{prev_qty}件），环比 {ratio}', 'COMPARE_ROW')
+
+
+def build_rows(rows_per_month, variants):
+    """(店铺, 单品, 本期金额, 本期数量, 对比期金额, 对比期数量)，variants 把每个型号拆成多个SKU模拟真实的单品数"""
+    frames = []
+    for seed, (start, end) in enumerate((('2025-07-01', '2025-07-31'), ('2025-06-01', '2025-06-30'))):
+        df = generate_daysales(start, end, rows_per_month=rows_per_month, seed=20250801 + seed)
+        sku = np.random.default_rng(seed).integers(0, variants, len(df))
+        df[MODEL] = df[MODEL].astype(str) + '-' + pd.Series(sku, index=df.index).astype(str)
+        frames.append(df.groupby([SHOP, MODEL])[[AMOUNT, QTY]].sum().reset_index())
+    current, previous = frames
+    current['key'] = current[SHOP] + '|' + current[MODEL]
+    previous['key'] = previous[SHOP] + '|' + previous[MODEL]
+    merged = compare_periods(current, previous, 'key', AMOUNT, QTY, how='outer')
+    shop_model = merged['key'].str.split('|', n=1, expand=True)
+    return list(zip(shop_model[0], shop_model[1], merged[AMOUNT].astype(int), merged[QTY].astype(int),
+                    merged['prev_amount'], merged['prev_qty']))
+
+
+# ---- 原写法（摘自整体日报数据.py，仅用于对比） ----
+def legacy_part4(rows):
+    # 报表脚本的 Part 4 在模块顶层执行，part4 是全局变量
+    global part4
+    part4 = "🎯 【店铺核心产品分析】\n"
+    last_shop = None
+    for shop, product, cur_amount, cur_qty, prev_amount, prev_qty in rows:
+        if shop != last_shop:
+            part4 += f"\n🏪 【{shop}】单品对比\n"
+            last_shop = shop
+        part4 += f"🔸 {product}：本期¥{cur_amount:,}（{cur_qty}件），对比期¥{prev_amount:,}（{prev_qty}件）\n"
+    return part4
+
+
+def legacy_shop_products(rows):
+    html = ''
+    last_shop = None
+    for shop, product, cur_amount, cur_qty, prev_amount, prev_qty in rows:
+        if shop != last_shop:
+            html += ('</ul></details>' if last_shop is not None else '') + f'<details><summary>{shop}</summary><ul style="margin-left: 20px; padding-left: 10px;">'
+            last_shop = shop
+        if cur_qty > prev_qty:
+            bg = 'background: #f0fff0;'
+        elif cur_qty < prev_qty:
+            bg = 'background: #fff0f0;'
+        else:
+            bg = ''
+        html += f'<li style="margin-bottom: 5px; {bg}">🔸 {product}<br>本期: ¥{cur_amount:,}（{cur_qty}件），对比期: ¥{prev_amount:,}（{prev_qty}件），环比 {calculate_ratio(cur_qty, prev_qty)}'
+        html += '</li>'
+    return html + ('</ul></details>' if last_shop is not None else '')
+
+
+# ---- 模板写法 ----
+def template_part4(rows):
+    buffer = HtmlWriter()
+    buffer.write("🎯 【店铺核心产品分析】\n")
+    last_shop = None
+    for shop, product, cur_amount, cur_qty, prev_amount, prev_qty in rows:
+        if shop != last_shop:
+            buffer.write(f"\n🏪 【{shop}】单品对比\n")
+            last_shop = shop
+        buffer.render(PRODUCT_COMPARE_LINE, product=product, amount=cur_amount, qty=cur_qty, prev_amount=prev_amount, prev_qty=prev_qty)
+    return buffer.getvalue()
+
+
+def template_shop_products(rows):
+    html = HtmlWriter()
+    last_shop = None
+    for shop, product, cur_amount, cur_qty, prev_amount, prev_qty in rows:
+        if shop != last_shop:
+            if last_shop is not None:
+                html.write(LIST_CLOSE + '</details>')
+            html.write(f'<details><summary>{shop}</summary>{LIST_OPEN}')
+            last_shop = shop
+        html.render(COMPARE_ROW, bg=change_background(cur_qty, prev_qty), label=f'🔸 {product}', amount=cur_amount, qty=cur_qty,
+                    prev_amount=prev_amount, prev_qty=prev_qty, ratio=calculate_ratio(cur_qty, prev_qty))
+        html.write('</li>')
+    if last_shop is not None:
+        html.write(LIST_CLOSE + '</details>')
+    return html.getvalue()
+
+
+def timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报表渲染微基准')
+    parser.add_argument('--rows', type=int, default=100000, help='每月订单行数')
+    parser.add_argument('--variants', type=int, nargs='+', default=[1, 20, 100], help='每个型号拆成的SKU数')
+    args = parser.parse_args()
+
+    for variants in args.variants:
+        rows = build_rows(args.rows, variants)
+        print(f"📊 {args.rows} 行/月, 店铺×单品 {len(rows)} 行")
+        for name, legacy, compiled in (('Part 4 单品对比文本（模块顶层）', legacy_part4, template_part4),
+                                       ('店铺单品明细HTML（函数内）', legacy_shop_products, template_shop_products)):
+            old, old_seconds = timed(legacy, rows)
+            new, new_seconds = timed(compiled, rows)
+            print(f"   {name}: 拼接 {old_seconds * 1000:.1f} ms, 模板 {new_seconds * 1000:.1f} ms, "
+                  f"{len(new) / 1024:.0f} KB, 加速 {old_seconds / max(new_seconds, 1e-9):.1f}x, "
+                  f"结果一致: {'✅' if old == new else '❌'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+刷单/虚拟订单剔除规则
+- 规则只在这里声明一次：字段、匹配方式（包含/等于）、关键词
+- 对整列按去重值计算布尔掩码，不再逐行 apply(axis=1)
+- 同一规则集可生成 pandas 掩码，也可生成 SQL WHERE 条件（库存分析的销量查询）
+- 每次过滤输出各规则命中行数，便于核对各报表剔除口径
+"""
+
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# fields: 依次检查的字段（不存在的字段跳过）；op: 'contains' / 'equals'
+# strip: 比较前去掉首尾空格；ignore_case: 包含匹配时忽略大小写
+ExclusionRule = namedtuple(
+    'ExclusionRule', ['name', 'fields', 'op', 'keywords', 'strip', 'ignore_case'], defaults=(False, False)
+)
+
+OPS = ('contains', 'equals')
+
+
+def _unique_mask(series, test):
+    """对去重后的非空字符串计算 test，再广播回每一行；空值为False"""
+    codes, uniques = pd.factorize(series)
+    flags = np.zeros(len(uniques) + 1, dtype=bool)   # 最后一位对应空值（编码-1）
+    for i, value in enumerate(uniques):
+        flags[i] = test(str(value))
+    return flags[codes]
+
+
+class ExclusionRuleSet:
+    """一组剔除规则，任一规则命中即剔除"""
+
+    def __init__(self, name, rules):
+        for rule in rules:
+            if rule.op not in OPS:
+                raise ValueError(f"不支持的匹配方式: {rule.op}")
+        self.name = name
+        self.rules = list(rules)
+
+    @staticmethod
+    def _test(rule):
+        if rule.op == 'contains':
+            flags = re.IGNORECASE if rule.ignore_case else 0
+            pattern = re.compile('|'.join(re.escape(kw) for kw in rule.keywords), flags)
+            if rule.strip:
+                return lambda text: pattern.search(text.strip()) is not None
+            return lambda text: pattern.search(text) is not None
+        keywords = frozenset(rule.keywords)
+        if rule.strip:
+            return lambda text: text.strip() in keywords
+        return lambda text: text in keywords
+
+    def evaluate(self, df):
+        """返回 (剔除掩码, {规则名: 命中行数})；规则之间可能重叠"""
+        mask = np.zeros(len(df), dtype=bool)
+        hits = {}
+        for rule in self.rules:
+            test = self._test(rule)
+            rule_mask = np.zeros(len(df), dtype=bool)
+            for field in rule.fields:
+                if field in df.columns:
+                    rule_mask |= _unique_mask(df[field], test)
+            hits[rule.name] = int(rule_mask.sum())
+            mask |= rule_mask
+        return pd.Series(mask, index=df.index), hits
+
+    def apply(self, df, label='', log=print):
+        """剔除命中的行并输出各规则命中数，返回 (过滤后的df, 剔除行数)"""
+        if df is None or df.empty:
+            return df, 0
+        mask, hits = self.evaluate(df)
+        removed = int(mask.sum())
+        detail = ', '.join(f"{name}: {count}" for name, count in hits.items())
+        log(f"🧹 {label}{self.name}: {len(df)} -> {len(df) - removed}（{detail}）")
+        return df[~mask.to_numpy()], removed
+
+    def sql_predicate(self):
+        """
+        保留条件（未命中任何规则），例如:
+        (客服备注 IS NULL OR (客服备注 NOT LIKE '%抽纸%' AND 客服备注 != '不发货'))
+        """
+        conditions = {}
+        for rule in self.rules:
+            for field in rule.fields:
+                column = f"TRIM({field})" if rule.strip else field
+                for kw in rule.keywords:
+                    literal = kw.replace("'", "''")
+                    if rule.op == 'contains':
+                        condition = f"{column} NOT LIKE '%{literal}%'"
+                    else:
+                        condition = f"{column} != '{literal}'"
+                    conditions.setdefault(field, []).append(condition)
+        return ' AND '.join(
+            f"({field} IS NULL OR ({' AND '.join(parts)}))" for field, parts in conditions.items()
+        )
+
+
+# 整体日报/周报/月报、滞销库存清理、库存分析销量查询：只看客服备注
+REMARK_RULES = ExclusionRuleSet('刷单剔除', [
+    ExclusionRule('客服备注含抽纸/纸巾', ('客服备注',), 'contains', ('抽纸', '纸巾')),
+    ExclusionRule('客服备注为不发货', ('客服备注',), 'equals', ('不发货',)),
+])
+
+# 多事业部日报：备注/留言类字段都检查，关键词范围更宽
+DEPT_BRUSHING_KEYWORDS = ('抽纸', '纸巾', '刷单', '测试', '虚拟')
+DEPT_EXACT_KEYWORDS = ('完全=不发货', '不发货')
+DEPT_ERP_RULES = ExclusionRuleSet('客服备注刷单过滤', [
+    ExclusionRule('备注含刷单关键词', ('客服备注', '买家留言', '备注'), 'contains', DEPT_BRUSHING_KEYWORDS,
+                  ignore_case=True),
+    ExclusionRule('备注为不发货', ('客服备注', '买家留言', '备注'), 'equals', DEPT_EXACT_KEYWORDS, strip=True),
+])
+DEPT_FENXIAO_RULES = ExclusionRuleSet('分销数据刷单过滤', [
+    ExclusionRule('备注含刷单关键词', ('订单备注', '买家留言', '备注'), 'contains', DEPT_BRUSHING_KEYWORDS,
+                  ignore_case=True),
+    ExclusionRule('备注为不发货', ('订单备注', '买家留言', '备注'), 'equals', DEPT_EXACT_KEYWORDS, strip=True),
+])
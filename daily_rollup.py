@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日汇总（rollup）
+- 在刷单/订单状态/线上店铺过滤之后，把订单明细汇总为 (日期, 店铺, 渠道, 品类, 规格名称, 数据来源) 一行
+- 周报/月报的排行、环比、趋势只需要金额和数量之和，直接基于汇总表计算
+- 只在内存中使用，不落盘：
+  * 已关闭日期仍会变化（退款、取消、改价），Daysales 靠 report_sync 的校验值识别，HT_fenxiao 没有水位线
+  * 汇总前的清洗因报表和期间而异（周报上周数据不做订单状态过滤），落盘结果不能跨报表复用
+- 作用范围：汇总之后的排行、环比、趋势计算的输入缩小；读取和清洗阶段仍按原始明细进行，
+  这一阶段的峰值内存不变（读取时的dtype压缩见 report_sync.load_range）
+"""
+
+import pandas as pd
+
+# 汇总维度（交易时间截断到天）与度量
+ROLLUP_DIMENSIONS = ['交易时间', '店铺', '渠道', '货品名称', '规格名称', '数据来源']
+ROLLUP_MEASURES = ['分摊后总价', '实发数量']
+ROW_COUNT_COL = '订单行数'
+
+
+def build_rollup(df, dimensions=ROLLUP_DIMENSIONS, measures=ROLLUP_MEASURES):
+    """
+    把已清洗的订单明细汇总到天。
+    缺失的维度列直接跳过；维度为空值（如ERP行的数据来源）保留为单独分组。
+    """
+    if df is None or df.empty:
+        return df
+    dims = [col for col in dimensions if col in df.columns]
+    values = [col for col in measures if col in df.columns]
+
+    work = df[dims + values].copy(deep=False)
+    if '交易时间' in work.columns:
+        work['交易时间'] = pd.to_datetime(work['交易时间'], errors='coerce').dt.normalize()
+
+    grouped = work.groupby(dims, observed=True, dropna=False, sort=False)
+    rollup = grouped[values].sum()
+    rollup[ROW_COUNT_COL] = grouped.size()
+    rollup = rollup.reset_index()
+
+    print(f"🧮 日汇总: {len(df)}行明细 -> {len(rollup)}行汇总")
+    return rollup
+
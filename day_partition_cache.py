@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按交易日期分区的本地列式存储
+- 每个交易日一个文件（优先Parquet，未安装pyarrow时退回pickle）
+- 只负责分区的读写和按区间回源；哪些日期需要重新拉取由 report_sync 按水位线判断
+- 整体日报/周报/月报、多事业部日报共用同一份存储
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from report_sql import date_range_predicate
+
+# 缓存根目录，可通过环境变量覆盖
+CACHE_ROOT = os.environ.get('REPORT_CACHE_DIR', 'cache')
+
+try:
+    import pyarrow  # noqa: F401
+    PARTITION_FORMAT = 'parquet'
+except ImportError:
+    PARTITION_FORMAT = 'pkl'
+
+
+def _to_date(value):
+    """统一把 'YYYY-MM-DD' / datetime / date 转成 date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if hasattr(value, 'year') and hasattr(value, 'month') and hasattr(value, 'day'):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def iter_days(start_date, end_date=None):
+    """返回 [start_date, end_date] 闭区间内的每一天（date对象）"""
+    start = _to_date(start_date)
+    end = _to_date(end_date) if end_date else start
+    days = []
+    current = start
+    while current <= end:
+        days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def _contiguous_runs(days):
+    """把有序日期列表切成连续区间，便于每段只发一条范围查询"""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [(start, end) for start, end in runs]
+
+
+class DayPartitionCache:
+    """单表按天分区缓存"""
+
+    def __init__(self, table, time_col, root=CACHE_ROOT, schema=None):
+        self.table = table
+        self.time_col = time_col
+        self.schema = schema
+        # 声明了列的表按schema版本分目录，列变化后旧分区自然失效
+        subdir = f"{table}_v{schema.version}" if schema is not None else table
+        self.root = os.path.join(root, subdir)
+
+    def partition_path(self, day):
+        return os.path.join(self.root, f"{_to_date(day).strftime('%Y-%m-%d')}.{PARTITION_FORMAT}")
+
+    def has_partition(self, day):
+        return os.path.exists(self.partition_path(day))
+
+    def read_partition(self, day):
+        path = self.partition_path(day)
+        if PARTITION_FORMAT == 'parquet':
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def write_partition(self, day, df):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.partition_path(day)
+        # 先写临时文件再替换，避免中断时留下半个分区；临时文件名带线程号，并发加载时互不覆盖
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if PARTITION_FORMAT == 'parquet':
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def drop_partition(self, day):
+        path = self.partition_path(day)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def fetch_remote(self, conn, start_day, end_day):
+        """从MySQL拉取 [start_day, end_day] 的数据（半开区间，可走时间索引）"""
+        columns = self.schema.select_list(conn) if self.schema is not None else '*'
+        sql = f"SELECT {columns} FROM {self.table} WHERE {date_range_predicate(self.time_col, start_day, end_day)}"
+        return pd.read_sql(sql, conn)
+
+    def split_by_day(self, df):
+        """按交易日期拆分，返回 {date: DataFrame}"""
+        if df.empty:
+            return {}
+        day_keys = pd.to_datetime(df[self.time_col], errors='coerce').dt.date
+        return {day: part.reset_index(drop=True) for day, part in df.groupby(day_keys, sort=True)}
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词分类器（渠道、品类、线上店铺、事业部/渠道分组共用）
+- 规则按优先级排列，命中第一条规则即返回其标签，与原来逐个 if/any(kw in s) 的写法结果一致
+- 所有关键词编译成一个正则，对每个字符串只扫描一次，得到命中的关键词集合后再按规则判断
+- 对整列分类时只计算去重值，再按编码广播回每一行
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# any_of: 命中其中任一关键词；all_of: 额外要求每组都至少命中一个；none_of: 不能命中；prefix: any_of 必须出现在开头
+Rule = namedtuple('Rule', ['label', 'any_of', 'all_of', 'none_of', 'prefix'], defaults=((), (), False))
+
+LABEL_CACHE_SIZE = 65536
+
+
+def map_unique(series, func):
+    """
+    等价于 series.apply(func)，但只对去重值调用func，再按编码广播回每一行。
+    空值同样只计算一次。
+    """
+    codes, uniques = pd.factorize(series)
+    labels = [func(value) for value in uniques]
+    if (codes == -1).any():
+        # 编码-1取列表最后一个元素，正好是空值的结果
+        labels.append(func(series[codes == -1].iloc[0]))
+    values = np.empty(len(labels), dtype=object)
+    values[:] = labels
+    return pd.Series(values[codes], index=series.index, name=series.name)
+
+
+class KeywordClassifier:
+    """
+    rules: 按优先级排列的 Rule 列表
+    default: 未命中任何规则时的标签；可为函数，参数为预处理后的文本
+    missing: 非字符串输入的标签
+    lowercase / strip: 匹配前的预处理（关键词本身不做转换，与原写法一致）
+    """
+
+    def __init__(self, rules, default, missing=None, lowercase=False, strip=False):
+        self.rules = [
+            Rule(rule.label, frozenset(rule.any_of), tuple(frozenset(group) for group in rule.all_of),
+                 frozenset(rule.none_of), rule.prefix)
+            for rule in rules
+        ]
+        self.default = default
+        self.missing = default if missing is None and not callable(default) else missing
+        self.lowercase = lowercase
+        self.strip = strip
+
+        keywords = {kw for rule in self.rules for group in (rule.any_of, rule.none_of, *rule.all_of) for kw in group}
+        if '' in keywords:
+            raise ValueError("关键词不能为空字符串")
+        # 按长度降序排列：同一位置上正则取到的是最长关键词，其余命中的关键词都是它的前缀
+        ordered = sorted(keywords, key=lambda kw: (-len(kw), kw))
+        self._pattern = re.compile('(?=(' + '|'.join(re.escape(kw) for kw in ordered) + '))') if ordered else None
+        self._prefixes = {kw: frozenset(k for k in ordered if kw.startswith(k)) for kw in ordered}
+        self._label = lru_cache(maxsize=LABEL_CACHE_SIZE)(self._match)
+
+    @classmethod
+    def from_keyword_map(cls, keyword_map, default, **kwargs):
+        """{标签: [关键词]}，按字典顺序决定优先级"""
+        return cls([Rule(label, keywords) for label, keywords in keyword_map.items()], default, **kwargs)
+
+    @classmethod
+    def from_groups(cls, groups, order=None, default='其他', **kwargs):
+        """{分组名: {'keywords': [...], ...}} 形式的分组配置（事业部/渠道分组）"""
+        names = order or list(groups)
+        return cls([Rule(name, groups[name]['keywords']) for name in names], default, **kwargs)
+
+    def hits(self, text):
+        """返回 (命中的关键词集合, 出现在开头的关键词集合)"""
+        found, head = set(), set()
+        if self._pattern is None:
+            return found, head
+        for match in self._pattern.finditer(text):
+            matched = self._prefixes[match.group(1)]
+            found |= matched
+            if match.start() == 0:
+                head |= matched
+        return found, head
+
+    def _match(self, text):
+        found, head = self.hits(text)
+        for rule in self.rules:
+            pool = head if rule.prefix else found
+            if pool.isdisjoint(rule.any_of):
+                continue
+            if any(found.isdisjoint(group) for group in rule.all_of):
+                continue
+            if not found.isdisjoint(rule.none_of):
+                continue
+            return rule.label
+        return self.default(text) if callable(self.default) else self.default
+
+    def classify(self, value):
+        if not isinstance(value, str):
+            return self.missing
+        if self.strip:
+            value = value.strip()
+        if self.lowercase:
+            value = value.lower()
+        return self._label(value)
+
+    def matching_labels(self, value):
+        """命中的全部标签（按规则顺序），用于一个值可能属于多个分组的场景"""
+        if not isinstance(value, str):
+            return []
+        text = value.strip() if self.strip else value
+        text = text.lower() if self.lowercase else text
+        found, head = self.hits(text)
+        labels = []
+        for rule in self.rules:
+            pool = head if rule.prefix else found
+            if (not pool.isdisjoint(rule.any_of)
+                    and not any(found.isdisjoint(group) for group in rule.all_of)
+                    and found.isdisjoint(rule.none_of)
+                    and rule.label not in labels):
+                labels.append(rule.label)
+        return labels
+
+    def classify_series(self, series):
+        return map_unique(series, self.classify)
+
+    def mask(self, series):
+        """布尔分类器（标签为True/False）对整列求掩码"""
+        return self.classify_series(series).astype(bool)
+
+    def membership(self, series, index=None):
+        """
+        成员矩阵：每个标签一个布尔列，某行命中该规则即为True（一行可同时属于多个分组）。
+        只对去重值匹配，空值/非字符串整行为False。
+        series为None时（如同期无数据、缺少匹配列）返回与index对齐、列齐全的全False矩阵。
+        """
+        labels = list(dict.fromkeys(rule.label for rule in self.rules))
+        if series is None:
+            return pd.DataFrame(False, index=index if index is not None else pd.RangeIndex(0), columns=labels)
+        position = {label: i for i, label in enumerate(labels)}
+        codes, uniques = pd.factorize(series)
+        # 多出的最后一行全为False，编码-1（空值）正好取到它
+        matrix = np.zeros((len(uniques) + 1, len(labels)), dtype=bool)
+        for row, value in enumerate(uniques):
+            for label in self.matching_labels(value):
+                matrix[row, position[label]] = True
+        return pd.DataFrame(matrix[codes], index=series.index, columns=labels)
+
+
+# ========== 各报表共用的规则 ==========
+
+# 线上店铺
+ONLINE_SHOP_KEYWORDS = ['京东', '天猫', '拼多多', '抖音', '卡萨帝', '小红书', '淘宝', '苏宁', '国美']
+ONLINE_SHOP = KeywordClassifier([Rule(True, ONLINE_SHOP_KEYWORDS)], default=False, missing=False)
+
+# 店铺 -> 渠道（整体日报/周报/月报）：卡萨帝和小红书优先，其余按店铺名开头判断
+SHOP_CHANNEL = KeywordClassifier([
+    Rule('卡萨帝', ['卡萨帝', '小红书']),
+    Rule('京东', ['京东'], prefix=True),
+    Rule('天猫', ['天猫'], prefix=True),
+    Rule('天猫', ['淘宝']),
+    Rule('拼多多', ['拼多多'], prefix=True),
+    Rule('抖音', ['抖音'], prefix=True),
+], default='其他', strip=True)
+
+# 品类标准化：热水器相关（采暖、空气能、多能源、电热、燃热）归为热水器，其余保持原样
+CATEGORY_NORMALIZER = KeywordClassifier(
+    [Rule('热水器', ['热水器', '采暖', '空气能', '多能源', '电热', '燃热'])],
+    default=lambda text: text, strip=True
+)
+
+# 分销产品名称 -> 品类
+FENXIAO_CATEGORY_KEYWORDS = {
+    "家用空调": ["空调", "挂机", "柜机", "中央空调", "分体式"],
+    "商用空调": ["商用", "商用空调", "多联机", "风管机"],
+    "冰箱": ["冰箱", "冷柜", "冰柜", "冷藏", "冷冻"],
+    "洗衣机": ["洗衣机", "洗烘一体", "滚筒", "波轮"],
+    "洗碗机": ["洗碗机"],
+    "热水器": ["热水器", "电热水器", "燃气热水器", "多能源热水器"],
+    "净水": ["净水", "净水器", "净水机", "过滤器"],
+    "采暖": ["采暖", "暖气", "地暖", "壁挂炉"],
+    "厨电": ["消毒柜", "燃气灶", "油烟机", "厨电", "蒸箱", "烤箱"],
+    "干衣机": ["干衣机", "烘干机"],
+    "除湿机": ["除湿机", "抽湿机"],
+    "新风": ["新风", "新风机", "新风系统"],
+}
+FENXIAO_CATEGORY = KeywordClassifier.from_keyword_map(FENXIAO_CATEGORY_KEYWORDS, default='其他', lowercase=True)
+# 周报/月报的厨电关键词不含蒸箱、烤箱
+FENXIAO_CATEGORY_NO_OVEN = KeywordClassifier.from_keyword_map(
+    {**FENXIAO_CATEGORY_KEYWORDS, "厨电": ["消毒柜", "燃气灶", "油烟机", "厨电"]}, default='其他', lowercase=True
+)
+
+# 多事业部日报：数据库未匹配时的品类关键词
+DEPT_CATEGORY_KEYWORDS = {
+    "家用空调": ["空调", "挂机", "柜机", "中央空调", "分体式"],
+    "商用空调": ["商用", "商用空调", "多联机", "风管机"],
+    "冰箱": ["冰箱", "冷柜", "冰柜", "冷藏", "冷冻"],
+    "洗衣机": ["洗衣机", "洗烘一体", "滚筒", "波轮"],
+    "洗碗机": ["洗碗机", "洗碗", "洗碟机"],
+    "热水器": ["热水器", "电热水器", "燃气热水器", "多能源热水器"],
+    "净水": ["净水", "净水器", "净水机", "过滤器"],
+    "采暖": ["采暖", "暖气", "地暖", "壁挂炉"],
+    "厨电": ["厨电", "油烟机", "燃气灶", "消毒柜", "蒸箱", "烤箱"],
+}
+DEPT_CATEGORY = KeywordClassifier.from_keyword_map(DEPT_CATEGORY_KEYWORDS, default=None, lowercase=True)
+
+# 强制归入预定义品类（整体日报/周报/月报），都未命中时归为冰箱
+FORCE_CATEGORY = KeywordClassifier([
+    Rule('洗碗机', ['洗碗机']),
+    Rule('冰箱', ['冰箱', '冰柜', '冷藏', '冷冻']),
+    Rule('洗衣机', ['洗衣机', '洗烘', '干衣机']),
+    Rule('冷柜', ['冷柜', '展示柜', '商用冷柜']),
+    Rule('家用空调', ['空调', '挂机', '柜机', '变频', '定频'], none_of=['商用', '中央', '多联']),
+    Rule('商空空调', ['商用空调', '中央空调', '多联机', '风管机', '天花机']),
+    Rule('厨电', ['消毒柜', '燃气灶', '油烟机', '蒸箱', '烤箱']),
+    Rule('热水器', ['热水器', '燃气热水器', '电热水器']),
+    Rule('洗碗机', ['嵌入式', '洗', '消', '烘干', '分区洗', '洗消烘']),
+], default='冰箱', lowercase=True)
+
+# 强制归入预定义品类（多事业部日报）：关键词未命中时再按品牌 + 容量/重量/匹数判断
+DEPT_BRANDS = ['海尔', '美的', '格力', 'tcl', '容声']
+DEPT_FORCE_CATEGORY = KeywordClassifier([
+    Rule('洗碗机', ['洗碗机', '洗碗', '洗碟机', '洗碟']),
+    Rule('冰箱', ['冰箱', '冷藏', '冷冻', '保鲜']),
+    Rule('洗衣机', ['洗衣机', '洗烘一体', '滚筒', '波轮', '洗衣']),
+    Rule('冷柜', ['冷柜', '冰柜', '展示柜', '冷藏柜', '冷冻柜']),
+    Rule('家用空调', ['空调', '挂机', '柜机', '分体式', '壁挂', '立式']),
+    Rule('商空空调', ['商用', '商用空调', '多联机', '风管机', '中央空调', '商空']),
+    Rule('厨电', ['厨电', '油烟机', '燃气灶', '消毒柜', '蒸箱', '烤箱', '灶具']),
+    Rule('热水器', ['热水器', '电热水器', '燃气热水器', '多能源热水器', '热水']),
+    Rule('冰箱', DEPT_BRANDS, all_of=[['升', 'l', '容量']]),
+    Rule('洗衣机', DEPT_BRANDS, all_of=[['kg', '公斤', '洗']]),
+    Rule('家用空调', DEPT_BRANDS, all_of=[['匹', 'p', '制冷', '制热']]),
+], default='冰箱', lowercase=True)
+
+
+def is_online_shop(shop_name):
+    return ONLINE_SHOP.classify(shop_name)
+
+
+def classify_channel(shop_name):
+    return SHOP_CHANNEL.classify(shop_name)
+
+
+def normalize_category(name):
+    """品类标准化函数，优化热水器品类归类"""
+    if pd.isna(name) or name == '':
+        return '其他'
+    return CATEGORY_NORMALIZER.classify(str(name))
+
+
+def categorize_product_for_fenxiao(product_name):
+    """从产品名称中识别品类，用于分销数据"""
+    return FENXIAO_CATEGORY.classify(product_name) if isinstance(product_name, str) else '其他'
+
+
+def categorize_product_for_fenxiao_no_oven(product_name):
+    """同 categorize_product_for_fenxiao，厨电不含蒸箱、烤箱（周报/月报沿用的规则）"""
+    return FENXIAO_CATEGORY_NO_OVEN.classify(product_name) if isinstance(product_name, str) else '其他'
+
+
+def force_categorize_product(product_name):
+    """强制通过产品名称关键词匹配到八个预定义品类之一"""
+    if not product_name:
+        return "冰箱"
+    return FORCE_CATEGORY.classify(str(product_name))
+
+
+def dept_force_categorize_product(product_name):
+    """强制将产品名称匹配到八个预定义品类之一（多事业部日报）"""
+    return DEPT_FORCE_CATEGORY.classify(product_name) if isinstance(product_name, str) else '冰箱'
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线SQLite后端
+- 让报表的数据读取在没有生产MySQL时也能运行（基准测试、回归测试）
+- 对脚本中用到的MySQL写法做最小翻译：%s占位符、DESCRIBE、SHOW TABLES LIKE
+- 声明为 DATETIME/TIMESTAMP 的列读出时解析为 datetime（与pymysql一致），read_sql 得到 datetime64 列
+- 启用方式: REPORT_DB_BACKEND=sqlite REPORT_DB_PATH=report_bench.db（由 report_db 读取）
+"""
+
+import re
+import sqlite3
+from datetime import datetime
+
+_DESCRIBE = re.compile(r"^\s*DESCRIBE\s+`?(\w+)`?\s*;?\s*$", re.IGNORECASE)
+_SHOW_TABLES = re.compile(r"^\s*SHOW\s+TABLES\s+LIKE\s+'([^']*)'\s*;?\s*$", re.IGNORECASE)
+
+
+# 按声明类型解析的时间列（sqlite3 PARSE_DECLTYPES 只看声明类型的第一个词）
+DATETIME_DECLTYPES = ('DATETIME', 'TIMESTAMP')
+
+
+def _parse_datetime(value):
+    """'YYYY-MM-DD[ HH:MM:SS[.ffffff]]' -> datetime；空值为None，无法解析的保持文本"""
+    text = value.decode('utf-8').strip()
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+for _decltype in DATETIME_DECLTYPES:
+    sqlite3.register_converter(_decltype, _parse_datetime)
+
+
+def translate_sql(sql, params=None):
+    """把MySQL写法翻译为SQLite可执行的语句，返回 (sql, params)"""
+    match = _DESCRIBE.match(sql)
+    if match:
+        # 与MySQL一致：每行第一个字段为列名
+        return f"SELECT name FROM pragma_table_info('{match.group(1)}')", ()
+    match = _SHOW_TABLES.match(sql)
+    if match:
+        return f"SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '{match.group(1)}'", ()
+    if params:
+        # pymysql 使用 %s 占位符，%% 表示字面量 %
+        sql = sql.replace('%s', '?').replace('%%', '%')
+    return sql, params or ()
+
+
+class SQLiteCompatCursor:
+    """接受MySQL写法的SQLite游标"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(*translate_sql(sql, params))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        sql, _ = translate_sql(sql, seq_of_params[0] if seq_of_params else None)
+        self._cursor.executemany(sql, seq_of_params)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class SQLiteCompatConnection:
+    """与pymysql连接接口一致的SQLite连接"""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES)
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCompatCursor(self._conn.cursor())
+
+    def ping(self, reconnect=True):
+        self._conn.execute("SELECT 1")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def connect_sqlite(path):
+    return SQLiteCompatConnection(path)
+
+
+def write_tables(path, frames, indexes=None, if_exists='replace', datetime_columns=None):
+    """
+    把 {表名: DataFrame} 写入SQLite文件，并按 {表名: [列名]} 建索引。
+    时间列以 'YYYY-MM-DD HH:MM:SS' 文本保存，与半开区间条件按字符串比较一致；
+    datetime_columns {表名: [列名]} 中的列声明为 DATETIME，经 connect_sqlite 读出时解析为 datetime。
+    """
+    conn = sqlite3.connect(path)
+    try:
+        for table, df in frames.items():
+            dtype = {col: 'DATETIME' for col in (datetime_columns or {}).get(table, []) if col in df.columns}
+            df.to_sql(table, conn, index=False, if_exists=if_exists, chunksize=50000, dtype=dtype or None)
+            for i, col in enumerate((indexes or {}).get(table, [])):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{i} ON {table} (`{col}`)")
+        conn.commit()
+    finally:
+        conn.close()
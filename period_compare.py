@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本期/对比期环比
+- 原写法在 iterrows 里逐行到对比期汇总表里查同名的行（prev_summary[prev_summary[key] == v]），
+  增长/下滑名单再用Python循环拼出来
+- 这里把本期、对比期汇总表按键一次合并，金额/数量/增长率作为列，增长/下滑名单按条件筛选后排序
+- 数值口径与原写法一致：金额、数量先取整（int截断）再计算增长率
+"""
+
+import numpy as np
+import pandas as pd
+
+PREV_AMOUNT = 'prev_amount'
+PREV_QTY = 'prev_qty'
+DELTA_AMOUNT = 'delta_amount'
+GROWTH_RATE = 'growth_rate'      # 百分比，对比期金额为0时为NaN
+RATIO_LABEL = 'ratio_label'      # 与 calculate_ratio(本期金额, 对比期金额) 相同的文本
+
+
+def calculate_ratio(current, previous):
+    """计算增长比例"""
+    if previous == 0:
+        return "📈 100%" if current > 0 else "0%"
+
+    ratio = ((current - previous) / previous) * 100
+    if ratio > 0:
+        return f"📈 {ratio:.1f}%"
+    elif ratio < 0:
+        return f"📉 {ratio:.1f}%"
+    else:
+        return "📊 0%"
+
+
+def _truncate(values):
+    return np.trunc(np.asarray(values, dtype=float)).astype(np.int64)
+
+
+def ratio_labels(current, previous):
+    """calculate_ratio 的整列版本，返回字符串数组"""
+    current = np.asarray(current, dtype=float)
+    previous = np.asarray(previous, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (current - previous) / previous * 100
+    text = np.char.mod('%.1f%%', np.where(previous == 0, 0.0, ratio))
+    return np.select(
+        [(previous == 0) & (current > 0), previous == 0, ratio > 0, ratio < 0],
+        [np.str_("📈 100%"), np.str_("0%"), np.char.add("📈 ", text), np.char.add("📉 ", text)],
+        default=np.str_("📊 0%"),
+    ).astype(object)
+
+
+def compare_periods(current, previous, key, amount_col, qty_col=None, how='left'):
+    """
+    按 key 合并本期与对比期汇总表（previous 可为 None），how 为 'left' 或 'outer'。
+    保留 current 的行顺序和原有列；how='outer' 时对比期独有的键追加在后面（本期记为0）。
+    新增列：prev_amount/prev_qty（取整）、delta_amount、growth_rate、ratio_label
+    """
+    # 只有金额列的汇总表（qty_col=None）不生成 prev_qty
+    renames = {amount_col: PREV_AMOUNT} if qty_col is None else {amount_col: PREV_AMOUNT, qty_col: PREV_QTY}
+    if previous is None or previous.empty:
+        prev = pd.DataFrame({key: pd.Series([], dtype=object), **{col: [] for col in renames.values()}})
+    else:
+        # 对比期每个键取第一行（与原来 .iloc[0] 一致）
+        prev = previous.drop_duplicates(subset=key)[[key, *renames]].rename(columns=renames)
+    # pandas 的 outer 合并会按键排序，这里先 left 合并再追加对比期独有的键
+    merged = current.merge(prev, on=key, how='left', sort=False)
+    if how == 'outer':
+        extra = prev[~prev[key].isin(current[key])]
+        if not extra.empty:
+            merged = pd.concat([merged, extra], ignore_index=True)
+    for col in renames:
+        if how == 'outer':
+            merged[col] = merged[col].fillna(0)
+        merged[renames[col]] = _truncate(merged[renames[col]].fillna(0))
+    merged.index = range(len(merged))
+
+    amount = _truncate(merged[amount_col])
+    prev_amount = merged[PREV_AMOUNT].to_numpy()
+    merged[DELTA_AMOUNT] = amount - prev_amount
+    with np.errstate(divide='ignore', invalid='ignore'):
+        merged[GROWTH_RATE] = np.where(prev_amount > 0, (amount - prev_amount) / prev_amount * 100, np.nan)
+    merged[RATIO_LABEL] = ratio_labels(amount, prev_amount)
+    return merged
+
+
+def growth_view(comparison, above=0.0, n=None, sort=True):
+    """对比期有数据且增长率高于 above 的行，按增长率从高到低（稳定排序）"""
+    view = comparison[comparison[GROWTH_RATE].to_numpy() > above]
+    if sort:
+        view = view.sort_values(GROWTH_RATE, ascending=False, kind='stable')
+    return view if n is None else view.head(n)
+
+
+def decline_view(comparison, below=0.0, n=None, sort=True):
+    """对比期有数据且增长率低于 below 的行，按增长率从低到高（稳定排序）"""
+    view = comparison[comparison[GROWTH_RATE].to_numpy() < below]
+    if sort:
+        view = view.sort_values(GROWTH_RATE, ascending=True, kind='stable')
+    return view if n is None else view.head(n)
+
+
+def change_tuples(view, key, amount_col):
+    """[(键, 增长率, 对比期金额, 本期金额)]，与原来 growth_xxx 列表的元组格式一致"""
+    return list(zip(view[key].tolist(), view[GROWTH_RATE].tolist(), view[PREV_AMOUNT].tolist(),
+                    _truncate(view[amount_col]).tolist()))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fenxiaochanpin 产品 -> 品类 查询
+- 原做法每个产品名称新建一次连接，并重复执行 SHOW TABLES / DESCRIBE / 单条查询
+- 这里每个进程只检查一次表结构、读取一次 (产品名称, 品类)，之后全部查字典
+- 字典未命中的名称再按忽略大小写/首尾空格（与MySQL默认排序规则一致）匹配，结果放入LRU
+"""
+
+import threading
+from functools import lru_cache
+
+MAPPING_TABLE = 'fenxiaochanpin'
+MISS_CACHE_SIZE = 4096
+
+
+def _normalize(name):
+    return name.strip().casefold()
+
+
+class ProductCategoryResolver:
+    """fenxiaochanpin 品类字典；表不存在或缺少字段时所有查询返回None"""
+
+    def __init__(self, connect=None, table=MAPPING_TABLE):
+        self.table = table
+        self.product_col = None
+        self.category_col = None
+        self.categories = {}
+        self._normalized = {}
+        self._lookup_miss = lru_cache(maxsize=MISS_CACHE_SIZE)(self._match_normalized)
+        if connect is not None:
+            self._load(connect)
+
+    def _load(self, connect):
+        conn = connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SHOW TABLES LIKE '{self.table}'")
+            if not cursor.fetchone():
+                print(f"⚠️ {self.table}表不存在，将使用产品名称识别品类")
+                return
+
+            cursor.execute(f"DESCRIBE {self.table}")
+            columns = [row[0] for row in cursor.fetchall()]
+            product_cols = [col for col in columns if '产品' in col or '名称' in col or '规格' in col]
+            category_cols = [col for col in columns if '品类' in col or '分类' in col or 'category' in col.lower()]
+            if not product_cols or not category_cols:
+                print(f"⚠️ {self.table}表中未找到产品名称或品类字段: {columns}")
+                return
+            self.product_col, self.category_col = product_cols[0], category_cols[0]
+
+            cursor.execute(f"SELECT {self.product_col}, {self.category_col} FROM {self.table}")
+            for product_name, category in cursor.fetchall():
+                if not isinstance(product_name, str):
+                    continue
+                # 与 LIMIT 1 一致：同名多行只取第一行
+                self.categories.setdefault(product_name, category)
+                self._normalized.setdefault(_normalize(product_name), category)
+            cursor.close()
+            print(f"📥 {self.table}品类字典: {len(self.categories)} 个产品（{self.product_col} -> {self.category_col}）")
+        finally:
+            conn.close()
+
+    def _match_normalized(self, product_name):
+        return self._normalized.get(_normalize(product_name))
+
+    def lookup(self, product_name):
+        """返回品类；未匹配或品类为空返回None"""
+        if not isinstance(product_name, str) or not self.category_col:
+            return None
+        if product_name in self.categories:
+            category = self.categories[product_name]
+        else:
+            category = self._lookup_miss(product_name)
+        return category or None
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_category_resolver(connect):
+    """进程级品类字典（首次调用时加载；加载失败时记录一次，之后不再重试）"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            try:
+                _resolver = ProductCategoryResolver(connect)
+            except Exception as e:
+                print(f"❌ 从{MAPPING_TABLE}表加载品类失败: {e}")
+                _resolver = ProductCategoryResolver()
+        return _resolver
+
+
+def reset_category_resolver():
+    global _resolver
+    with _resolver_lock:
+        _resolver = None
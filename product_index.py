@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ERP货品名称内存索引
+- 分销产品在fenxiaochanpin中货品名称为空时，需要从ERP（Daysales）反查货品名称
+- 原做法每个产品一次 规格名称 = %s 查询 + 最多三次 LIKE '%关键词%' 全表扫描
+- 这里每次运行只读取一次 Daysales 近 LOOKBACK_DAYS 天去重的 (规格名称, 货品名称)，之后的反查全部在内存完成
+  （按交易时间限定范围，不随历史数据增长做全表扫描；更早下架的型号走关键词/强制分类兜底）
+"""
+
+import re
+import threading
+from datetime import date, timedelta
+
+MODEL_TOKEN = re.compile(r'[A-Z0-9]{3,}')
+CHINESE_TOKEN = re.compile(r'[\u4e00-\u9fff]+')
+
+# 不参与关键词匹配的修饰词
+STOP_WORDS = {'大容量', '家用', '独立式', '变频', '超一级', '水效', '升级款', '就近仓', '新品上市', '超大容量'}
+MAX_KEYWORDS = 3   # 与原逻辑一致，只尝试前3个关键词
+LOOKBACK_DAYS = 365   # 反查使用的ERP数据范围（天）
+
+DISTINCT_SQL = (
+    "SELECT DISTINCT 规格名称, 货品名称 FROM Daysales "
+    "WHERE 交易时间 >= %s AND 货品名称 IS NOT NULL AND 货品名称 != ''"
+)
+
+
+def extract_keywords(product_name, limit=MAX_KEYWORDS):
+    """从分销产品名称中提取关键词：先型号（大写字母数字），再中文词"""
+    if not isinstance(product_name, str):
+        return []
+    keywords = MODEL_TOKEN.findall(product_name.upper())
+    keywords.extend(
+        word for word in CHINESE_TOKEN.findall(product_name)
+        if len(word) >= 2 and word not in STOP_WORDS
+    )
+    return keywords[:limit] if limit else keywords
+
+
+def tokenize(text):
+    """货品名称的索引词：型号词 + 连续中文词"""
+    if not isinstance(text, str):
+        return set()
+    return set(MODEL_TOKEN.findall(text.upper())) | set(CHINESE_TOKEN.findall(text))
+
+
+class ProductNameIndex:
+    """(规格名称, 货品名称) 去重对的内存索引"""
+
+    def __init__(self, pairs):
+        self.goods_by_model = {}    # 规格名称 -> 第一个非空货品名称
+        self.goods_names = []       # 去重后的货品名称（保持出现顺序）
+        self._upper_names = []      # 子串匹配用，与MySQL默认排序规则一样不区分大小写
+        self._tokens = {}           # 索引词 -> 包含该词的货品名称
+        self._keyword_cache = {}
+
+        seen = set()
+        for model_name, goods_name in pairs:
+            if not goods_name:
+                continue
+            if model_name is not None:
+                self.goods_by_model.setdefault(model_name, goods_name)
+            if goods_name in seen:
+                continue
+            seen.add(goods_name)
+            self.goods_names.append(goods_name)
+            self._upper_names.append(goods_name.upper())
+            for token in tokenize(goods_name):
+                self._tokens.setdefault(token, []).append(goods_name)
+
+    @classmethod
+    def from_connection(cls, conn, lookback_days=LOOKBACK_DAYS, today=None):
+        since = (today or date.today()) - timedelta(days=lookback_days)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(DISTINCT_SQL, (since.strftime('%Y-%m-%d'),))
+            return cls(cursor.fetchall())
+        finally:
+            cursor.close()
+
+    def __len__(self):
+        return len(self.goods_names)
+
+    def goods_for_model(self, model_name):
+        """等价于 SELECT 货品名称 FROM Daysales WHERE 规格名称 = %s LIMIT 1"""
+        return self.goods_by_model.get(model_name)
+
+    def goods_for_keyword(self, keyword):
+        """等价于 货品名称 LIKE '%keyword%'：先查索引词，未命中再在去重名称中做子串匹配"""
+        if not keyword:
+            return None
+        if keyword in self._keyword_cache:
+            return self._keyword_cache[keyword]
+        hits = self._tokens.get(keyword.upper()) or self._tokens.get(keyword)
+        if hits:
+            result = hits[0]
+        else:
+            upper = keyword.upper()
+            result = next(
+                (name for name, upper_name in zip(self.goods_names, self._upper_names) if upper in upper_name),
+                None
+            )
+        self._keyword_cache[keyword] = result
+        return result
+
+    def match_keywords(self, product_name):
+        """按关键词顺序匹配，返回 (命中的关键词, 货品名称)，都未命中返回 (None, None)"""
+        for keyword in extract_keywords(product_name):
+            goods_name = self.goods_for_keyword(keyword)
+            if goods_name:
+                return keyword, goods_name
+        return None, None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_product_index(conn):
+    """进程级索引，首次需要反查时从数据库构建一次"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProductNameIndex.from_connection(conn)
+            print(f"🔎 ERP货品名称索引: {len(_index.goods_by_model)} 个规格名称, {len(_index)} 个货品名称")
+        return _index
+
+
+def reset_product_index():
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分销产品名称映射的持久化缓存
+- HT_fenxiao 产品名称 -> (规格名称, 货品名称) 的匹配结果落盘，日报/周报/月报/多事业部日报共用
+- 只保存精确/模糊匹配的结果：它们只取决于 fenxiaochanpin；
+  规则分类、ERP反查、强制分类依赖各脚本的分类函数和ERP数据，不进缓存
+- 以 fenxiaochanpin 表的指纹（行数 + 最大id/更新时间）和匹配规则版本号判断是否失效
+- 每次运行只需要匹配缓存里没有的产品名称
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+
+from day_partition_cache import CACHE_ROOT
+
+MAPPING_PATH = os.path.join(CACHE_ROOT, 'product_mapping.db')
+
+# 匹配规则变化时递增，旧结果整体失效（v3起不再缓存依赖分类函数的结果）
+MAPPING_VERSION = 3
+
+MAPPING_TABLE = 'fenxiaochanpin'
+# 指纹使用的列：存在哪个用哪个
+ID_COLUMNS = ['id', 'ID', '编号']
+UPDATE_COLUMNS = ['update_time', 'updated_at', '更新时间', '修改时间', 'create_time', '创建时间']
+
+
+def table_fingerprint(conn, table=MAPPING_TABLE):
+    """表指纹: v{版本}:{行数}:{最大id}:{最大更新时间}，表有改动时随之变化"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+        columns = [desc[0] for desc in (cursor.description or [])]
+        id_col = next((col for col in ID_COLUMNS if col in columns), None)
+        update_col = next((col for col in UPDATE_COLUMNS if col in columns), None)
+
+        select = ['COUNT(*)']
+        select.append(f"MAX(`{id_col}`)" if id_col else 'NULL')
+        select.append(f"MAX(`{update_col}`)" if update_col else 'NULL')
+        cursor.execute(f"SELECT {', '.join(select)} FROM {table}")
+        row_count, max_id, max_update = cursor.fetchone()
+    finally:
+        cursor.close()
+    return f"v{MAPPING_VERSION}:{row_count}:{max_id}:{max_update}"
+
+
+class ProductMappingCache:
+    """产品名称映射缓存（本地SQLite），指纹不一致的旧条目在打开时清除"""
+
+    def __init__(self, fingerprint, path=MAPPING_PATH):
+        self.fingerprint = fingerprint
+        self.path = path
+        self._conn().close()
+
+    @classmethod
+    def open(cls, conn, path=MAPPING_PATH):
+        """按当前 fenxiaochanpin 指纹打开缓存"""
+        return cls(table_fingerprint(conn), path=path)
+
+    def _conn(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS product_mapping (
+                product_name TEXT PRIMARY KEY,
+                model_name TEXT,
+                goods_name TEXT,
+                fingerprint TEXT NOT NULL,
+                resolved_at TEXT NOT NULL
+            )
+        """)
+        stale = conn.execute("DELETE FROM product_mapping WHERE fingerprint != ?", (self.fingerprint,)).rowcount
+        conn.commit()
+        if stale > 0:
+            print(f"🔄 fenxiaochanpin已变化，清除 {stale} 条旧的产品映射")
+        return conn
+
+    def get_many(self, product_names):
+        """返回已缓存的 {产品名称: {'规格名称': ..., '货品名称': ...}}"""
+        names = [name for name in dict.fromkeys(product_names) if isinstance(name, str)]
+        result = {}
+        if not names:
+            return result
+        conn = self._conn()
+        try:
+            # 分批查询，避免超过SQLite变量个数上限
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                placeholders = ','.join(['?'] * len(chunk))
+                rows = conn.execute(
+                    f"SELECT product_name, model_name, goods_name FROM product_mapping WHERE product_name IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for product_name, model_name, goods_name in rows:
+                    result[product_name] = {'规格名称': model_name, '货品名称': goods_name}
+        finally:
+            conn.close()
+        return result
+
+    def put_many(self, mapping):
+        """写入新的匹配结果 {产品名称: {'规格名称': ..., '货品名称': ...}}"""
+        if not mapping:
+            return 0
+        resolved_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self._conn()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO product_mapping (product_name, model_name, goods_name, fingerprint, resolved_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(name, value['规格名称'], value['货品名称'], self.fingerprint, resolved_at)
+                 for name, value in mapping.items() if isinstance(name, str)]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return len(mapping)
+
+
+def open_mapping_cache(conn, path=MAPPING_PATH):
+    """打开映射缓存；缓存不可用时返回None，本次全部重新匹配"""
+    try:
+        return ProductMappingCache.open(conn, path=path)
+    except Exception as e:
+        print(f"⚠️ 产品映射缓存不可用，本次全部重新匹配: {e}")
+        return None
+
+
+def split_cached(cache, product_names):
+    """返回 (已缓存的映射, 仍需匹配的产品名称列表)"""
+    product_names = [name for name in product_names if isinstance(name, str)]
+    if cache is None:
+        return {}, product_names
+    try:
+        cached = cache.get_many(product_names)
+    except Exception as e:
+        print(f"⚠️ 读取产品映射缓存失败: {e}")
+        cached = {}
+    pending = [name for name in product_names if name not in cached]
+    if cached:
+        print(f"💾 产品映射缓存命中 {len(cached)} 个，待匹配 {len(pending)} 个")
+    return cached, pending
+
+
+def save_resolved(cache, mapping):
+    """保存本次新匹配的结果；写入失败不影响报表"""
+    if cache is None or not mapping:
+        return
+    try:
+        cache.put_many(mapping)
+    except Exception as e:
+        print(f"⚠️ 产品映射缓存写入失败: {e}")
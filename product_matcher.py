@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分销产品匹配（各报表共用）
+HT_fenxiao 的产品名称 -> (规格名称, 货品名称)，按以下顺序批量匹配：
+1. 本地映射缓存（product_mapping_cache，只存精确/模糊匹配的结果）
+2. fenxiaochanpin 精确匹配：分批 IN (...) 查询
+3. 模糊候选：一次读取 fenxiaochanpin 目录，在内存中找包含该名称的产品（等价于 LIKE '%名称%'）
+4. 规则分类：按分类/强制分类得到的名称再查目录
+5. 匹配到但货品名称为空的，用ERP货品名称索引反查（product_index），仍失败则强制分类
+匹配开销只与去重后的产品数有关，与订单行数无关；
+映射结果、品类、店铺前缀也只在去重值上计算，再按编码广播回每一行。
+规则分类/ERP反查/强制分类的结果取决于调用脚本的分类函数和当次的ERP数据，不写入共用缓存，每次运行重新计算。
+"""
+
+import numpy as np
+import pandas as pd
+
+from keyword_classifier import map_unique
+from product_index import get_product_index
+from product_mapping_cache import MAPPING_PATH, open_mapping_cache, split_cached, save_resolved
+
+MAPPING_TABLE = 'fenxiaochanpin'
+IN_BATCH_SIZE = 500   # 单条 IN 查询的参数个数上限
+FENXIAO_SHOP_PREFIX = '京东-'   # 分销店铺统一归入京东渠道
+
+SOURCE_LABELS = {
+    'cache': '缓存', 'exact': '精确', 'fuzzy': '模糊', 'rule': '规则分类',
+    'erp': 'ERP反查', 'keyword': '关键词', 'forced': '强制分类', 'unmatched': '未匹配',
+}
+# 只由 fenxiaochanpin 决定、与分类规则和ERP数据无关的来源，可以跨脚本缓存
+CACHEABLE_SOURCES = ('exact', 'fuzzy')
+
+
+def _blank(value):
+    return value is None or value != value or value == ''
+
+
+def fetch_exact(conn, product_names, batch_size=IN_BATCH_SIZE):
+    """分批精确匹配，返回 {产品名称: (规格名称, 货品名称)}（同名多行取第一行）"""
+    names = list(dict.fromkeys(product_names))
+    result = {}
+    cursor = conn.cursor()
+    try:
+        for i in range(0, len(names), batch_size):
+            chunk = names[i:i + batch_size]
+            placeholders = ','.join(['%s'] * len(chunk))
+            cursor.execute(
+                f"SELECT 产品名称, 规格名称, 货品名称 FROM {MAPPING_TABLE} WHERE 产品名称 IN ({placeholders})",
+                tuple(chunk)
+            )
+            for product_name, model_name, goods_name in cursor.fetchall():
+                result.setdefault(product_name, (model_name, goods_name))
+    finally:
+        cursor.close()
+    return result
+
+
+def fetch_catalog(conn):
+    """读取整个 fenxiaochanpin 目录 [(产品名称, 规格名称, 货品名称)]"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT 产品名称, 规格名称, 货品名称 FROM {MAPPING_TABLE}")
+        return [row for row in cursor.fetchall() if isinstance(row[0], str)]
+    finally:
+        cursor.close()
+
+
+class ProductMatcher:
+    """
+    conn: 数据库连接
+    categorize / force_categorize: 各脚本自己的分类函数（产品名称 -> 品类名称）
+    """
+
+    def __init__(self, conn, categorize=None, force_categorize=None):
+        self.conn = conn
+        self.categorize = categorize
+        self.force_categorize = force_categorize
+        self._catalog = None
+        self._catalog_exact = None
+        self.sources = {}   # 产品名称 -> 匹配来源
+
+    def _load_catalog(self):
+        if self._catalog is None:
+            self._catalog = fetch_catalog(self.conn)
+            # 模糊匹配与MySQL默认排序规则一致，不区分大小写
+            self._catalog_upper = [row[0].upper() for row in self._catalog]
+            self._catalog_exact = {}
+            for product_name, model_name, goods_name in self._catalog:
+                self._catalog_exact.setdefault(product_name, (model_name, goods_name))
+        return self._catalog
+
+    def fuzzy_candidate(self, product_name):
+        """目录中第一个包含该产品名称的条目"""
+        catalog = self._load_catalog()
+        needle = product_name.upper()
+        for row, upper_name in zip(catalog, self._catalog_upper):
+            if needle in upper_name:
+                return row[1], row[2]
+        return None
+
+    def rule_candidate(self, product_name):
+        """按分类规则得到的名称再查目录"""
+        self._load_catalog()
+        for rule in (self.categorize, self.force_categorize):
+            if rule is None:
+                continue
+            name = rule(product_name)
+            if name and name != product_name and name in self._catalog_exact:
+                return self._catalog_exact[name]
+        return None
+
+    def _fill_goods_name(self, product_name, model_name):
+        """货品名称为空：ERP反查 -> 关键词 -> 强制分类"""
+        index = get_product_index(self.conn)
+        goods_name = index.goods_for_model(model_name)
+        if goods_name:
+            return goods_name, 'erp'
+        _, goods_name = index.match_keywords(product_name)
+        if goods_name:
+            return goods_name, 'keyword'
+        if self.force_categorize is not None:
+            return self.force_categorize(product_name), 'forced'
+        return product_name, 'unmatched'
+
+    def match(self, product_names):
+        """返回 ({产品名称: {'规格名称': ..., '货品名称': ...}}, {来源: 个数})"""
+        names = [name for name in dict.fromkeys(product_names) if isinstance(name, str)]
+        mapping, stats = {}, {}
+        if not names:
+            return mapping, stats
+
+        exact = fetch_exact(self.conn, names)
+        for product_name in names:
+            source = 'exact'
+            matched = exact.get(product_name)
+            if matched is None:
+                matched = self.fuzzy_candidate(product_name)
+                source = 'fuzzy'
+            if matched is None:
+                matched = self.rule_candidate(product_name)
+                source = 'rule'
+            if matched is None:
+                model_name, goods_name, source = product_name, product_name, 'unmatched'
+            else:
+                model_name, goods_name = matched
+                if _blank(model_name):
+                    model_name = product_name
+                if _blank(goods_name):
+                    goods_name, source = self._fill_goods_name(product_name, model_name)
+            mapping[product_name] = {'规格名称': model_name, '货品名称': goods_name}
+            self.sources[product_name] = source
+            stats[source] = stats.get(source, 0) + 1
+        return mapping, stats
+
+
+def format_stats(stats):
+    return ', '.join(f"{SOURCE_LABELS.get(source, source)} {count}" for source, count in stats.items() if count)
+
+
+def resolve_product_mapping(conn, product_names, categorize=None, force_categorize=None, cache_path=MAPPING_PATH):
+    """
+    报表入口：先查本地映射缓存，只对新出现的产品名称批量匹配，精确/模糊匹配的结果写回缓存。
+    返回 {产品名称: {'规格名称': ..., '货品名称': ...}}
+    """
+    mapping_cache = open_mapping_cache(conn, path=cache_path)
+    cached_mapping, pending = split_cached(mapping_cache, product_names)
+    matcher = ProductMatcher(conn, categorize, force_categorize)
+    mapping, stats = matcher.match(pending)
+    save_resolved(mapping_cache, {name: value for name, value in mapping.items()
+                                  if matcher.sources.get(name) in CACHEABLE_SOURCES})
+    if cached_mapping:
+        stats = {'cache': len(cached_mapping), **stats}
+    mapping.update(cached_mapping)
+    print(f"🔗 分销产品匹配: {len(mapping)} 个产品（{format_stats(stats) or '无'}）")
+    return mapping
+
+
+def apply_product_mapping(df, mapping, key_col='规格名称'):
+    """
+    把匹配结果写回 规格名称/货品名称（原地修改），返回命中的行数。
+    只对去重后的产品名称查映射，不逐行 iterrows。
+    """
+    if df.empty or not mapping:
+        return 0
+    codes, uniques = pd.factorize(df[key_col])
+    hit = np.zeros(len(uniques) + 1, dtype=bool)          # 末位对应空值，永不命中
+    models = np.empty(len(uniques) + 1, dtype=object)
+    goods = np.empty(len(uniques) + 1, dtype=object)
+    for i, product_name in enumerate(uniques):
+        matched = mapping.get(product_name) if isinstance(product_name, str) else None
+        if matched is not None:
+            hit[i] = True
+            models[i] = matched['规格名称']
+            goods[i] = matched['货品名称']
+
+    row_hit = hit[codes]
+    df['规格名称'] = np.where(row_hit, models[codes], df['规格名称'].to_numpy(dtype=object))
+    df['货品名称'] = np.where(row_hit, goods[codes], df['货品名称'].to_numpy(dtype=object))
+    return int(row_hit.sum())
+
+
+def with_shop_prefix(shop_name, prefix=FENXIAO_SHOP_PREFIX):
+    """分销店铺名称统一加"京东-"前缀（已有前缀的不重复添加）"""
+    if not isinstance(shop_name, str) or shop_name.startswith(prefix):
+        return shop_name
+    return f"{prefix}{shop_name}"
+
+
+def add_shop_prefix(series, prefix=FENXIAO_SHOP_PREFIX):
+    return map_unique(series, lambda shop_name: with_shop_prefix(shop_name, prefix))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+销售汇总立方体
+- 品类/店铺/单品排行原来在每个品类、每个店铺的循环里重新筛选 df_erp 再 groupby(规格名称)，
+  行数 × 品类数、行数 × 店铺数地反复扫描
+- 这里一次 groupby 汇总到 (品类, 店铺, 规格名称, 渠道, 数据来源)，本期、对比期各一个立方体
+- 排行需要的各种切片（某品类下的店铺、某店铺下的单品、分销部分等）都在汇总结果上再聚合，
+  结果按 (切片维度, 条件) 缓存，同一次运行内重复取用不再计算
+"""
+
+import pandas as pd
+
+# 立方体维度与度量（与日报/周报/月报的列名一致）
+CUBE_DIMENSIONS = ['货品名称', '店铺', '规格名称', '渠道', '数据来源']
+CUBE_MEASURES = ['分摊后总价', '实发数量']
+
+# 常用条件：只取分销部分
+FENXIAO_ONLY = {'数据来源': '分销'}
+
+
+def _freeze(where):
+    return tuple(sorted(where.items())) if where else ()
+
+
+class SalesCube:
+    """
+    金额/数量按维度汇总后的立方体。
+    维度为空值（如ERP行的数据来源）保留为单独分组；切片时按 groupby 默认行为丢弃空值，
+    与原来 df[df[col] == value].groupby(...) 的结果一致。
+    返回的 DataFrame 在多个调用方之间共享，不要原地修改。
+    """
+
+    def __init__(self, df, amount_col=CUBE_MEASURES[0], qty_col=CUBE_MEASURES[1], dimensions=CUBE_DIMENSIONS):
+        self.amount_col = amount_col
+        self.qty_col = qty_col
+        self.measures = [amount_col, qty_col]
+        if df is None:
+            df = pd.DataFrame(columns=list(dimensions) + self.measures)
+        # 缺失的维度直接跳过；品类列回退为规格名称等情况下去重
+        self.dims = list(dict.fromkeys(col for col in dimensions if col in df.columns))
+        if self.dims:
+            grouped = df.groupby(self.dims, observed=True, dropna=False, sort=False)
+            self.data = grouped[self.measures].sum().reset_index()
+        else:
+            self.data = df[self.measures].sum().to_frame().T
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def has(self, dim):
+        return dim in self.dims
+
+    def _select(self, where):
+        """按 {维度: 值} 取子集；条件中的维度不存在时返回空表（等同原来的列存在性判断）"""
+        data = self.data
+        if not where:
+            return data
+        mask = pd.Series(True, index=data.index)
+        for dim, value in where.items():
+            if dim not in self.dims:
+                return data.iloc[0:0]
+            mask &= (data[dim] == value).to_numpy()
+        return data[mask.to_numpy()]
+
+    def rollup(self, by, where=None):
+        """
+        等价于 df[条件].groupby(by).agg({金额: 'sum', 数量: 'sum'}).reset_index()，
+        by 中有维度不存在时返回空表。
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        key = ('rollup', tuple(by), _freeze(where))
+        if key not in self._memo:
+            data = self._select(where)
+            if any(dim not in self.dims for dim in by):
+                result = pd.DataFrame(columns=by + self.measures)
+            else:
+                result = data.groupby(by, observed=True)[self.measures].sum().reset_index()
+            self._memo[key] = result
+        return self._memo[key]
+
+    def groups(self, key, by, where=None):
+        """{key的取值: 该取值下按 by 汇总的表}，一次聚合得到所有取值的切片"""
+        by = [by] if isinstance(by, str) else list(by)
+        memo_key = ('groups', key, tuple(by), _freeze(where))
+        if memo_key not in self._memo:
+            full = self.rollup([key] + by, where)
+            self._memo[memo_key] = {
+                value: part.drop(columns=key).reset_index(drop=True)
+                for value, part in full.groupby(key, observed=True, sort=False)
+            }
+        return self._memo[memo_key]
+
+    def group(self, key, value, by, where=None):
+        """某个取值下按 by 汇总的表（没有数据时为空表）"""
+        part = self.groups(key, by, where).get(value)
+        if part is None:
+            by = [by] if isinstance(by, str) else list(by)
+            return pd.DataFrame(columns=by + self.measures)
+        return part
+
+    def lookup(self, by, where=None):
+        """{键: (金额, 数量)}；by 为单列时键为标量，多列时为元组"""
+        by = [by] if isinstance(by, str) else list(by)
+        memo_key = ('lookup', tuple(by), _freeze(where))
+        if memo_key not in self._memo:
+            table = self.rollup(by, where)
+            keys = table[by[0]] if len(by) == 1 else zip(*(table[col] for col in by))
+            self._memo[memo_key] = dict(zip(keys, zip(table[self.amount_col], table[self.qty_col])))
+        return self._memo[memo_key]
+
+    def value(self, by, key, where=None):
+        """单个键的 (金额, 数量)，不存在时为 (0, 0)"""
+        return self.lookup(by, where).get(key, (0, 0))
+
+
+def ensure_cube(cube, df, amount_col, qty_col, dimensions=CUBE_DIMENSIONS):
+    """调用方没有传入立方体时按 df 现算一个"""
+    return cube if cube is not None else SalesCube(df, amount_col, qty_col, dimensions)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报表脚本共用的MySQL连接池
+- 整个进程复用少量连接，close() 即归还连接池，原有 conn.close() 写法无需改动
+- 取出前对空闲过久的连接做 ping 检查，失效则重建
+- 统一超时配置，并按SQL记录查询次数和耗时，进程退出时打印汇总
+- REPORT_DB_BACKEND=sqlite 时改为读取本地SQLite文件（REPORT_DB_PATH），用于离线基准测试
+"""
+
+import os
+import time
+import atexit
+import threading
+
+# 数据库配置（可通过环境变量覆盖）
+DB_HOST = os.environ.get('REPORT_DB_HOST', "212.64.57.87")
+DB_PORT = int(os.environ.get('REPORT_DB_PORT', 3306))
+DB_USER = os.environ.get('REPORT_DB_USER', "root")
+DB_PASSWORD = os.environ.get('REPORT_DB_PASSWORD', "c973ee9b500cc638")
+DB_NAME = os.environ.get('REPORT_DB_NAME', "Date")
+DB_CHARSET = "utf8mb4"
+
+# 数据后端：mysql（生产）或 sqlite（离线，见 offline_backend.py / synthetic_data.py）
+DB_BACKEND = os.environ.get('REPORT_DB_BACKEND', 'mysql')
+DB_PATH = os.environ.get('REPORT_DB_PATH', 'report_bench.db')
+
+# 统一超时（秒）：整月明细查询可能较慢，读超时放宽
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 300
+WRITE_TIMEOUT = 30
+
+POOL_SIZE = 4              # 最大连接数
+PING_INTERVAL = 60         # 空闲超过该秒数的连接取出前先ping
+CHECKOUT_TIMEOUT = 120     # 连接池耗尽时最长等待秒数
+
+
+def _mysql_connect():
+    import pymysql
+    return pymysql.connect(
+        host=DB_HOST, port=DB_PORT, user=DB_USER,
+        password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
+        connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, write_timeout=WRITE_TIMEOUT,
+        autocommit=True
+    )
+
+
+def _backend_connect():
+    if DB_BACKEND == 'sqlite':
+        from offline_backend import connect_sqlite
+        return connect_sqlite(DB_PATH)
+    return _mysql_connect()
+
+
+class QueryMetrics:
+    """按SQL语句汇总查询次数、耗时和返回行数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = {}
+        self.connects = 0
+        self.reuses = 0
+        self.connect_seconds = 0.0
+
+    @staticmethod
+    def _key(sql):
+        return ' '.join(str(sql).split())[:80]
+
+    def record_query(self, sql, seconds, rows):
+        key = self._key(sql)
+        with self._lock:
+            stat = self.queries.setdefault(key, {'count': 0, 'seconds': 0.0, 'rows': 0, 'max_seconds': 0.0})
+            stat['count'] += 1
+            stat['seconds'] += seconds
+            stat['rows'] += max(rows or 0, 0)
+            stat['max_seconds'] = max(stat['max_seconds'], seconds)
+
+    def record_connect(self, seconds):
+        with self._lock:
+            self.connects += 1
+            self.connect_seconds += seconds
+
+    def record_reuse(self):
+        with self._lock:
+            self.reuses += 1
+
+    def print_summary(self, top=5):
+        if not self.queries and not self.connects:
+            return
+        total_count = sum(stat['count'] for stat in self.queries.values())
+        total_seconds = sum(stat['seconds'] for stat in self.queries.values())
+        print(f"🗄️ 数据库统计: 新建连接 {self.connects} 次 ({self.connect_seconds:.2f}s), 复用 {self.reuses} 次, "
+              f"查询 {total_count} 次 ({total_seconds:.2f}s)")
+        slowest = sorted(self.queries.items(), key=lambda item: item[1]['seconds'], reverse=True)[:top]
+        for sql, stat in slowest:
+            print(f"   {stat['seconds']:.2f}s / {stat['count']}次 / {stat['rows']}行 (最慢 {stat['max_seconds']:.2f}s): {sql}")
+
+
+class PooledCursor:
+    """记录耗时的游标包装"""
+
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, *args)
+        finally:
+            self._metrics.record_query(sql, time.perf_counter() - start, getattr(self._cursor, 'rowcount', 0))
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, *args)
+        finally:
+            self._metrics.record_query(sql, time.perf_counter() - start, getattr(self._cursor, 'rowcount', 0))
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class PooledConnection:
+    """从连接池借出的连接，close() 归还而不是断开"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+
+    def cursor(self, *args, **kwargs):
+        return PooledCursor(self._raw.cursor(*args, **kwargs), self._pool.metrics)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pool._release(self._raw)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    """线程安全的简单连接池"""
+
+    def __init__(self, connect=_backend_connect, max_size=POOL_SIZE, ping_interval=PING_INTERVAL,
+                 checkout_timeout=CHECKOUT_TIMEOUT):
+        self._connect = connect
+        self.max_size = max_size
+        self.ping_interval = ping_interval
+        self.checkout_timeout = checkout_timeout
+        self.metrics = QueryMetrics()
+        self._idle = []          # [(raw, 归还时间)]
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    def _new_raw(self):
+        start = time.perf_counter()
+        raw = self._connect()
+        self.metrics.record_connect(time.perf_counter() - start)
+        return raw
+
+    def _healthy(self, raw, idle_seconds):
+        """空闲过久的连接先ping；不支持ping的连接（如SQLite）视为健康"""
+        if idle_seconds < self.ping_interval or not hasattr(raw, 'ping'):
+            return True
+        try:
+            raw.ping(reconnect=True)
+            return True
+        except Exception as e:
+            print(f"⚠️ 连接池中的连接已失效，重新建立: {e}")
+            return False
+
+    def connection(self):
+        """借出一个连接"""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            while not self._idle and self._in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"等待数据库连接超时（连接池上限 {self.max_size}）")
+                self._cond.wait(remaining)
+            self._in_use += 1
+            idle = self._idle.pop() if self._idle else None
+
+        try:
+            if idle is not None:
+                raw, released_at = idle
+                if self._healthy(raw, time.monotonic() - released_at):
+                    self.metrics.record_reuse()
+                    return PooledConnection(self, raw)
+                self._discard(raw)
+            return PooledConnection(self, self._new_raw())
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, raw):
+        # 结束可能残留的事务，避免复用时读到旧快照；失败说明连接已坏，直接丢弃
+        try:
+            raw.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+            self._discard(raw)
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for raw, _ in idle:
+            self._discard(raw)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _shutdown():
+    if _pool is not None:
+        _pool.metrics.print_summary()
+        _pool.close_all()
+
+
+def get_pool():
+    """进程级连接池（首次使用时创建）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+            atexit.register(_shutdown)
+        return _pool
+
+
+def get_connection():
+    """从进程级连接池借出连接，用完调用 close() 归还"""
+    return get_pool().connection()
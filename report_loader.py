@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报表数据并发加载
+- 本期、对比期、前一天的ERP数据和分销数据互不依赖，用有限线程池同时拉取
+- 总加载时间约等于最慢的一条查询，而不是所有查询之和
+- 结果以 ReportDatasets 返回；单个任务失败只记录错误，由调用方决定是否退出
+"""
+
+import time
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from report_db import POOL_SIZE
+
+# 线程数不超过连接池上限，避免线程在等待连接时空转
+MAX_WORKERS = POOL_SIZE
+
+
+@dataclass
+class ReportDatasets:
+    """一次报表运行所需的全部原始数据"""
+    erp: Optional[pd.DataFrame] = None
+    fenxiao: Optional[pd.DataFrame] = None
+    prev_erp: Optional[pd.DataFrame] = None
+    prev_fenxiao: Optional[pd.DataFrame] = None
+    prev_day_erp: Optional[pd.DataFrame] = None
+    prev_day_fenxiao: Optional[pd.DataFrame] = None
+    prev_count: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+def run_concurrently(tasks, max_workers=MAX_WORKERS):
+    """
+    并发执行 {名称: 无参函数}，返回 ({名称: 结果}, {名称: 错误信息})。
+    失败的任务结果为 None。
+    """
+    results, errors = {}, {}
+    if not tasks:
+        return results, errors
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        futures = {name: executor.submit(func) for name, func in tasks.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = None
+                errors[name] = str(e)
+    return results, errors
+
+
+def load_report_datasets(
+    current: Tuple[str, str],
+    comparison: Tuple[str, str],
+    previous_day: str,
+    load_erp: Callable,
+    load_fenxiao: Optional[Callable] = None,
+    comparison_available: Optional[Callable] = None,
+    fetch_prev_day_fenxiao: bool = True,
+    max_workers: int = MAX_WORKERS,
+) -> ReportDatasets:
+    """
+    current / comparison: (开始日期, 结束日期)；previous_day: 'YYYY-MM-DD'
+    load_erp(start, end) / load_fenxiao(start, end): 返回DataFrame
+    comparison_available(start, end): 返回 (是否有数据, 行数)，无数据时对比期ERP为None
+    """
+    datasets = ReportDatasets()
+
+    def load_comparison():
+        if comparison_available is not None:
+            has_data, count = comparison_available(*comparison)
+            datasets.prev_count = count
+            if not has_data:
+                return None
+        return load_erp(*comparison)
+
+    tasks = {
+        'erp': lambda: load_erp(*current),
+        'prev_erp': load_comparison,
+        'prev_day_erp': lambda: load_erp(previous_day, previous_day),
+    }
+    if load_fenxiao is not None:
+        tasks['fenxiao'] = lambda: load_fenxiao(*current)
+        tasks['prev_fenxiao'] = lambda: load_fenxiao(*comparison)
+        if fetch_prev_day_fenxiao:
+            tasks['prev_day_fenxiao'] = lambda: load_fenxiao(previous_day, previous_day)
+
+    start = time.perf_counter()
+    results, errors = run_concurrently(tasks, max_workers=max_workers)
+    datasets.elapsed = time.perf_counter() - start
+
+    for name, value in results.items():
+        setattr(datasets, name, value)
+    datasets.errors = errors
+    print(f"⚡ 并发加载 {len(tasks)} 个数据集，耗时 {datasets.elapsed:.1f}s" + (f"，失败 {len(errors)} 个" if errors else ""))
+    return datasets
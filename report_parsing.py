@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ERP/推广导出数据的容错解析
+- 数值列：先用整列字符串操作去掉全角/半角逗号和空格再整体转数字，转换失败的少数值才逐个走原逻辑
+- 日期列：只处理去重值，主流的 YYYY-MM-DD[ HH:MM:SS] 整列解析，其余格式逐个识别（结果缓存）
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+NUMBER_NOISE = ('，', ',', ' ', '\u3000')
+PARSE_CACHE_SIZE = 65536
+ISO_DAY = r'\d{4}-\d{2}-\d{2}(?: |$)'
+
+
+def _factorize_objects(series):
+    """返回 (编码, 去重值object数组)；空值编码为-1"""
+    codes, uniques = pd.factorize(series)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+# ========== 数值 ==========
+
+def to_number(val):
+    """将各种格式的数值转换为数字"""
+    if pd.isnull(val):
+        return 0
+    val = str(val).replace('，', '').replace(',', '').replace(' ', '').replace('\u3000', '')
+    # 处理可能的科学计数法或其他格式
+    try:
+        # 先尝试直接转换
+        return int(float(val))  # 直接返回整数，避免小数位
+    except ValueError:
+        try:
+            # 如果失败，尝试提取数字部分
+            numbers = re.findall(r'[\d.]+', val)
+            if numbers:
+                # 如果找到多个数字，取第一个
+                return int(float(numbers[0]))  # 直接返回整数
+            else:
+                return 0
+        except:
+            return 0
+
+
+def to_number_series(series):
+    """等价于 series.apply(to_number)，返回int64列"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        numbers = series.to_numpy(dtype=float, na_value=np.nan)
+        numbers = np.where(np.isnan(numbers), 0, numbers)
+        if np.isfinite(numbers).all():
+            return pd.Series(np.trunc(numbers).astype(np.int64), index=series.index, name=series.name)
+        return series.apply(to_number)
+
+    codes, uniques = _factorize_objects(series)
+    text = uniques.astype(str)
+    for noise in NUMBER_NOISE:
+        text = np.char.replace(text, noise, '')
+    numbers = pd.to_numeric(text, errors='coerce').astype(float)
+    parsed = np.isfinite(numbers)
+
+    values = np.zeros(len(uniques) + 1, dtype=np.int64)   # 最后一位对应空值（编码-1），结果为0
+    values[:-1][parsed] = np.trunc(numbers[parsed])
+    for i in np.flatnonzero(~parsed):
+        values[i] = to_number(uniques[i])
+    return pd.Series(values[codes], index=series.index, name=series.name)
+
+
+# ========== 日期 ==========
+
+def normalize_date_format(date_str):
+    """
+    统一日期格式处理，兼容各种日期格式，返回 'YYYY-MM-DD' 或 None
+    支持格式：
+    - YYYY-MM-DD HH:MM:SS
+    - YYYY-MM-DD
+    - MM-DD
+    - 7.2号, 7.2日等特殊格式
+    - 时间戳格式
+    - 其他常见格式
+    """
+    if pd.isna(date_str) or date_str is None:
+        return None
+    return _normalize_date_text(str(date_str).strip())
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _normalize_date_text(date_str):
+    # 处理空字符串
+    if not date_str or date_str == '':
+        return None
+    
+    # 处理7.2号格式 (7.2, 7.2号, 7.2日等)
+    if re.match(r'^\d+\.\d+[号日]?$', date_str):
+        # 提取月份和日期
+        parts = date_str.replace('号', '').replace('日', '').split('.')
+        if len(parts) == 2:
+            month = int(parts[0])
+            day = int(parts[1])
+            # 假设是当前年份
+            current_year = datetime.now().year
+            try:
+                return datetime(current_year, month, day).strftime('%Y-%m-%d')
+            except ValueError:
+                # 如果日期无效，返回None
+                return None
+    
+    # 处理时间戳格式
+    if re.match(r'^\d{10,13}$', date_str):
+        try:
+            timestamp = int(date_str)
+            # 如果是13位时间戳（毫秒），转换为10位（秒）
+            if len(date_str) == 13:
+                timestamp = timestamp // 1000
+            # 使用UTC时间戳转换
+            return datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d')
+        except (ValueError, OSError):
+            pass
+    
+    # 处理YYYY-MM-DD HH:MM:SS格式
+    if re.match(r'^\d{4}-\d{2}-\d{2}', date_str):
+        try:
+            # 提取日期部分，忽略时间部分
+            date_part = date_str.split(' ')[0]
+            parsed_date = pd.to_datetime(date_part, format='%Y-%m-%d')
+            if pd.notna(parsed_date):
+                return parsed_date.strftime('%Y-%m-%d')
+        except:
+            pass
+    
+    # 处理MM-DD格式
+    if re.match(r'^\d{2}-\d{2}$', date_str):
+        current_year = datetime.now().year
+        try:
+            month, day = map(int, date_str.split('-'))
+            return datetime(current_year, month, day).strftime('%Y-%m-%d')
+        except ValueError:
+            return None
+    
+    # 处理DD/MM/YYYY格式
+    if re.match(r'^\d{1,2}/\d{1,2}/\d{4}$', date_str):
+        try:
+            parsed_date = pd.to_datetime(date_str, format='%d/%m/%Y')
+            if pd.notna(parsed_date):
+                return parsed_date.strftime('%Y-%m-%d')
+        except:
+            pass
+    
+    # 处理YYYY/MM/DD格式
+    if re.match(r'^\d{4}/\d{1,2}/\d{1,2}$', date_str):
+        try:
+            parsed_date = pd.to_datetime(date_str, format='%Y/%m/%d')
+            if pd.notna(parsed_date):
+                return parsed_date.strftime('%Y-%m-%d')
+        except:
+            pass
+    
+    # 处理MM/DD/YYYY格式
+    if re.match(r'^\d{1,2}/\d{1,2}/\d{4}$', date_str):
+        try:
+            parsed_date = pd.to_datetime(date_str, format='%m/%d/%Y')
+            if pd.notna(parsed_date):
+                return parsed_date.strftime('%Y-%m-%d')
+        except:
+            pass
+    
+    # 处理YYYYMMDD格式
+    if re.match(r'^\d{8}$', date_str):
+        try:
+            # 检查是否为有效的日期格式
+            year = int(date_str[:4])
+            month = int(date_str[4:6])
+            day = int(date_str[6:8])
+            # 验证日期有效性
+            datetime(year, month, day)
+            return f'{year:04d}-{month:02d}-{day:02d}'
+        except ValueError:
+            # 如果标准格式失败，尝试其他可能的格式
+            try:
+                # 尝试DDMMYYYY格式
+                day = int(date_str[:2])
+                month = int(date_str[2:4])
+                year = int(date_str[4:8])
+                datetime(year, month, day)
+                return f'{year:04d}-{month:02d}-{day:02d}'
+            except ValueError:
+                pass
+    
+    # 处理MMDD格式（假设当前年份）
+    if re.match(r'^\d{4}$', date_str) and len(date_str) == 4:
+        current_year = datetime.now().year
+        try:
+            month = int(date_str[:2])
+            day = int(date_str[2:])
+            return datetime(current_year, month, day).strftime('%Y-%m-%d')
+        except ValueError:
+            return None
+    
+    # 尝试标准格式解析（最后手段）
+    try:
+        # 使用pandas的灵活解析
+        parsed_date = pd.to_datetime(date_str, errors='coerce')
+        if pd.notna(parsed_date):
+            return parsed_date.strftime('%Y-%m-%d')
+    except:
+        pass
+    
+    # 如果所有方法都失败，返回None
+    return None
+
+
+def normalize_date_series(series):
+    """等价于 series.apply(normalize_date_format)，返回object列（'YYYY-MM-DD' 或 None）"""
+    codes, uniques = _factorize_objects(series)
+    text = pd.Series(uniques, dtype=object).map(str).str.strip()
+
+    # 主流格式整列处理：以 YYYY-MM-DD 开头（后面为空或空格）且日期有效，结果就是前10个字符
+    day = text.str[:10]
+    iso = text.str.match(ISO_DAY)
+    iso &= pd.to_datetime(day.where(iso), format='%Y-%m-%d', errors='coerce').notna()
+
+    values = np.empty(len(uniques) + 1, dtype=object)   # 最后一位对应空值（编码-1），结果为None
+    values[:-1][iso.to_numpy()] = day[iso].to_numpy()
+    for i in np.flatnonzero(~iso.to_numpy()):
+        values[i] = normalize_date_format(uniques[i])
+    return pd.Series(values[codes], index=series.index, name=series.name, dtype=object)
+
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报表数据列声明
+- 所有报表脚本从这里生成Daysales的查询列（不再 SELECT *）
+- 每列声明类型和是否必需，统一做列校验
+- 实际列清单取自 schema_registry 的登记结果；可选列可声明关键词，
+  表中名称包含关键词的列（如 卖家备注、订单备注、仓库名称）一并投影，保持原列名
+- compact_frame 按声明的类型压缩DataFrame内存（低基数字符串转category）
+"""
+
+import pandas as pd
+
+from schema_registry import get_schema_registry
+
+# 列类型：category=低基数字符串, string=自由文本, float/int=数值, datetime=时间
+COLUMN_TYPES = ('category', 'string', 'float', 'int', 'datetime')
+
+
+class Column:
+    """单列声明"""
+
+    def __init__(self, name, dtype, required=True, description='', keywords=()):
+        if dtype not in COLUMN_TYPES:
+            raise ValueError(f"未知列类型: {dtype}")
+        self.name = name
+        self.dtype = dtype
+        self.required = required
+        self.description = description
+        # 列名包含任一关键词（不区分大小写）的列也一并投影，只用于可选列
+        self.keywords = tuple(keywords)
+
+    def matches(self, column):
+        lowered = str(column).lower()
+        return any(keyword.lower() in lowered for keyword in self.keywords)
+
+    def __repr__(self):
+        return f"Column({self.name!r}, {self.dtype!r}, required={self.required})"
+
+
+class ReportSchema:
+    """单表列声明，负责生成投影列表和校验"""
+
+    def __init__(self, table, columns, version=1, registry=None):
+        self.table = table
+        self.columns = list(columns)
+        self.version = version
+        self._by_name = {col.name: col for col in self.columns}
+        # 不指定时使用进程级登记（get_schema_registry）
+        self.registry = registry
+
+    @property
+    def names(self):
+        return [col.name for col in self.columns]
+
+    @property
+    def required_names(self):
+        return [col.name for col in self.columns if col.required]
+
+    def columns_of_type(self, *dtypes):
+        return [col.name for col in self.columns if col.dtype in dtypes]
+
+    def dtype_of(self, name):
+        col = self._by_name.get(name)
+        return col.dtype if col else None
+
+    def missing_columns(self, columns):
+        """返回缺失的必需列"""
+        present = set(columns)
+        return [name for name in self.required_names if name not in present]
+
+    def available_columns(self, conn):
+        """远端表实际存在的列（取自表结构登记，过期后 LIMIT 0 复核）"""
+        registry = self.registry or get_schema_registry()
+        return registry.columns(conn, self.table)
+
+    def resolve_columns(self, conn):
+        """
+        返回本次查询要投影的列：必需列缺失时报错，可选列缺失时跳过；
+        可选列声明了关键词时，表中名称包含关键词的其它列也一并返回（按表中顺序）。
+        """
+        available = self.available_columns(conn)
+        missing = self.missing_columns(available)
+        if missing:
+            raise ValueError(f"{self.table} 缺少必要的列: {', '.join(missing)}")
+        present = set(available)
+        selected = [name for name in self.names if name in present]
+        matchers = [col for col in self.columns if not col.required and col.keywords]
+        selected.extend(name for name in available
+                        if name not in self._by_name and any(col.matches(name) for col in matchers))
+        return selected
+
+    def empty_frame(self):
+        """无数据时返回的空表：带全部声明列，后续按列取值、.dt/.str 访问不会报错"""
+        dtypes = {'datetime': 'datetime64[ns]', 'float': 'float64', 'int': 'int64'}
+        return pd.DataFrame({col.name: pd.Series(dtype=dtypes.get(col.dtype, object)) for col in self.columns})
+
+    def select_list(self, conn):
+        """生成 SELECT 列表，例如 `店铺`, `交易时间`, ..."""
+        return ', '.join(f"`{name}`" for name in self.resolve_columns(conn))
+
+
+# Daysales：报表实际使用的列（v2起按关键词投影备注/仓库类的同义列）
+DAYSALES_SCHEMA = ReportSchema('Daysales', [
+    Column('交易时间', 'datetime', description='下单/交易时间，按天分区的依据'),
+    Column('店铺', 'category', description='店铺名称，用于渠道归类和线上店铺过滤'),
+    Column('货品名称', 'category', description='货品名称，作为品类'),
+    Column('规格名称', 'category', description='规格名称，作为型号/单品'),
+    Column('分摊后总价', 'float', description='销售额'),
+    Column('实发数量', 'int', description='销量'),
+    Column('订单状态', 'category', description='过滤未付款/已取消/已退货'),
+    Column('仓库', 'category', required=False, description='菜鸟仓自流转用于识别天猫分销',
+           keywords=('仓库', 'warehouse')),
+    Column('客服备注', 'string', required=False, description='刷单剔除（卖家备注、商家备注、订单备注等）',
+           keywords=('备注',)),
+    Column('买家留言', 'string', required=False, description='刷单剔除（买家备注、客户留言、买家消息等）',
+           keywords=('留言', '买家消息')),
+    Column('备注', 'string', required=False, description='刷单剔除（特殊备注、说明等）', keywords=('备注', '说明')),
+    Column('订单编号', 'string', required=False, description='订单去重与排查'),
+], version=2)
+
+# 报表计算依赖的核心列（各脚本 check_required_columns 统一使用）
+CORE_COLUMNS = ['交易时间', '分摊后总价', '实发数量', '店铺', '货品名称', '规格名称']
+
+
+def missing_required_columns(df, required=None):
+    """校验DataFrame是否包含必需列，返回缺失列列表（为空表示通过）"""
+    required = required or CORE_COLUMNS
+    present = set(df.columns)
+    return [name for name in required if name not in present]
+
+
+# 加载后派生的低基数列
+DERIVED_CATEGORIES = ['渠道', '数据来源']
+
+
+def compact_frame(df, schema=DAYSALES_SCHEMA, extra_categories=DERIVED_CATEGORIES, max_category_ratio=0.5):
+    """
+    按列声明压缩DataFrame：
+    - datetime列解析一次为datetime64
+    - float列转float64（金额保持双精度，避免汇总误差），int列按取值范围向下转型
+    - 低基数字符串列转category（唯一值占比超过max_category_ratio时保持原样）
+    之后对category列分组时应使用 observed=True。
+    """
+    if df is None or df.empty:
+        return df
+    before = df.memory_usage(deep=True).sum()
+    df = df.copy(deep=False)
+
+    for col in schema.columns_of_type('datetime'):
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    for col in schema.columns_of_type('float'):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+
+    for col in schema.columns_of_type('int'):
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce')
+            if values.notna().all() and (values % 1 == 0).all():
+                df[col] = pd.to_numeric(values, downcast='integer')
+            else:
+                df[col] = values.astype('float32')
+
+    for col in schema.columns_of_type('category') + list(extra_categories):
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            if df[col].nunique(dropna=True) <= max(1, len(df) * max_category_ratio):
+                df[col] = df[col].astype('category')
+
+    after = df.memory_usage(deep=True).sum()
+    print(f"🗜️ 内存压缩: {before / 1024 / 1024:.1f}MB -> {after / 1024 / 1024:.1f}MB ({len(df)}行)")
+    return df
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报表SQL公共片段
+- 日期过滤统一生成半开区间：col >= '开始日' AND col < '结束日次日'
+- 不再使用 LIKE '2025-08-10%' / DATE(col) = ...，这两种写法无法使用时间列上的B-tree索引
+"""
+
+from datetime import datetime, timedelta
+
+
+def _parse_day(value):
+    """'YYYY-MM-DD' / 'YYYY-MM-DD HH:MM:SS' / datetime / date -> date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if hasattr(value, 'year') and hasattr(value, 'month') and hasattr(value, 'day'):
+        return value
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').date()
+
+
+def split_date_range(report_date):
+    """把 '2025-07-21至2025-07-27' 拆成 (开始, 结束)；单日返回 (日期, 日期)"""
+    if isinstance(report_date, str) and '至' in report_date:
+        start_date, end_date = report_date.split('至', 1)
+        return start_date.strip(), end_date.strip()
+    return report_date, report_date
+
+
+def date_range_predicate(time_col, start_date, end_date=None):
+    """
+    生成覆盖 [start_date, end_date] 整天的半开区间条件。
+    start_date 也可以直接传 '开始至结束' 格式。
+    """
+    if end_date is None:
+        start_date, end_date = split_date_range(start_date)
+    start_day = _parse_day(start_date)
+    next_day = _parse_day(end_date) + timedelta(days=1)
+    return (
+        f"{time_col} >= '{start_day.strftime('%Y-%m-%d')}' "
+        f"AND {time_col} < '{next_day.strftime('%Y-%m-%d')}'"
+    )
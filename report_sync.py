@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于水位线的增量同步
+- 每张表、每一天记录一条水位线（行数 + 最大时间 + 状态/金额校验值）
+- 远端水位线与本地不一致的日期才重新拉取，写入按天分区的本地存储
+- 已关闭日期上的退款、取消、改价不改变行数和最大时间，由校验值（按订单状态分组的行数和金额）识别
+- 报表脚本通过这里判断数据是否就绪并读取数据，不再单独执行COUNT(*)检查
+- 读取结果按表声明的列类型压缩内存（compact_frame），峰值内存在读取时就降下来
+
+用法（可在夜间预同步）:
+    python report_sync.py --days 62
+"""
+
+import os
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from day_partition_cache import CACHE_ROOT, DayPartitionCache, iter_days, _contiguous_runs
+from report_schema import DAYSALES_SCHEMA, compact_frame
+from report_sql import date_range_predicate
+from report_db import get_connection
+
+# 水位线目录（SQLite文件）
+CATALOG_PATH = os.path.join(CACHE_ROOT, 'report_store.db')
+
+# 需要同步的表及其分区时间字段
+# （HT_fenxiao 的时间列因脚本而异，由 schema_registry 解析后直接查询，不在这里同步）
+SYNC_TABLES = {
+    'Daysales': '交易时间',
+}
+
+# 校验值使用的 (状态列, 金额列)
+CHECKSUM_COLUMNS = {
+    'Daysales': ('订单状态', '分摊后总价'),
+}
+
+# 已声明列的表只拉取声明的列
+TABLE_SCHEMAS = {
+    'Daysales': DAYSALES_SCHEMA,
+}
+
+_PARTITIONS = {
+    table: DayPartitionCache(table, time_col, schema=TABLE_SCHEMAS.get(table))
+    for table, time_col in SYNC_TABLES.items()
+}
+
+# 本进程内已校验过的 (表, 日期)，避免同一次运行重复查询水位线
+_verified_days = {}
+
+
+def _catalog():
+    os.makedirs(os.path.dirname(CATALOG_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(CATALOG_PATH, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_watermarks (
+            table_name TEXT NOT NULL,
+            day TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            max_ts TEXT,
+            synced_at TEXT NOT NULL,
+            PRIMARY KEY (table_name, day)
+        )
+    """)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(sync_watermarks)")]
+    if 'checksum' not in columns:
+        # 旧目录没有校验值，补列后各日期按水位线不一致重新拉取一次
+        conn.execute("ALTER TABLE sync_watermarks ADD COLUMN checksum TEXT")
+    return conn
+
+
+def local_watermarks(table, start_date, end_date=None):
+    """读取本地记录的水位线 {day_str: (row_count, max_ts, checksum)}"""
+    days = iter_days(start_date, end_date)
+    conn = _catalog()
+    try:
+        rows = conn.execute(
+            "SELECT day, row_count, max_ts, checksum FROM sync_watermarks WHERE table_name = ? AND day >= ? AND day <= ?",
+            (table, days[0].strftime('%Y-%m-%d'), days[-1].strftime('%Y-%m-%d'))
+        ).fetchall()
+    finally:
+        conn.close()
+    return {day: (row_count, max_ts, checksum) for day, row_count, max_ts, checksum in rows}
+
+
+def remote_watermarks(conn, table, start_date, end_date=None):
+    """
+    一次聚合查询拿到区间内每天的水位线 {day_str: (row_count, max_ts, checksum)}。
+    按 (日期, 订单状态) 分组统计行数和金额，汇总成每天的校验值。
+    """
+    time_col = SYNC_TABLES[table]
+    status_col, amount_col = CHECKSUM_COLUMNS[table]
+    days = iter_days(start_date, end_date)
+    sql = (
+        f"SELECT DATE({time_col}) AS day, {status_col} AS status, COUNT(*) AS row_count, "
+        f"MAX({time_col}) AS max_ts, ROUND(SUM({amount_col}), 2) AS amount "
+        f"FROM {table} "
+        f"WHERE {date_range_predicate(time_col, days[0], days[-1])} "
+        f"GROUP BY DATE({time_col}), {status_col}"
+    )
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    groups = {}
+    for day, status, row_count, max_ts, amount in cursor.fetchall():
+        if day is None:
+            continue
+        groups.setdefault(str(day)[:10], []).append((str(status), int(row_count), str(max_ts), float(amount or 0)))
+    cursor.close()
+
+    result = {}
+    for day, rows in groups.items():
+        rows.sort()
+        digest = hashlib.sha1(repr([(status, count, round(amount, 2)) for status, count, _, amount in rows]).encode('utf-8'))
+        result[day] = (sum(row[1] for row in rows), max(row[2] for row in rows), digest.hexdigest()[:16])
+    return result
+
+
+def _save_watermarks(table, watermarks, dropped_days):
+    synced_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn = _catalog()
+    try:
+        conn.executemany(
+            "INSERT OR REPLACE INTO sync_watermarks (table_name, day, row_count, max_ts, checksum, synced_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(table, day, row_count, max_ts, checksum, synced_at)
+             for day, (row_count, max_ts, checksum) in watermarks.items()]
+        )
+        conn.executemany(
+            "DELETE FROM sync_watermarks WHERE table_name = ? AND day = ?",
+            [(table, day) for day in dropped_days]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def sync_range(table, start_date, end_date=None, connect=None):
+    """
+    增量同步 [start_date, end_date] 区间：只拉取水位线变化的日期。
+    返回该区间内的远端水位线 {day_str: (row_count, max_ts, checksum)}。
+    """
+    partitions = _PARTITIONS[table]
+    days = iter_days(start_date, end_date)
+    verified = _verified_days.setdefault(table, {})
+    if all(d.strftime('%Y-%m-%d') in verified for d in days):
+        return {d: verified[d] for d in (day.strftime('%Y-%m-%d') for day in days) if verified[d] is not None}
+
+    if connect is None:
+        raise ValueError(f"同步 {table} 需要提供数据库连接")
+
+    local = local_watermarks(table, start_date, end_date)
+    conn = connect()
+    try:
+        remote = remote_watermarks(conn, table, start_date, end_date)
+
+        changed_days = []
+        dropped_days = []
+        for day in days:
+            day_str = day.strftime('%Y-%m-%d')
+            if day_str in remote:
+                if local.get(day_str) != remote[day_str] or not partitions.has_partition(day):
+                    changed_days.append(day)
+            elif day_str in local or partitions.has_partition(day):
+                # 远端已没有该日数据（被清空），本地同步删除
+                dropped_days.append(day_str)
+                partitions.drop_partition(day)
+
+        fetched_rows = 0
+        for run_start, run_end in _contiguous_runs(changed_days):
+            df_run = partitions.fetch_remote(conn, run_start, run_end)
+            fetched_rows += len(df_run)
+            for day, part in partitions.split_by_day(df_run).items():
+                partitions.write_partition(day, part)
+    finally:
+        conn.close()
+
+    _save_watermarks(table, {d.strftime('%Y-%m-%d'): remote[d.strftime('%Y-%m-%d')] for d in changed_days}, dropped_days)
+    for day in days:
+        day_str = day.strftime('%Y-%m-%d')
+        verified[day_str] = remote.get(day_str)
+
+    print(f"🔄 {table} 增量同步: {len(days)}天中 {len(changed_days)}天有变化 ({fetched_rows}行), 删除 {len(dropped_days)}天")
+    return remote
+
+
+def availability(table, start_date, end_date=None, connect=None):
+    """基于水位线判断区间是否有数据，返回 (是否有数据, 行数)"""
+    watermarks = sync_range(table, start_date, end_date, connect=connect)
+    count = sum(row_count for row_count, _, _ in watermarks.values())
+    return count > 0, count
+
+
+def load_range(table, start_date, end_date=None, connect=None):
+    """同步后从本地分区读取区间数据"""
+    watermarks = sync_range(table, start_date, end_date, connect=connect)
+    partitions = _PARTITIONS[table]
+    parts = []
+    for day in iter_days(start_date, end_date):
+        if day.strftime('%Y-%m-%d') in watermarks and partitions.has_partition(day):
+            parts.append(partitions.read_partition(day))
+    if not parts:
+        # 区间内没有数据：返回带声明列的空表，而不是没有列的 DataFrame
+        return partitions.schema.empty_frame() if partitions.schema is not None else pd.DataFrame()
+    df = pd.concat(parts, ignore_index=True)
+    if partitions.schema is None:
+        return df
+    # 读取后立即按声明类型压缩（店铺/品类/型号/订单状态转category），各报表的清洗和汇总都在压缩后的表上进行
+    return compact_frame(df, schema=partitions.schema, extra_categories=())
+
+
+def load_daysales(start_date, end_date=None, connect=None):
+    """读取Daysales指定日期（或区间）的数据，只回源水位线变化的日期"""
+    return load_range('Daysales', start_date, end_date, connect=connect)
+
+
+def daysales_availability(start_date, end_date=None, connect=None):
+    """替代各脚本的 COUNT(*) ... LIKE 检查"""
+    return availability('Daysales', start_date, end_date, connect=connect)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='增量同步Daysales到本地存储')
+    parser.add_argument('--days', type=int, default=62, help='同步最近N天（含今天）')
+    parser.add_argument('--tables', nargs='*', default=list(SYNC_TABLES), help='需要同步的表')
+    args = parser.parse_args()
+
+    end_day = datetime.now().date()
+    start_day = end_day - timedelta(days=args.days - 1)
+    for table in args.tables:
+        sync_range(table, start_day, end_day, connect=get_connection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报表HTML模板
+- 生成函数和报表脚本原来用 html += f'...' 逐段拼接，同样的行片段和内联样式散落在各处；
+  脚本顶层（全局变量）的 += 不能原地扩展，每追加一行就复制一次整段文本，单品行数上万时明显变慢
+- Template 沿用 str.format 的占位符写法（{name}、{amount:,}，字面花括号写成 {{ }}），
+  构造时编译成一个 f-string 函数，模块导入时编译一次，渲染时不再解析模板
+- HtmlWriter 把片段追加到列表，最后一次 join（benchmark_report_render.py 对比两种写法）
+- 没有引入 Jinja2：现有页面都是 f-string 拼出来的，同样语法的模板可以原样迁移，输出逐字节不变
+"""
+
+import keyword
+import string
+
+_FORMATTER = string.Formatter()
+
+
+class Template:
+    """
+    预编译模板。占位符只能是变量名（可带格式说明和 !r/!s 转换），渲染时按关键字传值：
+        ROW = Template('<li>{name}: ¥{amount:,}</li>')
+        ROW.render(name='冰箱', amount=12000)
+    """
+
+    def __init__(self, text, name='template'):
+        self.name = name
+        fields = []
+        pieces = []
+        for literal, field, spec, conversion in _FORMATTER.parse(text):
+            if literal:
+                pieces.append(repr(literal))
+            if field is None:
+                continue
+            if not field.isidentifier() or keyword.iskeyword(field):
+                raise ValueError(f"模板 {name} 的占位符只能是变量名: {{{field}}}")
+            if '{' in spec:
+                raise ValueError(f"模板 {name} 不支持嵌套的格式说明: {{{field}:{spec}}}")
+            if field not in fields:
+                fields.append(field)
+            body = field + (f'!{conversion}' if conversion else '') + (f':{spec}' if spec else '')
+            pieces.append('f' + repr('{' + body + '}'))
+        self.fields = tuple(fields)
+        # 相邻的字符串字面量在编译期合并成一个 f-string
+        params = f"*, {', '.join(fields)}" if fields else ''
+        source = f"def render({params}):\n    return ({' '.join(pieces) or repr('')})\n"
+        namespace = {}
+        exec(compile(source, f'<template {name}>', 'exec'), namespace)
+        self.render = namespace['render']
+
+    def __repr__(self):
+        return f"Template({self.name!r}, fields={self.fields})"
+
+
+class HtmlWriter:
+    """文本/HTML片段缓冲：write 追加文本，render 追加模板渲染结果，getvalue 一次拼接"""
+
+    def __init__(self):
+        self._parts = []
+        self.write = self._parts.append
+
+    def render(self, template, **values):
+        self._parts.append(template.render(**values))
+
+    def getvalue(self):
+        return ''.join(self._parts)
+
+
+def change_background(current, previous):
+    """本期大于/小于对比期时的行底色（绿/红），相等时无底色"""
+    if current > previous:
+        return 'background: #f0fff0;'
+    if current < previous:
+        return 'background: #fff0f0;'
+    return ''
+
+
+# ========== 日报/周报/月报共用的片段 ==========
+LIST_OPEN = '<ul style="margin-left: 20px; padding-left: 10px;">'
+LIST_CLOSE = '</ul>'
+EMPTY_NOTE = Template('<p style="margin-left: 20px; color: #666;">{text}</p>', 'EMPTY_NOTE')
+DETAILS_OPEN = Template('<details><summary>{title}</summary>', 'DETAILS_OPEN')
+DETAILS_CLOSE = '</details>'
+# 带底色的说明块（品类变化、环比监控、TOP单品）
+NOTE_BOX_OPEN = Template('<div style="margin-bottom: {margin}px; padding: {padding}px; background: {background}; border-radius: 4px;">', 'NOTE_BOX_OPEN')
+BOX_CLOSE = '</div>'
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远端表结构登记
+- HT_fenxiao、各库存表的字段名不固定，原做法每次运行都 DESCRIBE / SHOW TABLES / SELECT * LIMIT 10
+- 这里把表名和列清单连同结构哈希落盘，SCHEMA_TTL 内直接使用，过期后只用 SELECT * LIMIT 0 复核
+- 字段映射（例如"金额列用哪一列"）由 FieldRule 声明，基于登记的列清单计算
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from day_partition_cache import CACHE_ROOT
+
+SCHEMA_PATH = os.path.join(CACHE_ROOT, 'schema_registry.db')
+
+# 登记结果的信任时长（秒），过期后下一次使用时复核列清单
+SCHEMA_TTL = 6 * 3600
+
+# candidates: 按顺序优先使用的列名；keywords: 列名包含任一关键词即可；
+# positions: 以上都没有时按位置取列（取第一个存在的位置）；default: 最后的兜底列名（可为None）
+FieldRule = namedtuple('FieldRule', ['candidates', 'keywords', 'positions', 'default'], defaults=((), (), None))
+
+
+def schema_hash(columns):
+    return hashlib.sha1('\n'.join(columns).encode('utf-8')).hexdigest()[:16]
+
+
+def pick_column(columns, rule):
+    for name in rule.candidates:
+        if name in columns:
+            return name
+    for col in columns:
+        if any(kw in col for kw in rule.keywords):
+            return col
+    for position in rule.positions:
+        if len(columns) > position:
+            return columns[position]
+    return rule.default
+
+
+def resolve_fields(columns, rules):
+    """{别名: FieldRule} -> {别名: 列名}"""
+    return {alias: pick_column(columns, rule) for alias, rule in rules.items()}
+
+
+class SchemaRegistry:
+    """表名/列清单登记（本地SQLite），同一进程内只读写一次"""
+
+    def __init__(self, path=SCHEMA_PATH, ttl=SCHEMA_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS table_schema (
+                lookup TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                columns TEXT NOT NULL,
+                schema_hash TEXT NOT NULL,
+                checked_at REAL NOT NULL
+            )
+        """)
+        return conn
+
+    def _load(self, lookup):
+        conn = self._conn()
+        try:
+            row = conn.execute(
+                "SELECT table_name, columns, schema_hash, checked_at FROM table_schema WHERE lookup = ?", (lookup,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        table_name, columns, digest, checked_at = row
+        columns = json.loads(columns)
+        if schema_hash(columns) != digest:
+            return None
+        return {'table': table_name, 'columns': columns, 'hash': digest, 'checked_at': checked_at}
+
+    def _save(self, lookup, entry):
+        conn = self._conn()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO table_schema (lookup, table_name, columns, schema_hash, checked_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (lookup, entry['table'], json.dumps(entry['columns'], ensure_ascii=False), entry['hash'],
+                 entry['checked_at'])
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _probe_columns(db_conn, table):
+        """只取元数据，不返回数据行（MySQL/SQLite通用）"""
+        cursor = db_conn.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM `{table}` LIMIT 0")
+            return [desc[0] for desc in cursor.description]
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _find_table(db_conn, pattern):
+        cursor = db_conn.cursor()
+        try:
+            cursor.execute(f"SHOW TABLES LIKE '{pattern}'")
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        return row[0] if row else None
+
+    def _entry(self, db_conn, lookup, locate):
+        """locate(db_conn) -> 表名（None表示不存在）"""
+        with self._lock:
+            if lookup in self._memo:
+                return self._memo[lookup]
+            try:
+                entry = self._load(lookup)
+            except sqlite3.Error as e:
+                print(f"⚠️ 表结构登记不可用，本次直接查询: {e}")
+                entry = None
+
+            if entry is not None and time.time() - entry['checked_at'] < self.ttl:
+                self._memo[lookup] = entry
+                return entry
+
+            if entry is not None:
+                # 过期：用 LIMIT 0 复核，列清单没变只刷新时间
+                try:
+                    columns = self._probe_columns(db_conn, entry['table'])
+                except Exception:
+                    columns = None
+                if columns is not None and schema_hash(columns) == entry['hash']:
+                    entry['checked_at'] = time.time()
+                    self._store(lookup, entry)
+                    return entry
+                print(f"🔄 {entry['table']} 表结构已变化，重新登记")
+
+            table = locate(db_conn)
+            if table is None:
+                return None
+            columns = self._probe_columns(db_conn, table)
+            entry = {'table': table, 'columns': columns, 'hash': schema_hash(columns), 'checked_at': time.time()}
+            self._store(lookup, entry)
+            print(f"📋 登记表结构 {table}: {columns}")
+            return entry
+
+    def _store(self, lookup, entry):
+        self._memo[lookup] = entry
+        try:
+            self._save(lookup, entry)
+        except sqlite3.Error as e:
+            print(f"⚠️ 保存表结构登记失败: {e}")
+
+    def columns(self, db_conn, table):
+        """返回表的列清单"""
+        entry = self._entry(db_conn, table, lambda _: table)
+        return entry['columns']
+
+    def find_table(self, db_conn, pattern):
+        """等价于 SHOW TABLES LIKE pattern 取第一个表名，没有时返回None"""
+        entry = self._entry(db_conn, f"LIKE:{pattern}", lambda conn: self._find_table(conn, pattern))
+        return entry['table'] if entry else None
+
+    def table_columns(self, db_conn, pattern):
+        """返回 (表名, 列清单)；表不存在时返回 (None, [])"""
+        entry = self._entry(db_conn, f"LIKE:{pattern}", lambda conn: self._find_table(conn, pattern))
+        return (entry['table'], entry['columns']) if entry else (None, [])
+
+    def resolve(self, db_conn, table, rules):
+        """按 FieldRule 在表的列清单上选出各字段对应的列"""
+        return resolve_fields(self.columns(db_conn, table), rules)
+
+    def invalidate(self, key=None):
+        """清除登记（key为表名或LIKE模式；None清除全部），查询因列变化失败时调用"""
+        with self._lock:
+            lookups = list(self._memo) if key is None else [key, f"LIKE:{key}"]
+            for lookup in lookups:
+                self._memo.pop(lookup, None)
+            try:
+                conn = self._conn()
+                try:
+                    if key is None:
+                        conn.execute("DELETE FROM table_schema")
+                    else:
+                        conn.executemany("DELETE FROM table_schema WHERE lookup = ?", [(k,) for k in (key, f"LIKE:{key}")])
+                    conn.commit()
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                print(f"⚠️ 清除表结构登记失败: {e}")
+
+
+# HT_fenxiao 字段（日报/周报/多事业部日报；月报的时间列见 HT_FENXIAO_CREATE_TIME_FIELDS）
+HT_FENXIAO_FIELDS = {
+    'amount': FieldRule(['用户实际支付总额'], ['金额', '实付', '支付'], default='用户实际支付金额'),
+    'shop': FieldRule(['分销商店铺名称'], ['店铺', '商店'], default='分销商店铺名称'),
+    'status': FieldRule(['订单状态'], ['状态', '订单'], default='订单状态'),
+    'time': FieldRule(['采购单支付时间'], ['时间', '支付'], default='采购单支付时间'),
+    'product': FieldRule(['产品名称'], ['产品', '名称'], default='产品名称'),
+    'qty': FieldRule(['采购数量'], ['数量', '采购数量'], default='采购数量'),
+}
+# 月报：采购单支付时间为空，优先使用订单创建时间
+HT_FENXIAO_CREATE_TIME_FIELDS = dict(
+    HT_FENXIAO_FIELDS, time=FieldRule(['订单创建时间'], ['时间', '支付'], default='订单创建时间')
+)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_schema_registry():
+    """进程级表结构登记"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SchemaRegistry()
+        return _registry
+
+
+def reset_schema_registry():
+    global _registry
+    with _registry_lock:
+        _registry = None
@@ -53,11 +53,11 @@ def test_trend_chart():
     
     try:
         # 导入趋势图函数
-        from 整体月报数据 import generate_sales_trend_chart_html
+        from 整体月报数据 import generate_sales_trend_chart_html_simple
         
         # 生成趋势图HTML
         print("🔧 正在生成趋势图HTML...")
-        html = generate_sales_trend_chart_html(
+        html = generate_sales_trend_chart_html_simple(
             df_test, amount_col, qty_col, CATEGORY_COL, SHOP_COL, MODEL_COL, category_icons
         )
         
@@ -19,6 +19,11 @@ import time
 import subprocess
 import sys
 
+# 刷单剔除规则、表结构登记与上级目录的报表脚本共用
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from brushing_rules import REMARK_RULES
+from schema_registry import get_schema_registry
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -110,7 +115,7 @@ class InventoryAnalyzer:
             # 构建批量查询
             spec_names_str = "','".join(spec_names)
             
-            # 查询销售数据，使用整体日报数据.py的刷单剔除逻辑
+            # 查询销售数据，刷单剔除条件与整体日报共用 brushing_rules.REMARK_RULES
             query = f"""
             SELECT 
                 规格名称,
@@ -126,7 +131,7 @@ class InventoryAnalyzer:
             AND 交易时间 BETWEEN '{start_date}' AND '{end_date}'
             AND 实发数量 > 0
             AND 分摊后总价 > 0
-            AND (客服备注 IS NULL OR 客服备注 NOT LIKE '%抽纸%' AND 客服备注 NOT LIKE '%纸巾%' AND 客服备注 != '不发货')
+            AND {REMARK_RULES.sql_predicate()}
             AND (订单状态 IS NULL OR 订单状态 NOT IN ('未付款', '已取消'))
             AND (店铺 LIKE '%京东%' OR 店铺 LIKE '%天猫%' OR 店铺 LIKE '%拼多多%' OR 店铺 LIKE '%抖音%' OR 店铺 LIKE '%卡萨帝%')
             """
@@ -323,22 +328,14 @@ class InventoryAnalyzer:
             return pd.DataFrame()
         
         try:
-            # 获取所有表格
-            cursor = self.date_connection.cursor()
-            cursor.execute("SHOW TABLES LIKE '%jinrongstore%'")
-            tables = cursor.fetchall()
+            # 表名和列清单登记在本地（见 schema_registry），不再每次 SHOW TABLES / DESCRIBE
+            table_name, columns = get_schema_registry().table_columns(self.date_connection, '%jinrongstore%')
             
-            if not tables:
+            if not table_name:
                 logger.warning("未找到jinrongstore相关表格")
                 return pd.DataFrame()
             
-            table_name = tables[0][0]
-            logger.info(f"找到jinrongstore表格: {table_name}")
-            
-            # 获取表结构
-            cursor.execute(f"DESCRIBE `{table_name}`")
-            columns = [col[0] for col in cursor.fetchall()]
-            logger.info(f"jinrongstore表格列: {columns}")
+            logger.info(f"找到jinrongstore表格: {table_name}，列: {columns}")
             
             # 精确查找列名
             model_col = '型号'
@@ -404,27 +401,19 @@ class InventoryAnalyzer:
             return pd.DataFrame()
         
         try:
-            # 获取所有表格
-            cursor = self.date_connection.cursor()
-            cursor.execute("SHOW TABLES LIKE '%rrsstore%'")
-            tables = cursor.fetchall()
+            # 表名和列清单登记在本地（见 schema_registry），不再每次 SHOW TABLES / DESCRIBE
+            table_name, columns = get_schema_registry().table_columns(self.date_connection, '%rrsstore%')
             
-            if not tables:
+            if not table_name:
                 logger.warning("未找到rrsstore相关表格")
                 return pd.DataFrame()
             
-            table_name = tables[0][0]
-            logger.info(f"找到rrsstore表格: {table_name}")
+            logger.info(f"找到rrsstore表格: {table_name}，列: {columns}")
             
             # 精确使用指定的列名
             model_col = '商品编码'
             quantity_col = '可用库存数量'
             
-            # 获取表结构验证
-            cursor.execute(f"DESCRIBE `{table_name}`")
-            columns = [col[0] for col in cursor.fetchall()]
-            logger.info(f"rrsstore表格列: {columns}")
-            
             # 如果指定列不存在，使用实际存在的列
             if model_col not in columns:
                 model_col = '社会化物料编码'  # 备选
@@ -489,27 +478,14 @@ class InventoryAnalyzer:
             return pd.DataFrame()
         
         try:
-            # 获取所有表格
-            cursor = self.date_connection.cursor()
-            cursor.execute("SHOW TABLES LIKE '%tongstore%'")
-            tables = cursor.fetchall()
+            # 表名和列清单登记在本地（见 schema_registry），不再每次 SHOW TABLES / DESCRIBE
+            table_name, columns = get_schema_registry().table_columns(self.date_connection, '%tongstore%')
             
-            if not tables:
+            if not table_name:
                 logger.warning("未找到tongstore相关表格")
                 return pd.DataFrame()
             
-            table_name = tables[0][0]
-            logger.info(f"找到tongstore表格: {table_name}")
-            
-            # 获取前10行数据来分析结构
-            query_sample = f"SELECT * FROM `{table_name}` LIMIT 10"
-            df_sample = pd.read_sql(query_sample, self.date_connection)
-            
-            logger.info(f"tongstore数据预览: \n{df_sample.to_string()}")
-            
-            # 根据实际数据结构确定列名
-            columns = df_sample.columns.tolist()
-            logger.info(f"tongstore所有列: {columns}")
+            logger.info(f"找到tongstore表格: {table_name}，列: {columns}")
             
             # 根据数据预览，确定正确的列名
             # 从预览数据看，商品名称在__EMPTY_1列，数量在__EMPTY_2列
@@ -577,27 +553,19 @@ class InventoryAnalyzer:
             return pd.DataFrame()
         
         try:
-            # 获取所有表格
-            cursor = self.date_connection.cursor()
-            cursor.execute("SHOW TABLES LIKE '%jdstore%'")
-            tables = cursor.fetchall()
+            # 表名和列清单登记在本地（见 schema_registry），不再每次 SHOW TABLES / DESCRIBE
+            table_name, columns = get_schema_registry().table_columns(self.date_connection, '%jdstore%')
             
-            if not tables:
+            if not table_name:
                 logger.warning("未找到jdstore相关表格")
                 return pd.DataFrame()
             
-            table_name = tables[0][0]
-            logger.info(f"找到jdstore表格: {table_name}")
+            logger.info(f"找到jdstore表格: {table_name}，列: {columns}")
             
             # 精确使用指定的列名
             model_col = '事业部商品编码'
             quantity_col = '可用库存'
             
-            # 获取表结构验证
-            cursor.execute(f"DESCRIBE `{table_name}`")
-            columns = [col[0] for col in cursor.fetchall()]
-            logger.info(f"jdstore表格列: {columns}")
-            
             # 验证列是否存在
             if model_col not in columns or quantity_col not in columns:
                 logger.warning("jdstore表格中缺少必要列")
@@ -653,22 +621,14 @@ class InventoryAnalyzer:
             return {}
         
         try:
-            # 获取所有表格
-            cursor = self.date_connection.cursor()
-            cursor.execute("SHOW TABLES LIKE '%matchstore%'")
-            tables = cursor.fetchall()
+            # 表名和列清单登记在本地（见 schema_registry），不再每次 SHOW TABLES / DESCRIBE
+            table_name, columns = get_schema_registry().table_columns(self.date_connection, '%matchstore%')
             
-            if not tables:
+            if not table_name:
                 logger.warning("未找到matchstore相关表格")
                 return {}
             
-            table_name = tables[0][0]
-            logger.info(f"找到matchstore表格: {table_name}")
-            
-            # 获取表结构
-            cursor.execute(f"DESCRIBE `{table_name}`")
-            columns = [col[0] for col in cursor.fetchall()]
-            logger.info(f"matchstore表格列: {columns}")
+            logger.info(f"找到matchstore表格: {table_name}，列: {columns}")
             
             # 使用规格名称作为最终产品名，并建立映射关系
             mapping = {}
@@ -963,17 +923,13 @@ class InventoryAnalyzer:
             return {}
         
         try:
-            # 获取matchstore表格
-            cursor = self.date_connection.cursor()
-            cursor.execute("SHOW TABLES LIKE '%matchstore%'")
-            tables = cursor.fetchall()
+            # 表名和列清单登记在本地（见 schema_registry），不再每次 SHOW TABLES / DESCRIBE
+            table_name, columns = get_schema_registry().table_columns(self.date_connection, '%matchstore%')
             
-            if not tables:
+            if not table_name:
                 logger.warning("未找到matchstore相关表格")
                 return {}
             
-            table_name = tables[0][0]
-            
             # 获取品类映射
             query = f"""
             SELECT 规格名称, 品类
@@ -16,6 +16,25 @@ import time
 import subprocess
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
+import sys
+
+# 表结构登记与上级目录的报表脚本共用
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schema_registry import FieldRule, get_schema_registry
+
+# 各库存表的字段选择：优先列名 -> 按位置兜底（与原 DESCRIBE 后的判断一致）
+RRS_FIELDS = {'stock': FieldRule(['可用库存', '可用库存数量', '库存'], positions=(1, 0))}
+TONG_FIELDS = {
+    'name': FieldRule(['商品名称', '名称'], positions=(1, 0)),
+    'stock': FieldRule(['可用库存', '库存'], positions=(2, 1)),
+}
+MATCH_FIELDS = {
+    'spec': FieldRule(['规格名称'], positions=(0,), default='规格名称'),
+    'model': FieldRule(['型号'], positions=(1,), default='型号'),
+    'name': FieldRule(['商品名称'], positions=(2,), default='商品名称'),
+    'jd_code': FieldRule(['事业部商品编码'], positions=(3,), default='事业部商品编码'),
+    'code': FieldRule(['商品编码'], positions=(4,), default='商品编码'),
+}
 
 # 配置日志
 logging.basicConfig(
@@ -135,21 +154,10 @@ class InventoryProcessor:
             store_data['jinrongstore'] = pd.read_sql(sql_jinrong, self.date_connection)
             logger.info(f"jinrongstore获取到 {len(store_data['jinrongstore'])} 条记录")
             
-            # 先检查rrsstore表结构
-            cursor = self.date_connection.cursor()
-            cursor.execute("DESCRIBE rrsstore")
-            rrs_columns = [row[0] for row in cursor.fetchall()]
-            logger.info(f"rrsstore表字段: {rrs_columns}")
-            
-            # 根据实际字段名构建SQL
-            if '可用库存' in rrs_columns:
-                stock_col = '可用库存'
-            elif '可用库存数量' in rrs_columns:
-                stock_col = '可用库存数量'
-            elif '库存' in rrs_columns:
-                stock_col = '库存'
-            else:
-                stock_col = rrs_columns[1] if len(rrs_columns) > 1 else rrs_columns[0]
+            # rrsstore/tongstore/matchstore 字段名不固定，列清单登记在本地（见 schema_registry）
+            registry = get_schema_registry()
+            stock_col = registry.resolve(self.date_connection, 'rrsstore', RRS_FIELDS)['stock']
+            logger.info(f"rrsstore库存字段: {stock_col}")
             
             sql_rrs = f"""
             SELECT 
@@ -161,25 +169,9 @@ class InventoryProcessor:
             logger.info(f"rrsstore获取到 {len(store_data['rrsstore'])} 条记录")
             
             # 获取tongstore数据（跳过第一行）
-            # 先检查tongstore表结构
-            cursor.execute("DESCRIBE tongstore")
-            tong_columns = [row[0] for row in cursor.fetchall()]
-            logger.info(f"tongstore表字段: {tong_columns}")
-            
-            # 根据实际字段名构建SQL
-            if '商品名称' in tong_columns:
-                name_col = '商品名称'
-            elif '名称' in tong_columns:
-                name_col = '名称'
-            else:
-                name_col = tong_columns[1] if len(tong_columns) > 1 else tong_columns[0]
-            
-            if '可用库存' in tong_columns:
-                stock_col = '可用库存'
-            elif '库存' in tong_columns:
-                stock_col = '库存'
-            else:
-                stock_col = tong_columns[2] if len(tong_columns) > 2 else tong_columns[1]
+            tong_fields = registry.resolve(self.date_connection, 'tongstore', TONG_FIELDS)
+            name_col, stock_col = tong_fields['name'], tong_fields['stock']
+            logger.info(f"tongstore字段: {tong_fields}")
             
             sql_tong = f"""
             SELECT 
@@ -202,36 +194,10 @@ class InventoryProcessor:
             logger.info(f"jdstore获取到 {len(store_data['jdstore'])} 条记录")
             
             # 获取matchstore数据
-            # 先检查matchstore表结构
-            cursor.execute("DESCRIBE matchstore")
-            match_columns = [row[0] for row in cursor.fetchall()]
-            logger.info(f"matchstore表字段: {match_columns}")
-            
-            # 根据实际字段名构建SQL
-            if '规格名称' in match_columns:
-                spec_col = '规格名称'
-            else:
-                spec_col = match_columns[0] if match_columns else '规格名称'
-            
-            if '型号' in match_columns:
-                model_col = '型号'
-            else:
-                model_col = match_columns[1] if len(match_columns) > 1 else '型号'
-            
-            if '商品名称' in match_columns:
-                name_col = '商品名称'
-            else:
-                name_col = match_columns[2] if len(match_columns) > 2 else '商品名称'
-            
-            if '事业部商品编码' in match_columns:
-                jd_code_col = '事业部商品编码'
-            else:
-                jd_code_col = match_columns[3] if len(match_columns) > 3 else '事业部商品编码'
-            
-            if '商品编码' in match_columns:
-                code_col = '商品编码'
-            else:
-                code_col = match_columns[4] if len(match_columns) > 4 else '商品编码'
+            match_fields = registry.resolve(self.date_connection, 'matchstore', MATCH_FIELDS)
+            logger.info(f"matchstore字段: {match_fields}")
+            spec_col, model_col, name_col = match_fields['spec'], match_fields['model'], match_fields['name']
+            jd_code_col, code_col = match_fields['jd_code'], match_fields['code']
             
             sql_match = f"""
             SELECT 
@@ -247,6 +213,9 @@ class InventoryProcessor:
             
         except Exception as e:
             logger.error(f"获取Date数据库数据失败: {e}")
+            # 字段可能已变化，下次查询前重新登记
+            for table in ('rrsstore', 'tongstore', 'matchstore'):
+                get_schema_registry().invalidate(table)
         
         return store_data
     
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成 Daysales / HT_fenxiao / fenxiaochanpin 数据
+- 店铺、货品、规格名称沿用线上真实命名习惯（京东/天猫/拼多多/抖音/卡萨帝/小红书，及线下门店）
+- 包含刷单备注（抽纸/纸巾/不发货）、未付款/已取消订单、菜鸟仓自流转仓库等报表会处理的情况
+- 固定随机种子，规模可配置（每月1万/10万/100万行），用于可复现的性能基准
+
+用法:
+    python synthetic_data.py --rows-per-month 100000 --start 2025-07-01 --end 2025-08-31 --out report_bench.db
+    REPORT_DB_BACKEND=sqlite REPORT_DB_PATH=report_bench.db REPORT_CACHE_DIR=cache_bench python 整体月报数据.py
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from offline_backend import write_tables
+
+SHOPS = [
+    '京东海尔冰箱自营旗舰店', '京东海尔洗衣机自营旗舰店', '京东海尔空调官方旗舰店', '京东卡萨帝自营旗舰店',
+    '天猫海尔官方旗舰店', '天猫海尔冰箱旗舰店', '天猫统帅官方旗舰店', '淘宝海尔智家企业店',
+    '拼多多海尔官方旗舰店', '拼多多海尔家电专卖店', '抖音海尔官方旗舰店', '抖音卡萨帝官方旗舰店',
+    '卡萨帝官方旗舰店', '小红书海尔官方店', '苏宁易购海尔旗舰店', '国美海尔官方旗舰店',
+    '青岛市北区海尔专卖店', '济南历下海尔体验店',
+]
+# 各店铺的出单权重（线上大店为主，线下门店少量）
+SHOP_WEIGHTS = [9, 8, 7, 4, 9, 6, 3, 2, 6, 3, 5, 2, 3, 1, 1, 1, 1, 1]
+
+# 货品名称 -> (规格名称前缀, 价格区间)
+PRODUCTS = {
+    '冰箱': (['BCD-510WGHTD14S8U1', 'BCD-470WGHTDE9S9U1', 'BCD-258WDPD', 'BCD-621WGHSS19S8U1'], (1299, 8999)),
+    '冷柜': (['BC/BD-203HCD', 'BC/BD-302HEM', 'SC-339'], (899, 2999)),
+    '洗衣机': (['EG100MATE35S', 'XQG100-HBD14126L', 'EG10012B509G', 'MATE81U1'], (999, 6999)),
+    '家用空调': (['KFR-35GW/B1KBB81U1', 'KFR-72LW/81@U1-Ja', 'KFR-26GW/01KGC81U1'], (1999, 9999)),
+    '商用空调': (['RFC335MXSAVA(G)', 'KFRd-120LW/51BAC12'], (6999, 29999)),
+    '热水器': (['EC6001-MC3U1', 'JSQ31-16WN5S', 'ES60H-GD5(1)'], (799, 4999)),
+    '厨电': (['CXW-219-E900T12', 'JZT-Q2BE(12T)', 'ZQD90F-12LCJ'], (999, 5999)),
+    '洗碗机': (['EYW152286BK', 'EYBW142286GGU1'], (2999, 7999)),
+    '净水': (['HRO1H75-2U1', 'HKC3000-R793D2U1'], (999, 3999)),
+}
+PRODUCT_WEIGHTS = [10, 2, 9, 6, 1, 4, 3, 2, 2]
+
+ORDER_STATUSES = ['已完成', '已发货', '已付款', '未付款', '已取消', '已退货']
+STATUS_WEIGHTS = [70, 15, 8, 3, 3, 1]
+
+BRUSHING_REMARKS = ['抽纸', '纸巾', '不发货', '抽纸一包']
+NORMAL_REMARKS = ['', '', '', '', '加急发货', '顾客要求周末送货', '赠品已备注', '以旧换新']
+
+WAREHOUSES = ['海尔青岛中心仓', '海尔广州RDC', '海尔成都RDC', '京东亚洲一号仓', '菜鸟仓自流转']
+
+FENXIAO_SHOPS = ['海尔冰箱汇鑫专卖店', '统帅电器华北分销', '海尔家电恒达专营店', '卡萨帝京津分销', '海尔洗衣机鑫源专卖店']
+
+
+def _weights(values):
+    values = np.asarray(values, dtype=float)
+    return values / values.sum()
+
+
+def _days(start_date, end_date):
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _timestamps(rng, days, total_rows):
+    """按天分配行数（周末略高），每天内时间随机"""
+    day_weight = np.array([1.25 if d.weekday() >= 5 else 1.0 for d in days])
+    per_day = rng.multinomial(total_rows, day_weight / day_weight.sum())
+    base = np.repeat(np.array([np.datetime64(d, 's') for d in days]), per_day)
+    seconds = rng.integers(0, 86400, size=total_rows).astype('timedelta64[s]')
+    return np.sort(base + seconds)
+
+
+def _products(rng, rows):
+    categories = np.array(list(PRODUCTS))
+    category = rng.choice(categories, size=rows, p=_weights(PRODUCT_WEIGHTS))
+    model = np.empty(rows, dtype=object)
+    price = np.empty(rows, dtype=float)
+    for cat, (models, (low, high)) in PRODUCTS.items():
+        mask = category == cat
+        count = int(mask.sum())
+        model[mask] = rng.choice(np.array([f"海尔{m}" for m in models], dtype=object), size=count)
+        price[mask] = np.round(rng.uniform(low, high, size=count), 2)
+    return category, model, price
+
+
+def generate_daysales(start_date, end_date, rows_per_month=100000, seed=20250801):
+    """生成ERP订单明细（Daysales）"""
+    rng = np.random.default_rng(seed)
+    days = _days(start_date, end_date)
+    rows = max(1, int(rows_per_month * len(days) / 30))
+
+    timestamps = _timestamps(rng, days, rows)
+    shops = rng.choice(np.array(SHOPS, dtype=object), size=rows, p=_weights(SHOP_WEIGHTS))
+    category, model, price = _products(rng, rows)
+    qty = rng.choice([1, 1, 1, 1, 1, 1, 2, 2, 3], size=rows)
+
+    remarks = rng.choice(np.array(NORMAL_REMARKS, dtype=object), size=rows)
+    brushing = rng.random(rows) < 0.01
+    remarks[brushing] = rng.choice(np.array(BRUSHING_REMARKS, dtype=object), size=int(brushing.sum()))
+
+    warehouses = rng.choice(np.array(WAREHOUSES[:-1], dtype=object), size=rows)
+    tmall = np.char.find(shops.astype(str), '天猫') >= 0
+    self_flow = tmall & (rng.random(rows) < 0.1)
+    warehouses[self_flow] = '菜鸟仓自流转'
+
+    return pd.DataFrame({
+        '订单编号': [f"SO{seed % 1000:03d}{i:09d}" for i in range(rows)],
+        '交易时间': pd.Series(timestamps).dt.strftime('%Y-%m-%d %H:%M:%S'),
+        '店铺': shops,
+        '货品名称': category,
+        '规格名称': model,
+        '分摊后总价': np.round(price * qty, 2),
+        '实发数量': qty,
+        '订单状态': rng.choice(np.array(ORDER_STATUSES, dtype=object), size=rows, p=_weights(STATUS_WEIGHTS)),
+        '仓库': warehouses,
+        '客服备注': remarks,
+        '买家留言': '',
+        '备注': '',
+    })
+
+
+def generate_fenxiaochanpin(seed=20250801, coverage=0.8):
+    """分销产品映射表：产品名称 -> 规格名称/货品名称/品类（只覆盖部分产品，其余走兜底匹配）"""
+    rng = np.random.default_rng(seed + 1)
+    rows = []
+    for cat, (models, _) in PRODUCTS.items():
+        for model in models:
+            if rng.random() < coverage:
+                rows.append({
+                    '产品名称': f"海尔（Haier）{model} {cat}",
+                    '规格名称': f"海尔{model}",
+                    '货品名称': cat,
+                    '品类': cat,
+                })
+    return pd.DataFrame(rows)
+
+
+def generate_ht_fenxiao(start_date, end_date, rows_per_month=10000, seed=20250801):
+    """生成分销订单（HT_fenxiao）"""
+    rng = np.random.default_rng(seed + 2)
+    days = _days(start_date, end_date)
+    rows = max(1, int(rows_per_month * len(days) / 30))
+
+    paid = _timestamps(rng, days, rows)
+    created = paid - rng.integers(60, 3600, size=rows).astype('timedelta64[s]')
+    category, model, price = _products(rng, rows)
+    qty = rng.choice([1, 1, 1, 2, 5], size=rows)
+    product_names = np.array([f"海尔（Haier）{m[2:]} {c}" for m, c in zip(model, category)], dtype=object)
+
+    return pd.DataFrame({
+        '分销商店铺名称': rng.choice(np.array(FENXIAO_SHOPS, dtype=object), size=rows),
+        '订单状态': rng.choice(np.array(ORDER_STATUSES, dtype=object), size=rows, p=_weights(STATUS_WEIGHTS)),
+        '用户实际支付总额': np.round(price * qty * 0.95, 2),
+        '采购单支付时间': pd.Series(paid).dt.strftime('%Y-%m-%d %H:%M:%S'),
+        '订单创建时间': pd.Series(created).dt.strftime('%Y-%m-%d %H:%M:%S'),
+        '产品名称': product_names,
+        '采购数量': qty,
+    })
+
+
+def build_database(path, start_date, end_date, rows_per_month=100000, fenxiao_ratio=0.1, seed=20250801):
+    """生成全部表并写入SQLite文件（时间列建索引）"""
+    frames = {
+        'Daysales': generate_daysales(start_date, end_date, rows_per_month, seed),
+        'HT_fenxiao': generate_ht_fenxiao(start_date, end_date, int(rows_per_month * fenxiao_ratio), seed),
+        'fenxiaochanpin': generate_fenxiaochanpin(seed),
+    }
+    time_columns = {
+        'Daysales': ['交易时间'],
+        'HT_fenxiao': ['采购单支付时间', '订单创建时间'],
+    }
+    write_tables(path, frames, indexes=dict(time_columns, fenxiaochanpin=['产品名称']), datetime_columns=time_columns)
+    for table, df in frames.items():
+        print(f"📥 {table}: {len(df)} 行")
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成Daysales/HT_fenxiao数据到SQLite文件')
+    parser.add_argument('--rows-per-month', type=int, default=100000, help='Daysales每月行数（如10000/100000/1000000）')
+    parser.add_argument('--fenxiao-ratio', type=float, default=0.1, help='HT_fenxiao行数相对Daysales的比例')
+    parser.add_argument('--start', default=None, help='开始日期，默认上月1日')
+    parser.add_argument('--end', default=None, help='结束日期，默认昨天')
+    parser.add_argument('--seed', type=int, default=20250801)
+    parser.add_argument('--out', default='report_bench.db')
+    args = parser.parse_args()
+
+    yesterday = datetime.now().date() - timedelta(days=1)
+    end_date = args.end or yesterday.strftime('%Y-%m-%d')
+    start_date = args.start or (yesterday.replace(day=1) - timedelta(days=1)).replace(day=1).strftime('%Y-%m-%d')
+    print(f"🔧 生成 {start_date} 至 {end_date} 的合成数据，每月 {args.rows_per_month} 行 -> {args.out}")
+    build_database(args.out, start_date, end_date, args.rows_per_month, args.fenxiao_ratio, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试刷单剔除规则：掩码与原逐行判断一致，SQL条件与pandas掩码一致
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from brushing_rules import REMARK_RULES, DEPT_ERP_RULES, DEPT_FENXIAO_RULES
+from offline_backend import connect_sqlite, write_tables
+
+REMARKS = ['抽纸', '送抽纸一包', '纸巾', '不发货', ' 不发货 ', '完全=不发货', '刷单', 'TEST测试', '虚拟赠品',
+           '正常发货', '', None, float('nan'), 123]
+
+
+def legacy_remark_filter(df):
+    """整体日报原写法"""
+    remark = df['客服备注'].astype(str).fillna('')
+    return remark.str.contains('抽纸', na=False) | remark.str.contains('纸巾', na=False) | (remark == '不发货')
+
+
+def legacy_is_brushing(row, fields):
+    """多事业部日报原写法（is_brushing_order / is_brushing_fenxiao）"""
+    for field in fields:
+        if field in row.index and pd.notna(row[field]):
+            text = str(row[field]).strip()
+            if text in ['完全=不发货', '不发货']:
+                return True
+            if any(kw.lower() in text.lower() for kw in ['抽纸', '纸巾', '刷单', '测试', '虚拟']):
+                return True
+    return False
+
+
+def build_frame():
+    n = len(REMARKS)
+    return pd.DataFrame({
+        '客服备注': pd.Series(REMARKS, dtype=object),
+        '买家留言': pd.Series([None] * (n - 2) + ['测试单', '正常'], dtype=object),
+        '订单备注': pd.Series(list(reversed(REMARKS)), dtype=object),
+        '分摊后总价': range(n),
+    })
+
+
+def test_masks_match_legacy_filters():
+    df = build_frame()
+    mask, hits = REMARK_RULES.evaluate(df)
+    assert mask.tolist() == legacy_remark_filter(df).tolist()
+    assert hits == {'客服备注含抽纸/纸巾': 3, '客服备注为不发货': 1}
+
+    for rules, fields in [(DEPT_ERP_RULES, ['客服备注', '买家留言', '备注']),
+                          (DEPT_FENXIAO_RULES, ['订单备注', '买家留言', '备注'])]:
+        expected = df.apply(lambda row: legacy_is_brushing(row, fields), axis=1)
+        mask, _ = rules.evaluate(df)
+        assert mask.tolist() == expected.tolist(), rules.name
+
+    logs = []
+    filtered, removed = REMARK_RULES.apply(df, log=logs.append)
+    assert removed == 4 and len(filtered) == len(df) - 4 and len(logs) == 1
+    # 缺少备注列时不剔除
+    assert REMARK_RULES.apply(df[['分摊后总价']], log=logs.append)[1] == 0
+    print("✅ 刷单规则与原逐行判断一致")
+
+
+def test_sql_predicate_matches_mask():
+    df = build_frame()[['客服备注', '分摊后总价']]
+    df['客服备注'] = df['客服备注'].map(lambda v: v if isinstance(v, str) else None)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'remarks.db')
+        write_tables(path, {'Daysales': df})
+        conn = connect_sqlite(path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT 分摊后总价 FROM Daysales WHERE {REMARK_RULES.sql_predicate()} ORDER BY 分摊后总价")
+            kept_sql = [row[0] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    mask, _ = REMARK_RULES.evaluate(df)
+    assert kept_sql == df.loc[~mask.to_numpy(), '分摊后总价'].tolist()
+    print("✅ 刷单规则SQL条件与pandas掩码一致")
+
+
+if __name__ == "__main__":
+    test_masks_match_legacy_filters()
+    test_sql_predicate_matches_mask()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试日汇总：汇总后各维度金额/数量之和与明细一致
+"""
+
+import numpy as np
+import pandas as pd
+
+from daily_rollup import ROW_COUNT_COL, build_rollup
+from report_schema import compact_frame
+
+
+def sample_orders():
+    return pd.DataFrame({
+        '交易时间': ['2025-08-01 10:00:00', '2025-08-01 12:30:00', '2025-08-01 20:00:00',
+                 '2025-08-02 09:00:00', '2025-08-02 11:00:00'],
+        '店铺': ['京东自营旗舰店', '京东自营旗舰店', '京东-分销商A', '天猫官方旗舰店', '天猫官方旗舰店'],
+        '渠道': ['京东', '京东', '京东', '天猫', '天猫'],
+        '货品名称': ['冰箱', '冰箱', '冰箱', '洗衣机', '洗衣机'],
+        '规格名称': ['BCD-500', 'BCD-500', 'BCD-500', 'XQG100', 'XQG100'],
+        '分摊后总价': [3999.0, 4199.0, 3500.0, 2599.0, 2699.0],
+        '实发数量': [1, 1, 2, 1, 1],
+        '客服备注': ['', '', '', '', '加急'],
+        '数据来源': [np.nan, np.nan, '分销', np.nan, np.nan],
+    })
+
+
+def test_rollup_preserves_totals():
+    df = sample_orders()
+    for frame in (df, compact_frame(df)):
+        rollup = build_rollup(frame)
+        assert len(rollup) == 3
+        assert '客服备注' not in rollup.columns
+        assert rollup['分摊后总价'].sum() == df['分摊后总价'].sum()
+        assert rollup[ROW_COUNT_COL].sum() == len(df)
+        # ERP行（数据来源为空）与分销行分开汇总
+        fenxiao = rollup[rollup['数据来源'] == '分销']
+        assert fenxiao['实发数量'].sum() == 2
+        by_shop = rollup.groupby('店铺', observed=True)['分摊后总价'].sum()
+        assert by_shop['京东自营旗舰店'] == 3999.0 + 4199.0
+    print("✅ 日汇总金额/数量/行数与明细一致")
+
+
+if __name__ == "__main__":
+    test_rollup_preserves_totals()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试Daysales按天分区存储：分区读写、半开区间回源、列投影
+使用本地SQLite模拟MySQL，无需连接生产库
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+from day_partition_cache import DayPartitionCache
+from report_schema import Column, ReportSchema
+from report_sql import date_range_predicate
+from schema_registry import SchemaRegistry
+
+
+def create_source_db(path):
+    """创建模拟Daysales表"""
+    rows = [
+        {'交易时间': '2025-08-01 10:00:00', '店铺': '京东自营旗舰店', '分摊后总价': 3999, '实发数量': 1},
+        {'交易时间': '2025-08-01 21:30:00', '店铺': '天猫官方旗舰店', '分摊后总价': 2599, '实发数量': 1},
+        {'交易时间': '2025-08-02 09:15:00', '店铺': '拼多多海尔专卖店', '分摊后总价': 1299, '实发数量': 2},
+        {'交易时间': '2025-08-03 12:00:00', '店铺': '抖音海尔官方旗舰店', '分摊后总价': 899, '实发数量': 1},
+    ]
+    conn = sqlite3.connect(path)
+    pd.DataFrame(rows).to_sql('Daysales', conn, index=False)
+    conn.close()
+
+
+def test_partitions_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'source.db')
+        create_source_db(db_path)
+        cache = DayPartitionCache('Daysales', '交易时间', root=os.path.join(tmp, 'cache'))
+
+        conn = sqlite3.connect(db_path)
+        try:
+            df = cache.fetch_remote(conn, '2025-08-01', '2025-08-02')
+        finally:
+            conn.close()
+        # 半开区间：08-03 不在结果中
+        assert len(df) == 3
+
+        parts = cache.split_by_day(df)
+        assert [str(day) for day in parts] == ['2025-08-01', '2025-08-02']
+        for day, part in parts.items():
+            cache.write_partition(day, part)
+        assert cache.has_partition('2025-08-01') and not cache.has_partition('2025-08-03')
+        assert cache.read_partition('2025-08-01')['分摊后总价'].sum() == 3999 + 2599
+
+        cache.drop_partition('2025-08-01')
+        assert not cache.has_partition('2025-08-01')
+        assert cache.split_by_day(df.iloc[:0]) == {}
+        print("✅ 分区读写测试通过")
+
+
+def test_single_day_matches_like_query():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'source.db')
+        create_source_db(db_path)
+        cache = DayPartitionCache('Daysales', '交易时间', root=os.path.join(tmp, 'cache'))
+
+        conn = sqlite3.connect(db_path)
+        try:
+            df = cache.fetch_remote(conn, '2025-08-01', '2025-08-01')
+            expected = pd.read_sql("SELECT * FROM Daysales WHERE 交易时间 LIKE '2025-08-01%'", conn)
+        finally:
+            conn.close()
+        assert sorted(df['店铺']) == sorted(expected['店铺'])
+        print("✅ 单日范围查询与LIKE查询结果一致")
+
+
+def test_range_predicate_formats():
+    expected = "交易时间 >= '2025-07-21' AND 交易时间 < '2025-07-28'"
+    assert date_range_predicate('交易时间', '2025-07-21至2025-07-27') == expected
+    assert date_range_predicate('交易时间', '2025-07-21', '2025-07-27') == expected
+    assert date_range_predicate('交易时间', '2025-07-31') == "交易时间 >= '2025-07-31' AND 交易时间 < '2025-08-01'"
+    print("✅ 半开区间条件生成正确")
+
+
+def test_schema_projection():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'source.db')
+        create_source_db(db_path)
+        schema = ReportSchema('Daysales', [
+            Column('交易时间', 'datetime'),
+            Column('店铺', 'category'),
+            Column('分摊后总价', 'float'),
+            Column('客服备注', 'string', required=False),
+        ], registry=SchemaRegistry(path=os.path.join(tmp, 'schema.db')))
+        cache = DayPartitionCache('Daysales', '交易时间', root=os.path.join(tmp, 'cache'), schema=schema)
+        conn = sqlite3.connect(db_path)
+        try:
+            df = cache.fetch_remote(conn, '2025-08-01', '2025-08-02')
+        finally:
+            conn.close()
+        # 只拉取声明的列，缺失的可选列跳过
+        assert list(df.columns) == ['交易时间', '店铺', '分摊后总价']
+        assert cache.root.endswith('Daysales_v1')
+
+        # 没有数据时的空表仍带全部声明列
+        empty = schema.empty_frame()
+        assert empty.empty and list(empty.columns) == ['交易时间', '店铺', '分摊后总价', '客服备注']
+        assert empty['交易时间'].dt.date.tolist() == []
+
+        schema_missing = ReportSchema('Daysales', [Column('货品名称', 'category')],
+                                      registry=SchemaRegistry(path=os.path.join(tmp, 'schema.db')))
+        conn = sqlite3.connect(db_path)
+        try:
+            schema_missing.select_list(conn)
+            assert False, "缺少必需列时应报错"
+        except ValueError as e:
+            assert '货品名称' in str(e)
+        finally:
+            conn.close()
+        print("✅ 列投影测试通过")
+
+
+if __name__ == "__main__":
+    test_partitions_roundtrip()
+    test_single_day_matches_like_query()
+    test_range_predicate_formats()
+    test_schema_projection()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试关键词分类器：与重构前各报表函数的输出逐一对比（golden_classifier_labels.json）
+"""
+
+import json
+import os
+
+import pandas as pd
+
+import keyword_classifier as kc
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden_classifier_labels.json')
+MISSING_INPUTS = [None, float('nan'), 3]
+
+# 多事业部日报的渠道分组（与脚本中的 CHANNEL_GROUPS 一致）
+CHANNEL_GROUPS = {
+    "卡萨帝渠道": {"keywords": ["卡萨帝", "小红书"]},
+    "天猫渠道": {"keywords": ["天猫", "淘宝"]},
+    "京东渠道": {"keywords": ["京东"]},
+    "拼多多渠道": {"keywords": ["拼多多"]},
+    "抖音渠道": {"keywords": ["抖音", "快手"]},
+}
+BUSINESS_GROUPS = {
+    "空调事业部": {"keywords": ["空调"]},
+    "制冷事业部": {"keywords": ["冰箱", "冷柜"]},
+    "水联网事业部": {"keywords": ["热水器", "净水", "采暖"]},
+}
+DEPT_CHANNEL = kc.KeywordClassifier.from_groups(
+    CHANNEL_GROUPS, order=['卡萨帝渠道', '京东渠道', '天猫渠道', '拼多多渠道', '抖音渠道'], default='其他'
+)
+
+FUNCTIONS = {
+    'is_online_shop': kc.is_online_shop,
+    'classify_channel': kc.classify_channel,
+    'normalize_category': kc.normalize_category,
+    'categorize_product_for_fenxiao': kc.categorize_product_for_fenxiao,
+    'categorize_product_for_fenxiao_no_oven': kc.categorize_product_for_fenxiao_no_oven,
+    'force_categorize_product': kc.force_categorize_product,
+    'dept_force_categorize_product': kc.dept_force_categorize_product,
+    'dept_categorize_product': lambda name: (kc.DEPT_CATEGORY.classify(name) or '其他') if isinstance(name, str) else '其他',
+    'dept_classify_channel': DEPT_CHANNEL.classify,
+}
+
+
+def test_golden_labels():
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        golden = json.load(f)
+    values = golden['values']
+    assert set(golden['labels']) == set(FUNCTIONS)
+
+    for name, func in FUNCTIONS.items():
+        expected = golden['labels'][name]
+        actual = [func(value) for value in values]
+        diffs = [(v, a, e) for v, a, e in zip(values, actual, expected['values']) if a != e]
+        assert not diffs, f"{name}: {diffs[:5]}"
+        assert [func(value) for value in MISSING_INPUTS] == expected['missing'], name
+    print(f"✅ 分类结果与原函数一致: {len(FUNCTIONS)} 个函数 x {len(values)} 个值")
+
+
+def test_series_broadcast_and_overlaps():
+    series = pd.Series(['京东海尔自营', None, ' 天猫海尔', '京东海尔自营', '线下门店'])
+    assert kc.SHOP_CHANNEL.classify_series(series).tolist() == series.apply(kc.classify_channel).tolist()
+    assert kc.ONLINE_SHOP.mask(series).tolist() == [True, False, True, True, False]
+    assert kc.ONLINE_SHOP.mask(series).dtype == bool
+
+    # 重叠关键词: 'tcl' 中的 'l'、'商用空调' 与 '商用'
+    assert kc.dept_force_categorize_product('tcl') == '冰箱'
+    assert kc.force_categorize_product('商用空调 变频') == '商空空调'
+    assert kc.SHOP_CHANNEL.matching_labels('淘宝卡萨帝') == ['卡萨帝', '天猫']
+    print("✅ 整列分类与重叠关键词测试通过")
+
+
+def test_membership_matches_row_filters():
+    shops = pd.Series(['京东卡萨帝旗舰店', '天猫海尔官方旗舰店', '淘宝小红书店', None, '快手海尔', '线下门店'] * 3)
+    categories = pd.Series(['空调冰箱套装', '冷柜', None, '热水器', '洗衣机', float('nan')] * 3)
+
+    channel = kc.KeywordClassifier([
+        kc.Rule(name, conf['keywords'], none_of=CHANNEL_GROUPS['卡萨帝渠道']['keywords'] if name == '天猫渠道' else ())
+        for name, conf in CHANNEL_GROUPS.items()
+    ], default=None)
+    matrix = channel.membership(shops)
+    assert list(matrix.columns) == list(CHANNEL_GROUPS) and (matrix.index == shops.index).all()
+    for name, conf in CHANNEL_GROUPS.items():
+        expected = shops.apply(lambda x: any(kw in str(x) for kw in conf['keywords']))
+        if name == '天猫渠道':
+            expected &= ~shops.apply(lambda x: any(kw in str(x) for kw in CHANNEL_GROUPS['卡萨帝渠道']['keywords']))
+        assert matrix[name].tolist() == expected.tolist(), name
+
+    matrix = kc.KeywordClassifier.from_groups(BUSINESS_GROUPS, default=None).membership(categories)
+    for name, conf in BUSINESS_GROUPS.items():
+        expected = categories.apply(lambda x: any(kw in str(x) for kw in conf['keywords']))
+        assert matrix[name].tolist() == expected.tolist(), name
+    assert matrix.iloc[0].tolist() == [True, True, False]   # 同时属于两个事业部
+    print("✅ 分组成员矩阵与逐行筛选一致")
+
+
+def test_membership_empty_previous_period():
+    channel = kc.KeywordClassifier.from_groups(CHANNEL_GROUPS, default=None)
+    # 同期无数据：空表不带任何列，仍返回列齐全的全False矩阵，按分组取行得到空表
+    df_prev = pd.DataFrame()
+    matrix = channel.membership(None, index=df_prev.index)
+    assert list(matrix.columns) == list(CHANNEL_GROUPS) and matrix.empty
+    assert df_prev[matrix['京东渠道'].to_numpy()].empty
+    # 带列的空表同样对齐
+    empty = pd.Series([], dtype=object, index=pd.RangeIndex(0))
+    matrix = channel.membership(empty)
+    assert list(matrix.columns) == list(CHANNEL_GROUPS) and len(matrix) == 0
+    # 缺列时按索引对齐、整行为False
+    index = pd.Index([3, 5, 8])
+    matrix = channel.membership(None, index=index)
+    assert (matrix.index == index).all() and not matrix.to_numpy().any()
+    print("✅ 同期无数据时成员矩阵为空且列齐全")
+
+
+if __name__ == "__main__":
+    test_golden_labels()
+    test_series_broadcast_and_overlaps()
+    test_membership_matches_row_filters()
+    test_membership_empty_previous_period()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试离线SQLite后端与合成数据：报表用到的MySQL写法可以在本地文件上执行，时间列读出为datetime
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from offline_backend import connect_sqlite
+from report_sql import date_range_predicate
+from synthetic_data import build_database
+
+
+def test_synthetic_database_queries():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        frames = build_database(path, '2025-07-01', '2025-07-10', rows_per_month=3000)
+        daysales = frames['Daysales']
+        assert (daysales['仓库'] == '菜鸟仓自流转').any()
+        assert daysales['客服备注'].isin(['抽纸', '纸巾', '不发货', '抽纸一包']).any()
+        assert not daysales.loc[daysales['仓库'] == '菜鸟仓自流转', '店铺'].str.contains('京东').any()
+
+        conn = connect_sqlite(path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DESCRIBE HT_fenxiao")
+            columns = [row[0] for row in cursor.fetchall()]
+            assert '采购单支付时间' in columns and '用户实际支付总额' in columns
+
+            cursor.execute("SHOW TABLES LIKE 'fenxiaochanpin'")
+            assert cursor.fetchone() is not None
+
+            cursor.execute("SELECT 规格名称, 货品名称 FROM fenxiaochanpin WHERE 产品名称 LIKE %s LIMIT 1", ('%冰箱%',))
+            assert cursor.fetchone()[1] == '冰箱'
+
+            df = pd.read_sql(f"SELECT * FROM Daysales WHERE {date_range_predicate('交易时间', '2025-07-03')}", conn)
+            expected = daysales[daysales['交易时间'].str.startswith('2025-07-03')]
+            assert len(df) == len(expected) > 0
+            # 时间列与pymysql一样读出为datetime，.dt 可直接使用
+            assert pd.api.types.is_datetime64_any_dtype(df['交易时间'])
+            assert (df['交易时间'].dt.strftime('%Y-%m-%d %H:%M:%S') == expected['交易时间'].to_numpy()).all()
+        finally:
+            conn.close()
+    print("✅ 离线SQLite后端测试通过")
+
+
+if __name__ == "__main__":
+    test_synthetic_database_queries()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试本期/对比期环比：合并结果、增长/下滑名单与原来逐行查找的写法一致
+"""
+
+import numpy as np
+import pandas as pd
+
+from period_compare import (
+    calculate_ratio, ratio_labels, compare_periods, growth_view, decline_view, change_tuples
+)
+
+AMOUNT, QTY = '分摊后总价', '实发数量'
+
+
+def summaries(seed=3, n=40):
+    rng = np.random.default_rng(seed)
+    keys = [f'店铺{i}' for i in range(n)]
+    current = pd.DataFrame({'店铺': keys, AMOUNT: rng.integers(0, 50000, n) + rng.random(n), QTY: rng.integers(1, 90, n)})
+    current = current.sort_values(AMOUNT, ascending=False)
+    prev_keys = keys[::2] + [f'旧店铺{i}' for i in range(5)]
+    previous = pd.DataFrame({'店铺': prev_keys, AMOUNT: rng.integers(0, 50000, len(prev_keys)) * 1.0,
+                             QTY: rng.integers(0, 90, len(prev_keys))})
+    previous.loc[previous.index[:3], AMOUNT] = 0   # 对比期为0的店铺不计增长率
+    # 构造增长率相同的店铺，检查排序稳定性
+    previous.loc[previous['店铺'] == '店铺2', AMOUNT] = 100
+    previous.loc[previous['店铺'] == '店铺4', AMOUNT] = 100
+    current.loc[current['店铺'].isin(['店铺2', '店铺4']), AMOUNT] = 300
+    return current, previous
+
+
+def legacy_lists(current, previous, above, below):
+    """日报 Part5 原写法"""
+    growth, decline = [], []
+    for _, row in current.iterrows():
+        shop = row['店铺']
+        current_amount = int(row[AMOUNT])
+        prev_data = previous[previous['店铺'] == shop]
+        prev_amount = int(prev_data.iloc[0][AMOUNT]) if not prev_data.empty else 0
+        if prev_amount > 0:
+            growth_rate = ((current_amount - prev_amount) / prev_amount) * 100
+            if growth_rate > above:
+                growth.append((shop, growth_rate, prev_amount, current_amount))
+            elif growth_rate < below:
+                decline.append((shop, growth_rate, prev_amount, current_amount))
+    growth.sort(key=lambda x: x[1], reverse=True)
+    decline.sort(key=lambda x: x[1])
+    return growth, decline
+
+
+def test_ratio_labels_match_calculate_ratio():
+    current = [0, 5, 100, 100, 0, 1234567, 99, 3]
+    previous = [0, 0, 100, 80, 50, 1000, 100, 7]
+    labels = ratio_labels(current, previous)
+    assert list(labels) == [calculate_ratio(c, p) for c, p in zip(current, previous)]
+    print("✅ 环比文本与 calculate_ratio 一致")
+
+
+def test_compare_matches_row_lookup():
+    current, previous = summaries()
+    cmp = compare_periods(current, previous, '店铺', AMOUNT, QTY)
+    assert list(cmp['店铺']) == list(current['店铺'])   # 保留本期顺序
+    for (_, row), (_, cur) in zip(cmp.iterrows(), current.iterrows()):
+        prev_data = previous[previous['店铺'] == cur['店铺']]
+        prev_amount = int(prev_data.iloc[0][AMOUNT]) if not prev_data.empty else 0
+        prev_qty = int(prev_data.iloc[0][QTY]) if not prev_data.empty else 0
+        assert row['prev_amount'] == prev_amount and row['prev_qty'] == prev_qty
+        assert row['ratio_label'] == calculate_ratio(int(cur[AMOUNT]), prev_amount)
+
+    for above, below in ((0, -10), (50, -30), (20, -20)):
+        growth, decline = legacy_lists(current, previous, above, below)
+        assert change_tuples(growth_view(cmp, above=above), '店铺', AMOUNT) == growth
+        assert change_tuples(decline_view(cmp, below=below), '店铺', AMOUNT) == decline
+
+    # 没有对比期数据
+    empty = compare_periods(current, None, '店铺', AMOUNT, QTY)
+    assert (empty['prev_amount'] == 0).all() and growth_view(empty).empty
+    # 只有金额列
+    only_amount = compare_periods(current[['店铺', AMOUNT]], previous, '店铺', AMOUNT)
+    assert 'prev_qty' not in only_amount.columns
+    print("✅ 合并结果与逐行查找一致")
+
+
+def test_outer_keeps_previous_only_keys():
+    current, previous = summaries()
+    cmp = compare_periods(current, previous, '店铺', AMOUNT, QTY, how='outer')
+    assert set(cmp['店铺']) == set(current['店铺']) | set(previous['店铺'])
+    assert list(cmp['店铺'][:len(current)]) == list(current['店铺'])
+    gone = cmp[cmp['店铺'].str.startswith('旧店铺')]
+    assert (gone[AMOUNT] == 0).all() and (gone[QTY] == 0).all()
+    print("✅ 对比期独有的键保留测试通过")
+
+
+if __name__ == "__main__":
+    test_ratio_labels_match_calculate_ratio()
+    test_compare_matches_row_lookup()
+    test_outer_keeps_previous_only_keys()
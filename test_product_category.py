@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试fenxiaochanpin品类字典：只连接一次数据库，查询结果与逐条SQL一致
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from offline_backend import connect_sqlite, write_tables
+from product_category import ProductCategoryResolver, get_category_resolver, reset_category_resolver
+
+FENXIAOCHANPIN = pd.DataFrame({
+    '产品名称': ['海尔（Haier）EG100MATE35S 洗衣机', '海尔（Haier）BCD-258WDPD 冰箱', '海尔 JSQ31 燃气热水器'],
+    '规格名称': ['海尔EG100MATE35S', '海尔BCD-258WDPD', '海尔JSQ31-16WN5S'],
+    '品类': ['洗衣机', '冰箱', ''],
+})
+
+
+def test_resolver_loads_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'category.db')
+        write_tables(path, {'fenxiaochanpin': FENXIAOCHANPIN})
+        connects = []
+
+        def connect():
+            connects.append(path)
+            return connect_sqlite(path)
+
+        reset_category_resolver()
+        try:
+            for _ in range(100):
+                resolver = get_category_resolver(connect)
+                assert resolver.lookup('海尔（Haier）EG100MATE35S 洗衣机') == '洗衣机'
+                assert resolver.lookup(' 海尔（haier）bcd-258wdpd 冰箱') == '冰箱'   # 忽略大小写/空格
+                assert resolver.lookup('海尔 JSQ31 燃气热水器') is None              # 品类为空
+                assert resolver.lookup('不存在的产品') is None
+                assert resolver.lookup(None) is None
+        finally:
+            reset_category_resolver()
+        assert len(connects) == 1
+        assert resolver.product_col == '产品名称' and resolver.category_col == '品类'
+
+        # 表不存在时不报错，全部返回None
+        empty_path = os.path.join(tmp, 'empty.db')
+        write_tables(empty_path, {'other': pd.DataFrame({'a': [1]})})
+        assert ProductCategoryResolver(lambda: connect_sqlite(empty_path)).lookup('海尔') is None
+    print("✅ 品类字典测试通过")
+
+
+if __name__ == "__main__":
+    test_resolver_loads_once()
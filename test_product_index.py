@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试ERP货品名称内存索引：结果与原来的 规格名称 = %s / LIKE '%关键词%' 查询一致，只读取回看范围内的数据
+"""
+
+import os
+import tempfile
+from datetime import date
+
+import pandas as pd
+
+from offline_backend import connect_sqlite, write_tables
+from product_index import ProductNameIndex, extract_keywords
+
+TODAY = date(2025, 8, 1)
+DAYSALES = pd.DataFrame({
+    '交易时间': ['2025-07-31 10:00:00', '2025-07-30 09:00:00', '2025-03-01 12:00:00', '2025-07-01 08:00:00',
+             '2025-06-15 20:00:00', '2023-05-01 10:00:00'],
+    '规格名称': ['海尔BCD-510WGHTD14S8U1', '海尔EG100MATE35S', '海尔EG100MATE35S', '卡萨帝C8 U1', '海尔JSQ31-16WN5S',
+             '统帅TD100'],
+    '货品名称': ['冰箱', '洗衣机', '洗衣机', '', '燃气热水器', '滚筒洗衣机'],
+})
+
+
+def like_lookup(cursor, keyword):
+    cursor.execute("SELECT 货品名称 FROM Daysales WHERE 货品名称 LIKE %s AND 交易时间 >= '2024-08-01' "
+                   "AND 货品名称 IS NOT NULL AND 货品名称 != '' LIMIT 1", (f'%{keyword}%',))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def test_index_matches_sql_fallback():
+    assert extract_keywords('海尔 EG100MATE35S 滚筒洗衣机 家用 大容量') == ['EG100MATE35S', '海尔', '滚筒洗衣机']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.db')
+        write_tables(path, {'Daysales': DAYSALES})
+        conn = connect_sqlite(path)
+        try:
+            index = ProductNameIndex.from_connection(conn, today=TODAY)
+            cursor = conn.cursor()
+
+            assert index.goods_for_model('海尔EG100MATE35S') == '洗衣机'
+            assert index.goods_for_model('卡萨帝C8 U1') is None   # 空货品名称不参与
+            assert len(index) == 3
+            # 回看范围（365天）以外的ERP数据不读取
+            assert index.goods_for_model('统帅TD100') is None
+            assert len(ProductNameIndex.from_connection(conn, lookback_days=1000, today=TODAY)) == 4
+
+            for keyword in ['冰箱', '热水器', 'EG100', '空调', 'jsq31', '滚筒']:
+                assert index.goods_for_keyword(keyword) == like_lookup(cursor, keyword), keyword
+        finally:
+            conn.close()
+
+    assert index.match_keywords('海尔 燃气热水器 16升') == ('燃气热水器', '燃气热水器')
+    assert index.match_keywords('美的 空调 挂机') == (None, None)
+    print("✅ ERP货品名称索引测试通过")
+
+
+if __name__ == "__main__":
+    test_index_matches_sql_fallback()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试分销产品映射缓存：命中已匹配的产品，fenxiaochanpin变化后整体失效，
+不同脚本的分类规则共用同一个缓存文件时互不影响
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from offline_backend import connect_sqlite, write_tables
+from product_index import reset_product_index
+from product_mapping_cache import ProductMappingCache, split_cached, table_fingerprint
+from product_matcher import resolve_product_mapping
+
+FENXIAOCHANPIN = pd.DataFrame({
+    'id': [1, 2],
+    '产品名称': ['海尔（Haier）EG100MATE35S 洗衣机', '海尔（Haier）BCD-258WDPD 冰箱'],
+    '规格名称': ['海尔EG100MATE35S', '海尔BCD-258WDPD'],
+    '货品名称': ['洗衣机', '冰箱'],
+})
+
+
+def test_mapping_cache_invalidated_by_fingerprint():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'source.db')
+        cache_path = os.path.join(tmp, 'cache', 'product_mapping.db')
+        write_tables(db_path, {'fenxiaochanpin': FENXIAOCHANPIN})
+
+        conn = connect_sqlite(db_path)
+        try:
+            fingerprint = table_fingerprint(conn)
+            assert fingerprint.endswith(':2:2:None')
+
+            cache = ProductMappingCache(fingerprint, path=cache_path)
+            cache.put_many({'海尔（Haier）EG100MATE35S 洗衣机': {'规格名称': '海尔EG100MATE35S', '货品名称': '洗衣机'}})
+
+            cached, pending = split_cached(cache, ['海尔（Haier）EG100MATE35S 洗衣机', '新品 冰箱', None])
+            assert cached['海尔（Haier）EG100MATE35S 洗衣机']['货品名称'] == '洗衣机'
+            assert pending == ['新品 冰箱']
+
+            # fenxiaochanpin新增一行 -> 指纹变化 -> 旧映射全部失效
+            conn.execute("INSERT INTO fenxiaochanpin (id, 产品名称, 规格名称, 货品名称) VALUES (3, '新品 冰箱', '海尔X', '冰箱')")
+            conn.commit()
+            new_fingerprint = table_fingerprint(conn)
+            assert new_fingerprint != fingerprint
+
+            cached, pending = split_cached(ProductMappingCache(new_fingerprint, path=cache_path),
+                                           ['海尔（Haier）EG100MATE35S 洗衣机'])
+            assert cached == {} and pending == ['海尔（Haier）EG100MATE35S 洗衣机']
+        finally:
+            conn.close()
+    print("✅ 产品映射缓存测试通过")
+
+
+def test_rule_sets_share_cache_file():
+    catalog = pd.DataFrame({
+        'id': [1, 2],
+        '产品名称': ['海尔（Haier）EG100MATE35S 洗衣机', '海尔 JSQ31 燃气热水器'],
+        '规格名称': ['海尔EG100MATE35S', '海尔JSQ31-16WN5S'],
+        '货品名称': ['洗衣机', ''],
+    })
+    names = ['海尔（Haier）EG100MATE35S 洗衣机', '海尔 JSQ31 燃气热水器', '某品牌 新款 家电']
+    # 两个脚本的强制分类规则不同（如日报与周报/月报）
+    rule_sets = (lambda name: '日报分类', lambda name: '周报分类')
+
+    reset_product_index()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'source.db')
+        cache_path = os.path.join(tmp, 'cache', 'product_mapping.db')
+        write_tables(db_path, {'fenxiaochanpin': catalog, 'Daysales': pd.DataFrame({'交易时间': ['2025-08-01'], '规格名称': ['X'], '货品名称': ['Y']})})
+        conn = connect_sqlite(db_path)
+        try:
+            results = [resolve_product_mapping(conn, names, force_categorize=rule, cache_path=cache_path)
+                       for rule in rule_sets + rule_sets]
+            cached, pending = split_cached(ProductMappingCache(table_fingerprint(conn), path=cache_path), names)
+        finally:
+            conn.close()
+            reset_product_index()
+
+    daily, weekly = results[0], results[1]
+    assert daily['海尔（Haier）EG100MATE35S 洗衣机'] == weekly['海尔（Haier）EG100MATE35S 洗衣机']
+    assert daily['海尔 JSQ31 燃气热水器']['货品名称'] == '日报分类'
+    assert weekly['海尔 JSQ31 燃气热水器']['货品名称'] == '周报分类'
+    assert daily['某品牌 新款 家电']['货品名称'] == '某品牌 新款 家电'
+    # 先后顺序不影响结果：缓存里没有依赖分类规则的条目
+    assert results[2] == daily and results[3] == weekly
+    assert list(cached) == ['海尔（Haier）EG100MATE35S 洗衣机']
+    assert pending == ['海尔 JSQ31 燃气热水器', '某品牌 新款 家电']
+    print("✅ 多套分类规则共用缓存测试通过")
+
+
+if __name__ == "__main__":
+    test_mapping_cache_invalidated_by_fingerprint()
+    test_rule_sets_share_cache_file()
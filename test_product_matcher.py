@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试分销产品批量匹配：精确 -> 模糊 -> 规则分类 -> ERP反查 的顺序与查询次数
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from offline_backend import connect_sqlite, write_tables
+from product_index import reset_product_index
+from product_matcher import ProductMatcher, apply_product_mapping, map_unique, add_shop_prefix
+
+FENXIAOCHANPIN = pd.DataFrame({
+    '产品名称': ['海尔（Haier）EG100MATE35S 洗衣机', '海尔（Haier）BCD-258WDPD 冰箱', '海尔 JSQ31 燃气热水器', '热水器'],
+    '规格名称': ['海尔EG100MATE35S', '海尔BCD-258WDPD', '海尔JSQ31-16WN5S', '热水器通用'],
+    '货品名称': ['洗衣机', '冰箱', '', '热水器'],
+})
+DAYSALES = pd.DataFrame({
+    '交易时间': [pd.Timestamp.today().strftime('%Y-%m-%d 10:00:00')] * 2,
+    '规格名称': ['海尔JSQ31-16WN5S', '海尔EG100MATE35S'],
+    '货品名称': ['燃气热水器', '洗衣机'],
+})
+
+
+class CountingConnection:
+    """统计执行的SQL条数"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.statements = []
+
+    def cursor(self):
+        cursor = self._conn.cursor()
+        statements = self.statements
+        execute = cursor.execute
+
+        def counted(sql, params=None):
+            statements.append(sql)
+            return execute(sql, params)
+        cursor.execute = counted
+        return cursor
+
+
+def force_categorize(name):
+    return '热水器' if '热水' in name else '冰箱'
+
+
+def test_batch_matching_order():
+    reset_product_index()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'match.db')
+        write_tables(path, {'fenxiaochanpin': FENXIAOCHANPIN, 'Daysales': DAYSALES})
+        raw = connect_sqlite(path)
+        conn = CountingConnection(raw)
+        try:
+            names = [
+                '海尔（Haier）EG100MATE35S 洗衣机',      # 精确
+                'BCD-258WDPD',                         # 模糊：目录名称包含它
+                '海尔 JSQ31 燃气热水器',                # 精确，但货品名称为空 -> ERP反查
+                '某品牌 速热 电热水器',                 # 规则分类 -> 目录中的"热水器"
+            ] * 50
+            mapping, stats = ProductMatcher(conn, categorize=None, force_categorize=force_categorize).match(names)
+        finally:
+            raw.close()
+            reset_product_index()
+
+    assert mapping['海尔（Haier）EG100MATE35S 洗衣机'] == {'规格名称': '海尔EG100MATE35S', '货品名称': '洗衣机'}
+    assert mapping['BCD-258WDPD'] == {'规格名称': '海尔BCD-258WDPD', '货品名称': '冰箱'}
+    assert mapping['海尔 JSQ31 燃气热水器'] == {'规格名称': '海尔JSQ31-16WN5S', '货品名称': '燃气热水器'}
+    assert mapping['某品牌 速热 电热水器'] == {'规格名称': '热水器通用', '货品名称': '热水器'}
+    assert stats == {'exact': 1, 'fuzzy': 1, 'erp': 1, 'rule': 1}
+    # 一次精确IN查询 + 一次目录读取 + 一次ERP索引构建，与产品数/行数无关
+    assert len(conn.statements) == 3
+    print("✅ 分销产品批量匹配测试通过")
+
+
+def test_broadcast_helpers_match_row_by_row():
+    df = pd.DataFrame({
+        '店铺': ['汇鑫专卖店', '京东-恒达专营店', None, '汇鑫专卖店'],
+        '规格名称': ['海尔 JSQ31 燃气热水器', None, 'BCD-258WDPD', '海尔 JSQ31 燃气热水器'],
+        '货品名称': ['海尔 JSQ31 燃气热水器', None, 'BCD-258WDPD', '海尔 JSQ31 燃气热水器'],
+    })
+    mapping = {'海尔 JSQ31 燃气热水器': {'规格名称': '海尔JSQ31-16WN5S', '货品名称': '燃气热水器'}}
+
+    assert apply_product_mapping(df, mapping) == 2
+    assert df['规格名称'].tolist()[0] == '海尔JSQ31-16WN5S' and df['货品名称'].tolist()[3] == '燃气热水器'
+    assert df['规格名称'].tolist()[2] == 'BCD-258WDPD' and pd.isna(df['规格名称'].tolist()[1])
+
+    calls = []
+
+    def label(value):
+        calls.append(value)
+        return '空' if not isinstance(value, str) else value[-3:]
+    expected = df['货品名称'].apply(label).tolist()
+    calls.clear()
+    assert map_unique(df['货品名称'], label).tolist() == expected == ['热水器', '空', 'DPD', '热水器']
+    assert len(calls) == 3   # 去重值 + 一次空值
+    prefixed = add_shop_prefix(df['店铺'])
+    assert prefixed.tolist()[:2] == ['京东-汇鑫专卖店', '京东-恒达专营店'] and pd.isna(prefixed.iloc[2])
+    print("✅ 映射广播测试通过")
+
+
+if __name__ == "__main__":
+    test_batch_matching_order()
+    test_broadcast_helpers_match_row_by_row()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试汇总立方体：各切片与原来"布尔筛选 + groupby"的结果一致
+"""
+
+import numpy as np
+
+from keyword_classifier import SHOP_CHANNEL
+from report_cube import SalesCube, ensure_cube, FENXIAO_ONLY
+from report_schema import compact_frame
+from synthetic_data import generate_daysales
+
+AMOUNT, QTY = '分摊后总价', '实发数量'
+CAT, SHOP, MODEL = '货品名称', '店铺', '规格名称'
+DIMS = [CAT, SHOP, MODEL, '渠道', '数据来源']
+
+
+def sample_frame(rows=3000, seed=7):
+    df = generate_daysales('2025-08-01', '2025-08-03', rows_per_month=rows * 10, seed=seed)
+    df['渠道'] = SHOP_CHANNEL.classify_series(df[SHOP])
+    df['数据来源'] = np.where(np.random.default_rng(seed).random(len(df)) < 0.2, '分销', None)
+    df.loc[df.index[:5], MODEL] = None   # 空规格名称在原写法中不参与分组
+    return df
+
+
+def legacy_summary(df, mask, by):
+    return df[mask].groupby(by).agg({AMOUNT: 'sum', QTY: 'sum'}).reset_index()
+
+
+def assert_same_summary(actual, expected):
+    assert list(actual.columns) == list(expected.columns)
+    key_cols = list(expected.columns[:-2])
+    assert [list(map(str, k)) for k in actual[key_cols].values] == [list(map(str, k)) for k in expected[key_cols].values]
+    assert np.allclose(actual[[AMOUNT, QTY]].to_numpy(float), expected[[AMOUNT, QTY]].to_numpy(float))
+
+
+def test_slices_match_masked_groupby():
+    for df in (sample_frame(), compact_frame(sample_frame())):
+        cube = SalesCube(df, AMOUNT, QTY, DIMS)
+        assert len(cube) < len(df)
+        fenxiao = df['数据来源'] == '分销'
+        for cat in df[CAT].dropna().unique()[:4]:
+            in_cat = df[CAT] == cat
+            assert_same_summary(cube.group(CAT, cat, SHOP), legacy_summary(df, in_cat, SHOP))
+            assert_same_summary(cube.group(CAT, cat, MODEL), legacy_summary(df, in_cat, MODEL))
+            amount, qty = cube.value(CAT, cat, FENXIAO_ONLY)
+            assert np.isclose(amount, df.loc[in_cat & fenxiao, AMOUNT].sum())
+            assert qty == df.loc[in_cat & fenxiao, QTY].sum()
+        for shop in df[SHOP].unique()[:4]:
+            in_shop = df[SHOP] == shop
+            assert_same_summary(cube.group(SHOP, shop, MODEL), legacy_summary(df, in_shop, MODEL))
+            for model in df.loc[in_shop, MODEL].dropna().unique()[:3]:
+                rows = in_shop & (df[MODEL] == model)
+                assert np.isclose(cube.value([SHOP, MODEL], (shop, model))[0], df.loc[rows, AMOUNT].sum())
+                assert np.isclose(cube.value([SHOP, MODEL], (shop, model), FENXIAO_ONLY)[0],
+                                  df.loc[rows & fenxiao, AMOUNT].sum())
+        assert cube.value(MODEL, '不存在的型号') == (0, 0)
+        assert cube.group(CAT, '不存在的品类', SHOP).empty
+        # 同一切片只计算一次
+        assert cube.groups(CAT, SHOP) is cube.groups(CAT, SHOP)
+    print("✅ 立方体切片与布尔筛选结果一致")
+
+
+def test_missing_inputs():
+    df = sample_frame(rows=200).drop(columns=['数据来源'])
+    cube = SalesCube(df, AMOUNT, QTY, DIMS)
+    # 没有数据来源列时分销部分为0（原写法的列存在性判断）
+    assert cube.value(CAT, df[CAT].iloc[0], FENXIAO_ONLY) == (0, 0)
+    assert not cube.has('数据来源')
+
+    empty = SalesCube(None, AMOUNT, QTY, DIMS)
+    assert empty.value([SHOP, CAT], ('a', 'b')) == (0, 0)
+    assert empty.group(CAT, 'x', MODEL).empty
+
+    assert ensure_cube(cube, None, AMOUNT, QTY) is cube
+    assert len(ensure_cube(None, df, AMOUNT, QTY, DIMS)) == len(cube)
+    print("✅ 缺列/无对比期数据测试通过")
+
+
+if __name__ == "__main__":
+    test_slices_match_masked_groupby()
+    test_missing_inputs()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试报表连接池：连接复用、失效连接丢弃、连接数上限
+使用本地SQLite代替MySQL，无需连接生产库
+"""
+
+import sqlite3
+
+import pandas as pd
+
+from report_db import ConnectionPool
+
+
+class BrokenConnection:
+    """模拟已断开的连接：rollback/close 都抛异常"""
+
+    def cursor(self):
+        raise sqlite3.OperationalError("连接已断开")
+
+    def rollback(self):
+        raise sqlite3.OperationalError("连接已断开")
+
+    def close(self):
+        raise sqlite3.OperationalError("连接已断开")
+
+
+def sqlite_connect():
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+def test_connection_reused_and_metrics_recorded():
+    pool = ConnectionPool(connect=sqlite_connect, max_size=2)
+    conn = pool.connection()
+    df = pd.read_sql("SELECT 1 AS a", conn)
+    conn.close()
+    conn.close()  # 重复close不应重复归还
+
+    conn = pool.connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 2")
+    assert cursor.fetchone() == (2,)
+    conn.close()
+
+    assert df['a'].tolist() == [1]
+    assert pool.metrics.connects == 1
+    assert pool.metrics.reuses == 1
+    assert sum(stat['count'] for stat in pool.metrics.queries.values()) == 2
+    print("✅ 连接复用与查询统计测试通过")
+
+
+def test_broken_connection_discarded():
+    connections = [BrokenConnection(), sqlite3.connect(':memory:')]
+    pool = ConnectionPool(connect=lambda: connections.pop(0), max_size=1)
+    pool.connection().close()   # rollback失败，连接被丢弃
+    conn = pool.connection()
+    assert isinstance(conn._raw, sqlite3.Connection)
+    conn.close()
+    assert pool.metrics.connects == 2
+    print("✅ 失效连接丢弃测试通过")
+
+
+def test_checkout_timeout_when_exhausted():
+    pool = ConnectionPool(connect=sqlite_connect, max_size=1, checkout_timeout=0.1)
+    conn = pool.connection()
+    try:
+        pool.connection()
+        assert False, "连接池耗尽时应超时"
+    except TimeoutError:
+        pass
+    conn.close()
+    pool.connection().close()
+    print("✅ 连接数上限测试通过")
+
+
+if __name__ == "__main__":
+    test_connection_reused_and_metrics_recorded()
+    test_broken_connection_discarded()
+    test_checkout_timeout_when_exhausted()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试报表数据并发加载：耗时约等于最慢任务、单个任务失败不影响其他数据集
+"""
+
+import time
+
+import pandas as pd
+
+from report_loader import load_report_datasets, run_concurrently
+
+
+def slow_frame(start_date, end_date, delay=0.2):
+    time.sleep(delay)
+    return pd.DataFrame({'交易时间': [start_date, end_date]})
+
+
+def test_tasks_run_concurrently():
+    start = time.perf_counter()
+    results, errors = run_concurrently({f"task{i}": (lambda: time.sleep(0.2) or 'ok') for i in range(3)})
+    elapsed = time.perf_counter() - start
+    assert errors == {}
+    assert set(results.values()) == {'ok'}
+    assert elapsed < 0.5, f"并发执行耗时过长: {elapsed:.2f}s"
+    print(f"✅ 3个0.2s任务并发耗时 {elapsed:.2f}s")
+
+
+def test_bundle_and_errors():
+    def failing_fenxiao(start_date, end_date):
+        raise RuntimeError("分销库不可用")
+
+    datasets = load_report_datasets(
+        current=('2025-08-01', '2025-08-31'),
+        comparison=('2025-07-01', '2025-07-31'),
+        previous_day='2025-08-10',
+        load_erp=slow_frame,
+        load_fenxiao=failing_fenxiao,
+        comparison_available=lambda start_date, end_date: (True, 42),
+    )
+    assert datasets.erp['交易时间'].tolist() == ['2025-08-01', '2025-08-31']
+    assert datasets.prev_erp['交易时间'].tolist() == ['2025-07-01', '2025-07-31']
+    assert datasets.prev_day_erp['交易时间'].tolist() == ['2025-08-10', '2025-08-10']
+    assert datasets.prev_count == 42
+    assert datasets.fenxiao is None and 'fenxiao' in datasets.errors
+    assert 'erp' not in datasets.errors
+    print("✅ 数据集打包与错误隔离测试通过")
+
+
+def test_comparison_skipped_without_data():
+    datasets = load_report_datasets(
+        current=('2025-08-01', '2025-08-07'),
+        comparison=('2025-07-25', '2025-07-31'),
+        previous_day='2025-08-07',
+        load_erp=lambda start_date, end_date: slow_frame(start_date, end_date, delay=0),
+        comparison_available=lambda start_date, end_date: (False, 0),
+    )
+    assert datasets.prev_erp is None
+    assert datasets.errors == {}
+    print("✅ 对比期无数据时跳过加载")
+
+
+if __name__ == "__main__":
+    test_tasks_run_concurrently()
+    test_bundle_and_errors()
+    test_comparison_skipped_without_data()
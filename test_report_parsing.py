@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试容错解析：整列版本与逐个调用原函数的结果一致
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+from report_parsing import to_number, to_number_series, normalize_date_format, normalize_date_series
+
+NUMBER_VALUES = ['1,234', '１２', '1，234.9', ' 56 ', '78　', '-3.7', '1e3', '1_000', '约12.5元', 'abc', '',
+                 'nan', None, float('nan'), 7.9, -2.5, 42, True, '3..2']
+DATE_VALUES = ['2025-07-01 10:20:30', '2025-07-01', ' 2025-07-02 ', '2025-02-30 10:00:00', '2025-07-01T08:00:00',
+               '7.2', '7.2号', '07-15', '1751328000', '1751328000000', '2025/7/3', '03/07/2025', '20250704',
+               '0705', '2025年7月6日', 'abc', '', None, float('nan'), pd.Timestamp('2025-07-08 09:00:00'),
+               datetime(2025, 7, 9)]
+
+
+def test_to_number_series_matches_apply():
+    series = pd.Series(NUMBER_VALUES * 3, dtype=object)
+    expected = series.apply(to_number)
+    actual = to_number_series(series)
+    assert actual.tolist() == expected.tolist()
+    assert str(actual.dtype) == 'int64'
+    assert actual.tolist()[:7] == [1234, 12, 1234, 56, 78, -3, 1000]
+    assert to_number_series(pd.Series([1.5, None, 3.0])).tolist() == [1, 0, 3]
+    print("✅ 数值解析与原函数一致")
+
+
+def test_normalize_date_series_matches_apply():
+    series = pd.Series(DATE_VALUES * 3, dtype=object)
+    expected = series.apply(normalize_date_format).tolist()
+    actual = normalize_date_series(series).tolist()
+    assert [None if pd.isna(v) else v for v in actual] == [None if pd.isna(v) else v for v in expected]
+    assert actual[:4] == ['2025-07-01', '2025-07-01', '2025-07-02', None]
+    assert actual[4] == '2025-07-01'   # 非空格分隔的时间走兜底解析
+
+    dates = pd.Series([pd.Timestamp('2025-07-01 10:00:00'), pd.NaT, pd.Timestamp('2025-07-02')])
+    assert normalize_date_series(dates).tolist() == ['2025-07-01', None, '2025-07-02']
+    print("✅ 日期解析与原函数一致")
+
+
+if __name__ == "__main__":
+    test_to_number_series_matches_apply()
+    test_normalize_date_series_matches_apply()
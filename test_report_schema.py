@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试报表列声明：内存压缩后分组结果与原始object列一致，备注/仓库类同义列按关键词投影
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+from report_schema import DAYSALES_SCHEMA, ReportSchema, compact_frame, missing_required_columns
+from schema_registry import SchemaRegistry
+
+
+def sample_frame(rows=2000):
+    shops = ['京东自营旗舰店', '天猫官方旗舰店', '拼多多海尔专卖店', '抖音海尔官方旗舰店']
+    products = ['冰箱', '洗衣机', '家用空调']
+    return pd.DataFrame({
+        '交易时间': [f"2025-08-{i % 28 + 1:02d} 10:00:00" for i in range(rows)],
+        '店铺': [shops[i % len(shops)] for i in range(rows)],
+        '货品名称': [products[i % len(products)] for i in range(rows)],
+        '规格名称': [f"型号{i % 50}" for i in range(rows)],
+        '分摊后总价': [1999.9 + i for i in range(rows)],
+        '实发数量': [i % 3 + 1 for i in range(rows)],
+        '渠道': ['京东' if i % 4 == 0 else '天猫' for i in range(rows)],
+    })
+
+
+def test_compact_frame_dtypes_and_memory():
+    df = sample_frame()
+    compact = compact_frame(df)
+    assert isinstance(compact['店铺'].dtype, pd.CategoricalDtype)
+    assert isinstance(compact['渠道'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(compact['交易时间'])
+    assert compact['实发数量'].dtype.itemsize == 1
+    assert compact['分摊后总价'].dtype == 'float64'
+    assert compact.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum() / 2
+    # 原DataFrame不被修改
+    assert not isinstance(df['店铺'].dtype, pd.CategoricalDtype)
+    print("✅ 内存压缩类型检查通过")
+
+
+def test_grouped_results_unchanged():
+    df = sample_frame()
+    compact = compact_frame(df)
+    subset = df[df['货品名称'] == '冰箱']
+    compact_subset = compact[compact['货品名称'] == '冰箱']
+    expected = subset.groupby('店铺').agg({'分摊后总价': 'sum', '实发数量': 'sum'}).sort_index()
+    actual = compact_subset.groupby('店铺', observed=True).agg({'分摊后总价': 'sum', '实发数量': 'sum'})
+    actual.index = actual.index.astype(str)
+    actual = actual.sort_index()
+    assert list(actual.index) == list(expected.index)
+    assert (actual['分摊后总价'] - expected['分摊后总价']).abs().max() < 1e-6
+    assert actual['实发数量'].tolist() == expected['实发数量'].tolist()
+    assert missing_required_columns(compact) == []
+    print("✅ 压缩前后分组汇总一致")
+
+
+def test_keyword_columns_projected():
+    columns = ['交易时间', '店铺', '货品名称', '规格名称', '分摊后总价', '实发数量', '订单状态',
+               '仓库名称', '卖家备注', '买家消息', '特殊说明', '收货地址']
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'source.db')
+        conn = sqlite3.connect(db_path)
+        try:
+            pd.DataFrame(columns=columns).to_sql('Daysales', conn, index=False)
+            schema = ReportSchema('Daysales', DAYSALES_SCHEMA.columns,
+                                  registry=SchemaRegistry(path=os.path.join(tmp, 'schema.db')))
+            selected = schema.resolve_columns(conn)
+        finally:
+            conn.close()
+    # 精确列名不存在的可选列，由名称包含关键词的列代替，保持原列名（与 SELECT * 后按列名查找一致）
+    assert selected == columns[:7] + ['仓库名称', '卖家备注', '买家消息', '特殊说明']
+    print("✅ 关键词列投影测试通过")
+
+
+if __name__ == "__main__":
+    test_compact_frame_dtypes_and_memory()
+    test_grouped_results_unchanged()
+    test_keyword_columns_projected()
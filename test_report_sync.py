@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试水位线增量同步：只有行数、最大时间或状态/金额校验值变化的日期才重新拉取
+使用本地SQLite模拟MySQL，无需连接生产库
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+import report_sync
+from day_partition_cache import DayPartitionCache
+from report_schema import Column, ReportSchema
+from schema_registry import SchemaRegistry
+
+# 测试表只有这几列
+TEST_SCHEMA = ReportSchema('Daysales', [
+    Column('交易时间', 'datetime'),
+    Column('店铺', 'category'),
+    Column('分摊后总价', 'float'),
+    Column('订单状态', 'category'),
+])
+
+
+class CountingConnect:
+    """记录回源次数的连接工厂"""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return sqlite3.connect(self.path)
+
+
+def setup_store(tmp):
+    """把同步目录和分区目录指向临时目录"""
+    report_sync.CATALOG_PATH = os.path.join(tmp, 'report_store.db')
+    TEST_SCHEMA.registry = SchemaRegistry(path=os.path.join(tmp, 'schema.db'))
+    report_sync._PARTITIONS['Daysales'] = DayPartitionCache('Daysales', '交易时间', root=os.path.join(tmp, 'cache'), schema=TEST_SCHEMA)
+    report_sync._verified_days.clear()
+
+
+def insert_rows(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    pd.DataFrame(rows).to_sql('Daysales', conn, index=False, if_exists='append')
+    conn.close()
+
+
+def test_only_changed_days_are_refetched():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_store(tmp)
+        db_path = os.path.join(tmp, 'source.db')
+        insert_rows(db_path, [
+            {'交易时间': '2025-08-01 10:00:00', '店铺': '京东自营旗舰店', '分摊后总价': 3999, '订单状态': '已发货'},
+            {'交易时间': '2025-08-02 11:00:00', '店铺': '天猫官方旗舰店', '分摊后总价': 2599, '订单状态': '已发货'},
+        ])
+        connect = CountingConnect(db_path)
+
+        has_data, count = report_sync.daysales_availability('2025-08-01', '2025-08-03', connect=connect)
+        assert has_data and count == 2
+
+        # 同一进程内再次读取不再查询水位线
+        df = report_sync.load_daysales('2025-08-01', '2025-08-03', connect=connect)
+        assert connect.calls == 1
+        assert len(df) == 2
+
+        # 新一轮运行：08-02补录一行，08-01不变
+        report_sync._verified_days.clear()
+        insert_rows(db_path, [{'交易时间': '2025-08-02 23:00:00', '店铺': '拼多多海尔专卖店', '分摊后总价': 1299,
+                               '订单状态': '已发货'}])
+        watermarks = report_sync.sync_range('Daysales', '2025-08-01', '2025-08-03', connect=connect)
+        assert watermarks['2025-08-02'][0] == 2
+        local = report_sync.local_watermarks('Daysales', '2025-08-01', '2025-08-03')
+        assert local['2025-08-02'] == watermarks['2025-08-02']
+
+        df = report_sync.load_daysales('2025-08-01', '2025-08-03', connect=connect)
+        assert len(df) == 3
+        assert '2025-08-03' not in local
+        # 读取结果已按声明类型压缩
+        assert isinstance(df['订单状态'].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_any_dtype(df['交易时间']) and df['分摊后总价'].dtype == 'float64'
+
+        # 08-01的订单退货：行数和最大时间不变，校验值变化，只重新拉取08-01
+        report_sync._verified_days.clear()
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE Daysales SET 订单状态 = '已退货' WHERE 交易时间 = '2025-08-01 10:00:00'")
+        conn.commit()
+        conn.close()
+        remote = report_sync.sync_range('Daysales', '2025-08-01', '2025-08-03', connect=connect)
+        assert remote['2025-08-01'][:2] == local['2025-08-01'][:2] and remote['2025-08-01'] != local['2025-08-01']
+        assert remote['2025-08-02'] == local['2025-08-02']
+        df = report_sync.load_daysales('2025-08-01', '2025-08-01', connect=connect)
+        assert df['订单状态'].tolist() == ['已退货']
+
+        # 区间内没有数据：返回带声明列的空表
+        empty = report_sync.load_daysales('2025-08-05', '2025-08-06', connect=connect)
+        assert empty.empty and list(empty.columns) == TEST_SCHEMA.names
+        print("✅ 水位线增量同步测试通过")
+
+
+if __name__ == "__main__":
+    test_only_changed_days_are_refetched()
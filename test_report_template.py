@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试报表HTML模板：渲染结果与原 f-string 逐字节一致
+"""
+
+from report_template import (
+    Template, HtmlWriter, change_background, LIST_OPEN, LIST_CLOSE, EMPTY_NOTE, DETAILS_OPEN, NOTE_BOX_OPEN
+)
+
+
+def raises(exc, func, *args, **kwargs):
+    try:
+        func(*args, **kwargs)
+    except exc:
+        return True
+    return False
+
+
+def test_render_matches_fstring():
+    row = Template('<li style="margin-bottom: 5px; {bg}">🔸 {product}<br>本期: ¥{amount:,}（{qty}件），环比 {ratio}</li>')
+    assert row.fields == ('bg', 'product', 'amount', 'qty', 'ratio')
+    bg, product, amount, qty, ratio = 'background: #f0fff0;', 'EHY-3002', 1234567, 12, '📈 12.5%'
+    expected = f'<li style="margin-bottom: 5px; {bg}">🔸 {product}<br>本期: ¥{amount:,}（{qty}件），环比 {ratio}</li>'
+    assert row.render(bg=bg, product=product, amount=amount, qty=qty, ratio=ratio) == expected
+
+    growth = Template('{name}: {sign}{rate:.1f}% ({name!r})')
+    assert growth.fields == ('name', 'sign', 'rate')
+    assert growth.render(name='冰箱', sign='+', rate=23.456) == f"冰箱: +{23.456:.1f}% ({'冰箱'!r})"
+
+    # 字面花括号（内联脚本/样式）
+    script = Template('const data = {{ values: {values} }};\nfunction f() {{ return 1; }}')
+    assert script.fields == ('values',)
+    assert script.render(values=[1, 2]) == 'const data = { values: [1, 2] };\nfunction f() { return 1; }'
+
+    assert Template('').render() == '' and Template('纯文本').render() == '纯文本'
+    print("✅ 模板渲染与f-string一致")
+
+
+def test_invalid_templates():
+    for text in ('{0}', '{}', '{row.amount}', '{row[0]}', '{class}', '{amount:{width}}', '{未闭合'):
+        assert raises(ValueError, Template, text, 'BAD'), text
+    row = Template('{a}-{b}')
+    # 只接受关键字参数，缺参数时报错而不是输出空值
+    assert raises(TypeError, row.render, a=1)
+    assert raises(TypeError, row.render, 1, 2)
+    print("✅ 非法模板测试通过")
+
+
+def test_html_writer():
+    html = HtmlWriter()
+    html.write(LIST_OPEN)
+    html.render(EMPTY_NOTE, text='暂无店铺数据')
+    html.write(LIST_CLOSE)
+    assert html.getvalue() == ('<ul style="margin-left: 20px; padding-left: 10px;">'
+                               '<p style="margin-left: 20px; color: #666;">暂无店铺数据</p></ul>')
+    assert HtmlWriter().getvalue() == ''
+
+    assert DETAILS_OPEN.render(title='🏪 1. 天猫渠道') == '<details><summary>🏪 1. 天猫渠道</summary>'
+    assert NOTE_BOX_OPEN.render(margin=8, padding=6, background='#f0f8ff') == \
+        '<div style="margin-bottom: 8px; padding: 6px; background: #f0f8ff; border-radius: 4px;">'
+    assert [change_background(c, p) for c, p in ((5, 3), (3, 5), (4, 4))] == \
+        ['background: #f0fff0;', 'background: #fff0f0;', '']
+    print("✅ 缓冲写入测试通过")
+
+
+if __name__ == "__main__":
+    test_render_matches_fstring()
+    test_invalid_templates()
+    test_html_writer()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试表结构登记：字段选择与原 DESCRIBE 判断一致，登记落盘后不再查询，过期只复核一次
+"""
+
+import os
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+from offline_backend import connect_sqlite, write_tables
+from schema_registry import (
+    SchemaRegistry, FieldRule, resolve_fields, HT_FENXIAO_FIELDS, HT_FENXIAO_CREATE_TIME_FIELDS
+)
+
+
+class CountingConnection:
+    """统计执行的SQL条数"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.statements = []
+
+    def cursor(self):
+        cursor = self._conn.cursor()
+        statements = self.statements
+        execute = cursor.execute
+
+        def counted(sql, params=None):
+            statements.append(sql)
+            return execute(sql, params)
+        cursor.execute = counted
+        return cursor
+
+
+def legacy_fenxiao_fields(columns):
+    """整体日报原写法"""
+    amount_fields = [col for col in columns if '金额' in col or '实付' in col or '支付' in col]
+    time_fields = [col for col in columns if '时间' in col or '支付' in col]
+    qty_fields = [col for col in columns if '数量' in col or '采购数量' in col]
+    return {
+        'amount': '用户实际支付总额' if '用户实际支付总额' in columns else (amount_fields[0] if amount_fields else '用户实际支付金额'),
+        'time': '采购单支付时间' if '采购单支付时间' in columns else (time_fields[0] if time_fields else '采购单支付时间'),
+        'qty': '采购数量' if '采购数量' in columns else (qty_fields[0] if qty_fields else '采购数量'),
+    }
+
+
+def test_field_rules_match_legacy():
+    for columns in [
+        ['分销商店铺名称', '订单状态', '用户实际支付总额', '采购单支付时间', '产品名称', '采购数量', '订单创建时间'],
+        ['店铺', '状态', '实付金额', '支付时间', '商品名称', '数量'],
+        ['id', 'remark'],
+    ]:
+        fields = resolve_fields(columns, HT_FENXIAO_FIELDS)
+        assert {k: fields[k] for k in ('amount', 'time', 'qty')} == legacy_fenxiao_fields(columns), columns
+    assert resolve_fields(['订单创建时间', '采购单支付时间'], HT_FENXIAO_CREATE_TIME_FIELDS)['time'] == '订单创建时间'
+    assert resolve_fields(['支付时间'], HT_FENXIAO_CREATE_TIME_FIELDS)['time'] == '支付时间'
+    # 按位置兜底
+    rule = {'stock': FieldRule(['可用库存'], positions=(2, 1))}
+    assert resolve_fields(['编码', '名称', '数量'], rule) == {'stock': '数量'}
+    assert resolve_fields(['编码', '名称'], rule) == {'stock': '名称'}
+    print("✅ 字段选择与原判断一致")
+
+
+def test_registry_persists_and_revalidates():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'remote.db')
+        registry_path = os.path.join(tmp, 'schema.db')
+        write_tables(db_path, {
+            'HT_fenxiao': pd.DataFrame({'分销商店铺名称': ['a'], '用户实际支付总额': [1.0], '采购单支付时间': ['2025-07-01']}),
+            'tongstore_0801': pd.DataFrame({'__EMPTY_1': ['x'], '__EMPTY_2': [3]}),
+        })
+        raw = connect_sqlite(db_path)
+        conn = CountingConnection(raw)
+        try:
+            registry = SchemaRegistry(path=registry_path)
+            fields = registry.resolve(conn, 'HT_fenxiao', HT_FENXIAO_FIELDS)
+            assert fields['amount'] == '用户实际支付总额' and fields['shop'] == '分销商店铺名称'
+            assert registry.table_columns(conn, '%tongstore%') == ('tongstore_0801', ['__EMPTY_1', '__EMPTY_2'])
+            assert registry.table_columns(conn, '%nostore%') == (None, [])
+            first_run = len(conn.statements)
+            for _ in range(10):
+                registry.resolve(conn, 'HT_fenxiao', HT_FENXIAO_FIELDS)
+                registry.table_columns(conn, '%tongstore%')
+            assert len(conn.statements) == first_run   # 同一进程内不再查询
+
+            # 新进程：TTL内直接用落盘的登记
+            conn.statements.clear()
+            SchemaRegistry(path=registry_path).resolve(conn, 'HT_fenxiao', HT_FENXIAO_FIELDS)
+            assert conn.statements == []
+
+            # 过期：列未变只复核一次（LIMIT 0）
+            SchemaRegistry(path=registry_path, ttl=0).resolve(conn, 'HT_fenxiao', HT_FENXIAO_FIELDS)
+            assert len(conn.statements) == 1 and 'LIMIT 0' in conn.statements[0]
+
+            # 过期且列已变化：重新登记
+            raw.execute("ALTER TABLE HT_fenxiao ADD COLUMN 采购数量 INTEGER")
+            fields = SchemaRegistry(path=registry_path, ttl=0).resolve(conn, 'HT_fenxiao', HT_FENXIAO_FIELDS)
+            assert fields['qty'] == '采购数量'
+
+            # 失效后重新查询
+            registry.invalidate('HT_fenxiao')
+            conn.statements.clear()
+            registry.resolve(conn, 'HT_fenxiao', HT_FENXIAO_FIELDS)
+            assert len(conn.statements) == 1
+        finally:
+            raw.close()
+        with sqlite3.connect(registry_path) as local:
+            assert local.execute("SELECT COUNT(*) FROM table_schema").fetchone()[0] == 2
+    print("✅ 表结构登记落盘与复核测试通过")
+
+
+if __name__ == "__main__":
+    test_field_rules_match_legacy()
+    test_registry_persists_and_revalidates()
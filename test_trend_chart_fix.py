@@ -12,7 +12,7 @@ import os
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from 整体月报数据 import generate_sales_trend_chart_html, get_fenxiao_data
+from 整体月报数据 import generate_sales_trend_chart_html_simple, get_fenxiao_data
 
 def create_test_data():
     """创建测试数据"""
@@ -56,7 +56,7 @@ def test_trend_chart():
     try:
         # 生成趋势图HTML
         print("🔧 正在生成趋势图HTML...")
-        html = generate_sales_trend_chart_html(
+        html = generate_sales_trend_chart_html_simple(
             df_test, amount_col, qty_col, CATEGORY_COL, SHOP_COL, MODEL_COL, category_icons
         )
         
@@ -42,7 +42,7 @@ def test_trend_function():
         # 导入趋势图函数
         import sys
         sys.path.append('.')
-        from 整体月报数据 import generate_sales_trend_chart_html
+        from 整体月报数据 import generate_sales_trend_chart_html_simple
         
         # 定义列名
         amount_col = '分摊后总价'
@@ -53,7 +53,7 @@ def test_trend_function():
         category_icons = {'测试品类0': '📦', '测试品类1': '🏠'}
         
         # 调用趋势图函数
-        html = generate_sales_trend_chart_html(df_test, amount_col, qty_col, CATEGORY_COL, SHOP_COL, MODEL_COL, category_icons)
+        html = generate_sales_trend_chart_html_simple(df_test, amount_col, qty_col, CATEGORY_COL, SHOP_COL, MODEL_COL, category_icons)
         
         print("✅ 趋势图函数测试成功")
         print(f"📊 生成的HTML长度: {len(html)} 字符")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试趋势矩阵：与原来逐个 (日期, 维度) 筛选补零的结果一致
+"""
+
+import numpy as np
+import pandas as pd
+
+from report_schema import compact_frame
+from synthetic_data import generate_daysales
+from trend_matrix import TrendMatrices, day_labels, script_json
+
+AMOUNT, QTY = '分摊后总价', '实发数量'
+CAT, SHOP, MODEL = '货品名称', '店铺', '规格名称'
+
+
+def sample_frame(seed=5):
+    df = generate_daysales('2025-08-01', '2025-08-12', rows_per_month=6000, seed=seed)
+    df['交易时间'] = pd.to_datetime(df['交易时间'])
+    # 留出没有销售的日期，检查补0
+    df = df[df['交易时间'].dt.day != 6].copy()
+    df.loc[df.index[:4], MODEL] = None
+    return df
+
+
+def legacy_matrix(df, dim, dates):
+    """月报堆积图原写法"""
+    df = df.copy()
+    df['日期'] = df['交易时间'].dt.strftime('%Y-%m-%d')
+    order = df.groupby(dim, observed=True)[AMOUNT].sum().sort_values(ascending=False).index.tolist()
+    daily = df.groupby(['日期', dim], observed=True).agg({AMOUNT: 'sum', QTY: 'sum'}).reset_index()
+    rows = []
+    for value in order:
+        amounts = []
+        for date in dates:
+            data = daily[(daily['日期'] == date) & (daily[dim] == value)]
+            amounts.append(float(data.iloc[0][AMOUNT]) if not data.empty else 0.0)
+        rows.append(amounts)
+    return order, rows
+
+
+def test_matrices_match_nested_loop():
+    for df in (sample_frame(), compact_frame(sample_frame())):
+        dates = day_labels('2025-08-01', '2025-08-12')
+        trend = TrendMatrices(df, AMOUNT, QTY, [CAT, SHOP, MODEL], dates=dates)
+        for dim in (CAT, SHOP, MODEL):
+            order, rows = legacy_matrix(df, dim, dates)
+            matrix = trend.matrix(dim)
+            assert trend.order(dim) == order and list(matrix.index) == order
+            assert list(matrix.columns) == dates
+            assert np.allclose(matrix.to_numpy(float), np.array(rows))
+        assert (trend.matrix(CAT)['2025-08-06'] == 0).all()
+        assert np.allclose(trend.daily(QTY).to_numpy(float), trend.matrix(CAT, QTY).sum().to_numpy(float))
+        # 同一矩阵只计算一次
+        assert trend.matrix(SHOP) is trend.matrix(SHOP)
+    print("✅ 趋势矩阵与逐日筛选结果一致")
+
+
+def test_date_axis():
+    df = sample_frame()
+    trend = TrendMatrices(df, AMOUNT, QTY, [CAT, '不存在的列'])
+    assert trend.dates == day_labels('2025-08-01', '2025-08-12') and trend.dims == [CAT]
+    # 日期轴截短时排序仍按全部数据
+    short = TrendMatrices(df, AMOUNT, QTY, [CAT], dates=['2025-08-01', '2025-08-02'])
+    assert short.order(CAT) == trend.order(CAT)
+    assert np.isclose(short.totals(CAT).sum(), df[AMOUNT].sum())
+    assert short.matrix(CAT).shape == (len(trend.order(CAT)), 2)
+
+    empty = TrendMatrices(df.iloc[0:0], AMOUNT, QTY, [CAT, SHOP])
+    assert empty.dates == [] and empty.matrix(CAT).empty
+    print("✅ 日期轴测试通过")
+
+
+def decode_payload(data, category=-1, shop=-1, product=-1):
+    """按前端聚合逻辑把列式数据还原为每日金额/数量"""
+    series = data['series']
+    amount = np.zeros(len(data['dates']))
+    qty = np.zeros(len(data['dates']))
+    for d in range(len(data['dates'])):
+        for i in range(data['days'][d], data['days'][d + 1]):
+            k = data['rows']['series'][i]
+            if all(want < 0 or series[name][k] == want
+                   for name, want in (('category', category), ('shop', shop), ('product', product))):
+                amount[d] += data['rows']['amount'][i]
+                qty[d] += data['rows']['qty'][i]
+    return amount, qty
+
+
+def test_payload_round_trip():
+    df = sample_frame()
+    fields = {'category': CAT, 'shop': SHOP, 'product': MODEL}
+    trend = TrendMatrices(compact_frame(df), AMOUNT, QTY, [CAT, SHOP, MODEL])
+    data = trend.payload(fields)
+    assert data['dims']['category'] == [str(v) for v in trend.order(CAT)]
+    assert len(data['days']) == len(data['dates']) + 1 and data['days'][-1] == len(data['rows']['series'])
+    assert len(data['series']['category']) < len(data['rows']['series'])
+    day = df['交易时间'].dt.strftime('%Y-%m-%d')
+    for category, shop in ((-1, -1), (0, -1), (1, 2), (-1, 0)):
+        mask = pd.Series(True, index=df.index)
+        if category >= 0:
+            mask &= df[CAT] == data['dims']['category'][category]
+        if shop >= 0:
+            mask &= df[SHOP] == data['dims']['shop'][shop]
+        expected = df[mask].groupby(day[mask])[[AMOUNT, QTY]].sum().reindex(data['dates'], fill_value=0)
+        amount, qty = decode_payload(data, category, shop)
+        assert np.allclose(amount, expected[AMOUNT], atol=0.5 * (mask.sum() + 1))
+        assert np.array_equal(qty, expected[QTY].to_numpy(float))
+    # 空规格名称编码为-1
+    assert -1 in data['series']['product']
+
+    text = script_json({'label': '</script>'})
+    assert '</' not in text
+    empty = TrendMatrices(df.iloc[0:0], AMOUNT, QTY, [CAT, SHOP, MODEL]).payload(fields)
+    assert empty['rows']['series'] == [] and empty['days'] == [0]
+    print("✅ 列式数据还原结果一致")
+
+
+if __name__ == "__main__":
+    test_matrices_match_nested_loop()
+    test_date_axis()
+    test_payload_round_trip()
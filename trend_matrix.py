@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日期 × 维度趋势矩阵
+- 月报堆积趋势图原来对每个 (日期, 品类) 组合各做一次两列布尔筛选补零，
+  31天 × 40个品类就是上千次整表扫描，生成数据集时再按品类筛一遍
+- 这里先一次 groupby 汇总到 (日期, 品类, 店铺, 单品) 的日粒度，
+  品类/店铺/单品矩阵都在这个小表上 pivot_table，再 reindex 到完整日期轴补0
+- 不限定日期跨度，周报的7天、日报的近N天趋势同样适用
+- payload() 输出字典编码的列式数据，页面筛选由前端按行聚合，页面体积不随筛选项数量成倍增长
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+DATE_KEY = '日期'
+
+
+def day_labels(start, end):
+    """start~end（含）的日期文本列表 'YYYY-MM-DD'"""
+    return [d.strftime('%Y-%m-%d') for d in pd.date_range(start=start, end=end, freq='D')]
+
+
+class TrendMatrices:
+    """
+    按日汇总的趋势矩阵。
+    dates 为图表日期轴（'YYYY-MM-DD' 列表），不传时取数据的最早~最晚日期；
+    各维度的排序（totals/order）按全部数据计算，不受日期轴截取影响。
+    返回的 DataFrame 在多个调用方之间共享，不要原地修改。
+    """
+
+    def __init__(self, df, amount_col, qty_col, dimensions, date_col='交易时间', dates=None):
+        self.amount_col = amount_col
+        self.qty_col = qty_col
+        self.measures = [amount_col, qty_col]
+        self.dims = list(dict.fromkeys(col for col in dimensions if col in df.columns))
+        days = pd.to_datetime(df[date_col], errors='coerce').dt.normalize()
+        # 日粒度汇总（唯一一次扫描原始明细），空维度值保留，由各维度矩阵按 groupby 默认行为丢弃
+        base = df[self.dims + self.measures].assign(**{DATE_KEY: days})
+        base = base.groupby([DATE_KEY] + self.dims, observed=True, dropna=False, sort=False)[self.measures].sum()
+        base = base.reset_index()
+        base = base[base[DATE_KEY].notna()]
+        base[DATE_KEY] = base[DATE_KEY].dt.strftime('%Y-%m-%d')
+        self.base = base
+        if dates is None:
+            dates = day_labels(days.min(), days.max()) if days.notna().any() else []
+        self.dates = list(dates)
+        self._memo = {}
+
+    def totals(self, dim, measure=None):
+        """维度各取值的合计，从高到低"""
+        measure = measure or self.amount_col
+        key = ('totals', dim, measure)
+        if key not in self._memo:
+            self._memo[key] = self.base.groupby(dim, observed=True)[measure].sum().sort_values(ascending=False)
+        return self._memo[key]
+
+    def order(self, dim):
+        """按销售额从高到低的取值列表"""
+        return self.totals(dim).index.tolist()
+
+    def matrix(self, dim, measure=None):
+        """行为维度取值（按 order 排序）、列为 dates 的矩阵，缺的日期补0"""
+        measure = measure or self.amount_col
+        key = ('matrix', dim, measure)
+        if key not in self._memo:
+            table = self.base.pivot_table(index=dim, columns=DATE_KEY, values=measure,
+                                          aggfunc='sum', fill_value=0, observed=True)
+            self._memo[key] = table.reindex(index=self.order(dim), columns=self.dates, fill_value=0)
+        return self._memo[key]
+
+    def daily(self, measure=None):
+        """日期轴上的每日合计"""
+        measure = measure or self.amount_col
+        key = ('daily', measure)
+        if key not in self._memo:
+            series = self.base.groupby(DATE_KEY)[measure].sum()
+            self._memo[key] = series.reindex(self.dates, fill_value=0)
+        return self._memo[key]
+
+    def payload(self, fields, digits=0):
+        """
+        前端筛选用的列式数据（维度取值按销售额从高到低，空值下标为-1）：
+        - dims:   {名称: [取值...]}，fields 为 {名称: 列名}
+        - series: {名称: [下标...]}，出现过的维度组合（如 品类×店铺×单品），每个组合一条
+        - days:   按日期排好序的行在 rows 中的起止位置，第 i 天为 days[i]:days[i+1]
+        - rows:   {'series': [...], 'amount': [...], 'qty': [...]}，每个组合每天一行
+        金额默认取整到元（图表以万元显示），日期轴以外的行不输出
+        """
+        base = self.base
+        date_idx = pd.Categorical(base[DATE_KEY], categories=self.dates).codes.astype(np.int64)
+        keep = date_idx >= 0
+        data = {'dates': self.dates, 'dims': {}, 'series': {}}
+        codes = []
+        for name, col in fields.items():
+            values = self.order(col)
+            data['dims'][name] = [str(value) for value in values]
+            codes.append(pd.Categorical(base[col], categories=values).codes[keep].astype(np.int64))
+        if codes:
+            combos, series_idx = np.unique(np.column_stack(codes), axis=0, return_inverse=True)
+            series_idx = series_idx.reshape(-1)
+        else:
+            combos, series_idx = np.empty((1, 0), dtype=np.int64), np.zeros(int(keep.sum()), dtype=np.int64)
+        for pos, name in enumerate(fields):
+            data['series'][name] = combos[:, pos].tolist()
+
+        rows_date = date_idx[keep]
+        rank = np.lexsort((series_idx, rows_date))
+        data['days'] = np.searchsorted(rows_date[rank], np.arange(len(self.dates) + 1)).tolist()
+        data['rows'] = {
+            'series': series_idx[rank].tolist(),
+            'amount': _compact_numbers(base[self.amount_col].to_numpy(float)[keep][rank], digits),
+            'qty': _compact_numbers(base[self.qty_col].to_numpy(float)[keep][rank], 2),
+        }
+        return data
+
+
+def _compact_numbers(values, digits):
+    """按位数四舍五入；全为整数时输出int，JSON里不带 .0"""
+    values = np.round(values, digits)
+    return values.astype(np.int64).tolist() if np.array_equal(values, np.round(values)) else values.tolist()
+
+
+def script_json(data):
+    """序列化为可直接写进 <script> 的紧凑JSON"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
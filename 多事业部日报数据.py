@@ -20,7 +20,19 @@ import traceback
 import re
 import unicodedata
 import subprocess
-import pymysql
+from report_sync import load_daysales
+from report_schema import missing_required_columns
+from report_sql import date_range_predicate
+from report_db import get_connection
+from schema_registry import get_schema_registry, HT_FENXIAO_FIELDS
+from product_category import get_category_resolver
+from keyword_classifier import (
+    KeywordClassifier, Rule, ONLINE_SHOP, DEPT_CATEGORY, map_unique,
+    dept_force_categorize_product as force_categorize_product
+)
+from brushing_rules import DEPT_ERP_RULES, DEPT_FENXIAO_RULES
+from product_matcher import resolve_product_mapping, apply_product_mapping, add_shop_prefix
+from report_template import Template, HtmlWriter
 import logging
 import platform
 
@@ -54,6 +66,10 @@ DB_PASSWORD = "c973ee9b500cc638"
 DB_NAME = "Date"
 DB_CHARSET = "utf8mb4"
 
+def connect_db():
+    """从进程级连接池借出数据库连接（close()即归还）"""
+    return get_connection()
+
 # SSH隧道配置（备选方案）
 SSH_HOST = "212.64.57.87"
 SSH_USER = "root"
@@ -98,8 +114,7 @@ MODEL_COL = '规格名称'
 
 # ========== 工具函数 ==========
 def check_required_columns(df):
-    required_cols = [DATE_COL, AMOUNT_COL, QTY_COL, SHOP_COL, CATEGORY_COL, MODEL_COL]
-    missing = [c for c in required_cols if c not in df.columns]
+    missing = missing_required_columns(df)
     if missing:
         print(f"❌ 缺少必要的列: {missing}")
         print(f"当前列: {list(df.columns)}")
@@ -168,12 +183,6 @@ def to_number(val):
         except:
             return 0
 
-def is_online_shop(shop_name):
-    if not isinstance(shop_name, str):
-        return False
-    online_keywords = ['京东','天猫','拼多多','抖音','卡萨帝','小红书','淘宝','苏宁','国美']
-    return any(kw in shop_name for kw in online_keywords)
-
 def get_target_users(group_name, group_type):
     """根据分组名称和类型获取目标用户，确保去重"""
     users = set(always_users)  # 固定收件人
@@ -408,6 +417,14 @@ def calculate_ratio(current, previous):
     else:
         return "0%"
 
+ROW_CLASSES = ('growth-row', 'decline-row', 'neutral-row')
+CHANGE_CLASSES = ('change-positive', 'change-negative', 'change-neutral')
+
+def ratio_class(ratio, classes=CHANGE_CLASSES):
+    """按环比文本的正负号取上升/下降/持平样式类"""
+    up, down, flat = classes
+    return up if '+' in ratio else down if '-' in ratio else flat
+
 def to_pinyin(s):
     mapping = {
         '空调事业部': 'kongtiaoshiyebu',
@@ -427,9 +444,8 @@ def to_pinyin(s):
     s_ascii = re.sub(r'[^a-zA-Z0-9_]', '', s_ascii)
     return s_ascii.lower() or 'report'
 
-def generate_html_content(title_cn, content_text):
-    """统一的HTML生成函数，确保所有报告使用相同的格式，支持底色变化"""
-    html_content = f'''<!DOCTYPE html>
+# 报告页面外壳（样式表 + 正文），content_text 为已生成的HTML
+REPORT_PAGE = Template('''<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="utf-8">
@@ -618,43 +634,24 @@ def generate_html_content(title_cn, content_text):
     {content_text}
     <footer style="margin-top:2em;color:#888;font-size:0.9em;">自动生成 | Powered by EdgeOne Pages & 企业微信机器人</footer>
 </body>
-</html>'''
-    return html_content
+</html>''', 'REPORT_PAGE')
+
+def generate_html_content(title_cn, content_text):
+    """统一的HTML生成函数，确保所有报告使用相同的格式，支持底色变化"""
+    return REPORT_PAGE.render(title_cn=title_cn, content_text=content_text)
 
 # ========== 数据读取与预处理 ==========
 # 新增函数：从数据库获取分销数据
 def get_fenxiao_data(report_date):
     """从HT_fenxiao表获取分销数据"""
     try:
-        conn = pymysql.connect(
-            host=DB_HOST, port=DB_PORT, user=DB_USER, 
-            password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
-            connect_timeout=10
-        )
-        
-        # 使用fenxiaochanpin表进行商品匹配（已确认存在数据）
-        cursor = conn.cursor()
+        conn = connect_db()
         
-        # 获取HT_fenxiao表结构
-        cursor.execute("DESCRIBE HT_fenxiao")
-        columns = [row[0] for row in cursor.fetchall()]
-        logger.info(f"📊 HT_fenxiao表字段: {columns}")
-        
-        # 查找可能的字段名
-        amount_fields = [col for col in columns if '金额' in col or '实付' in col or '支付' in col]
-        shop_fields = [col for col in columns if '店铺' in col or '商店' in col]
-        status_fields = [col for col in columns if '状态' in col or '订单' in col]
-        time_fields = [col for col in columns if '时间' in col or '支付' in col]
-        product_fields = [col for col in columns if '产品' in col or '名称' in col]
-        qty_fields = [col for col in columns if '数量' in col or '采购数量' in col]
-        
-        # 选择最合适的字段名
-        amount_col = '用户实际支付总额' if '用户实际支付总额' in columns else (amount_fields[0] if amount_fields else '用户实际支付金额')
-        shop_col = '分销商店铺名称' if '分销商店铺名称' in columns else (shop_fields[0] if shop_fields else '分销商店铺名称')
-        status_col = '订单状态' if '订单状态' in columns else (status_fields[0] if status_fields else '订单状态')
-        time_col = '采购单支付时间' if '采购单支付时间' in columns else (time_fields[0] if time_fields else '采购单支付时间')
-        product_col = '产品名称' if '产品名称' in columns else (product_fields[0] if product_fields else '产品名称')
-        qty_col = '采购数量' if '采购数量' in columns else (qty_fields[0] if qty_fields else '采购数量')
+        # HT_fenxiao字段名不固定：列清单登记在本地，过期后才复核（见 schema_registry）
+        fields = get_schema_registry().resolve(conn, 'HT_fenxiao', HT_FENXIAO_FIELDS)
+        logger.info(f"📊 HT_fenxiao字段映射: {fields}")
+        amount_col, shop_col, status_col = fields['amount'], fields['shop'], fields['status']
+        time_col, product_col, qty_col = fields['time'], fields['product'], fields['qty']
         
         # 查询分销数据，使用动态字段名，确保订单状态过滤生效
         # 只过滤掉：未付款、已取消、已退货
@@ -669,7 +666,7 @@ def get_fenxiao_data(report_date):
             {qty_col} as 实发数量,
             '分销' as 数据来源
         FROM HT_fenxiao 
-        WHERE {time_col} LIKE '{report_date}%'
+        WHERE {date_range_predicate(time_col, report_date)}
         AND {status_col} NOT IN ('已取消', '未付款', '已退货')
         """
         
@@ -686,111 +683,29 @@ def get_fenxiao_data(report_date):
             for status, count in status_counts.items():
                 logger.info(f"   {status}: {count}条")
             
-            # 优化产品匹配逻辑：批量处理避免重复查询
+            # 产品名称匹配：映射缓存 -> fenxiaochanpin精确 -> 模糊候选 -> 规则分类（见 product_matcher）
             logger.info("🔄 尝试从fenxiaochanpin表匹配规格名称和货品名称...")
             
             # 获取所有唯一的产品名称
             unique_products = df_fenxiao['规格名称'].dropna().unique()
             logger.info(f"📊 需要匹配的唯一产品数量: {len(unique_products)}")
             
-            # 构建最终的产品映射缓存
-            final_product_mapping = {}
-            
-            # 批量查询fenxiaochanpin表
-            if len(unique_products) > 0:
-                placeholders = ','.join(['%s'] * len(unique_products))
-                batch_sql = f"SELECT 产品名称, 规格名称, 货品名称 FROM fenxiaochanpin WHERE 产品名称 IN ({placeholders})"
-                cursor.execute(batch_sql, tuple(unique_products))
-                fenxiao_results = cursor.fetchall()
-                
-                # 构建fenxiaochanpin映射
-                fenxiao_mapping = {}
-                for product_name, model_name, goods_name in fenxiao_results:
-                    fenxiao_mapping[product_name] = (model_name, goods_name)
-                
-                logger.info(f"📊 fenxiaochanpin表匹配到 {len(fenxiao_mapping)} 个产品")
-                
-                # 处理每个唯一产品
-                for product_name in unique_products:
-                    if not isinstance(product_name, str):
-                        continue
-                        
-                    if product_name in fenxiao_mapping:
-                        matched_model_name, matched_product_name = fenxiao_mapping[product_name]
-                        
-                        # 如果货品名称为空，从ERP数据查询
-                        if matched_product_name is None or matched_product_name == '':
-                            erp_sql = "SELECT 货品名称 FROM Daysales WHERE 规格名称 = %s AND 货品名称 IS NOT NULL AND 货品名称 != '' LIMIT 1"
-                            cursor.execute(erp_sql, (matched_model_name,))
-                            erp_result = cursor.fetchone()
-                            if erp_result:
-                                matched_product_name = erp_result[0]
-                                logger.info(f"   ✅ 从ERP数据匹配货品名称: {matched_model_name} -> {matched_product_name}")
-                            else:
-                                # 关键词匹配
-                                import re
-                                keywords = []
-                                model_patterns = re.findall(r'[A-Z0-9]{3,}', product_name.upper())
-                                keywords.extend(model_patterns)
-                                chinese_words = re.findall(r'[\u4e00-\u9fff]+', product_name)
-                                for word in chinese_words:
-                                    if len(word) >= 2 and word not in ['大容量', '家用', '独立式', '变频', '超一级', '水效', '升级款', '就近仓', '新品上市', '超大容量']:
-                                        keywords.append(word)
-                                
-                                matched_by_keyword = False
-                                for keyword in keywords[:3]:
-                                    keyword_sql = "SELECT 货品名称 FROM Daysales WHERE 货品名称 LIKE %s AND 货品名称 IS NOT NULL AND 货品名称 != '' LIMIT 1"
-                                    cursor.execute(keyword_sql, (f'%{keyword}%',))
-                                    keyword_result = cursor.fetchone()
-                                    if keyword_result:
-                                        matched_product_name = keyword_result[0]
-                                        logger.info(f"   ✅ 通过关键词'{keyword}'匹配到货品名称: {matched_product_name}")
-                                        matched_by_keyword = True
-                                        break
-                                
-                                if not matched_by_keyword:
-                                    matched_product_name = force_categorize_product(product_name)
-                                    logger.info(f"   ⚠️ 所有匹配方式都失败，强制匹配到品类: {product_name} -> {matched_product_name}")
-                        
-                        final_product_mapping[product_name] = {
-                            '规格名称': matched_model_name,
-                            '货品名称': matched_product_name
-                        }
-                        logger.info(f"   ✅ 匹配成功: {product_name} -> 规格名称:{matched_model_name}, 货品名称:{matched_product_name}")
-                    else:
-                        logger.info(f"   ⚠️ 未匹配到: {product_name}，使用原产品名称")
-                        final_product_mapping[product_name] = {
-                            '规格名称': product_name,
-                            '货品名称': product_name
-                        }
+            final_product_mapping = resolve_product_mapping(
+                conn, unique_products,
+                categorize=categorize_product_for_fenxiao,
+                force_categorize=force_categorize_product
+            )
             
-            # 批量应用映射结果
+            # 批量应用映射结果（按去重产品名称广播，不逐行iterrows）
             logger.info("🔄 批量应用产品映射结果...")
-            for index, row in df_fenxiao.iterrows():
-                product_name = row['规格名称']
-                if isinstance(product_name, str) and product_name in final_product_mapping:
-                    mapping = final_product_mapping[product_name]
-                    df_fenxiao.at[index, '规格名称'] = mapping['规格名称']
-                    df_fenxiao.at[index, '货品名称'] = mapping['货品名称']
+            apply_product_mapping(df_fenxiao, final_product_mapping)
             
             # 添加品类字段
             logger.info("🔄 添加品类字段...")
-            df_fenxiao['品类'] = df_fenxiao['货品名称'].apply(categorize_product)
+            df_fenxiao['品类'] = map_unique(df_fenxiao['货品名称'], categorize_product)
             
-            # 为所有ht_fenxiao数据统一添加"京东-"前缀
-            def add_jingdong_prefix(shop_name):
-                if not isinstance(shop_name, str):
-                    return shop_name
-                
-                # 如果已经有"京东-"前缀，直接返回
-                if shop_name.startswith('京东-'):
-                    return shop_name
-                
-                # 统一添加"京东-"前缀
-                return f"京东-{shop_name}"
-            
-            # 为所有分销商店铺名称添加"京东-"前缀
-            df_fenxiao['店铺'] = df_fenxiao['店铺'].apply(add_jingdong_prefix)
+            # 为所有分销商店铺名称统一添加"京东-"前缀
+            df_fenxiao['店铺'] = add_shop_prefix(df_fenxiao['店铺'])
             
             logger.info(f"📊 分销数据字段: {df_fenxiao.columns.tolist()}")
             logger.info(f"📊 分销数据前3行:")
@@ -806,67 +721,15 @@ def get_fenxiao_data(report_date):
             
     except Exception as e:
         logger.error(f"❌ 获取分销数据失败: {e}")
+        # 字段可能已变化，下次查询前重新登记HT_fenxiao表结构
+        get_schema_registry().invalidate('HT_fenxiao')
         if 'conn' in locals():
             conn.close()
         return pd.DataFrame()
 
 def get_product_category_from_db(product_name):
-    """从fenxiaochanpin数据库表中获取产品品类信息"""
-    if not isinstance(product_name, str):
-        return None
-    
-    try:
-        conn = pymysql.connect(
-            host=DB_HOST, port=DB_PORT, user=DB_USER, 
-            password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
-            connect_timeout=10
-        )
-        
-        # 首先检查fenxiaochanpin表是否存在
-        cursor = conn.cursor()
-        cursor.execute("SHOW TABLES LIKE 'fenxiaochanpin'")
-        if not cursor.fetchone():
-            logger.warning("⚠️ fenxiaochanpin表不存在，将使用产品名称识别品类")
-            conn.close()
-            return None
-        
-        # 检查表结构，查找品类字段
-        cursor.execute("DESCRIBE fenxiaochanpin")
-        columns = [row[0] for row in cursor.fetchall()]
-        logger.info(f"📊 fenxiaochanpin表字段: {columns}")
-        
-        # 查找产品名称和品类字段
-        product_cols = [col for col in columns if '产品' in col or '名称' in col or '规格' in col]
-        category_cols = [col for col in columns if '品类' in col or '分类' in col or 'category' in col.lower()]
-        
-        if not product_cols or not category_cols:
-            logger.warning("⚠️ fenxiaochanpin表中未找到产品名称或品类字段")
-            conn.close()
-            return None
-        
-        product_col = product_cols[0]
-        category_col = category_cols[0]
-        
-        logger.info(f"🔍 使用字段: 产品名称={product_col}, 品类={category_col}")
-        
-        # 查询产品品类
-        sql = f"SELECT {category_col} FROM fenxiaochanpin WHERE {product_col} = %s LIMIT 1"
-        cursor.execute(sql, (product_name,))
-        result = cursor.fetchone()
-        
-        if result and result[0]:
-            category = result[0]
-            logger.info(f"✅ 数据库匹配成功: {product_name} -> {category}")
-            conn.close()
-            return category
-        else:
-            logger.info(f"⚠️ 数据库未匹配到: {product_name}")
-            conn.close()
-            return None
-            
-    except Exception as e:
-        logger.error(f"❌ 从fenxiaochanpin表获取品类失败: {e}")
-        return None
+    """从fenxiaochanpin数据库表中获取产品品类信息（表结构和品类字典每个进程只加载一次）"""
+    return get_category_resolver(connect_db).lookup(product_name)
 
 def categorize_product(product_name):
     """从产品名称中识别品类，优先使用数据库匹配"""
@@ -878,66 +741,15 @@ def categorize_product(product_name):
     if db_category:
         return db_category
     
-    # 如果数据库匹配失败，使用关键词识别
-    product_name_lower = product_name.lower()
-    
-    # 品类关键词映射
-    category_keywords = {
-        "家用空调": ["空调", "挂机", "柜机", "中央空调", "分体式"],
-        "商用空调": ["商用", "商用空调", "多联机", "风管机"],
-        "冰箱": ["冰箱", "冷柜", "冰柜", "冷藏", "冷冻"],
-        "洗衣机": ["洗衣机", "洗烘一体", "滚筒", "波轮"],
-        "洗碗机": ["洗碗机", "洗碗", "洗碟机"],  # 洗碗机独立为一个品类
-        "热水器": ["热水器", "电热水器", "燃气热水器", "多能源热水器"],
-        "净水": ["净水", "净水器", "净水机", "过滤器"],
-        "采暖": ["采暖", "暖气", "地暖", "壁挂炉"],
-        "厨电": ["厨电", "油烟机", "燃气灶", "消毒柜", "蒸箱", "烤箱"]  # 移除洗碗机
-    }
-    
-    for category, keywords in category_keywords.items():
-        if any(keyword in product_name_lower for keyword in keywords):
-            logger.info(f"🔍 关键词匹配: {product_name} -> {category}")
-            return category
+    # 如果数据库匹配失败，使用关键词识别（规则见 keyword_classifier.DEPT_CATEGORY_KEYWORDS）
+    category = DEPT_CATEGORY.classify(product_name)
+    if category:
+        logger.info(f"🔍 关键词匹配: {product_name} -> {category}")
+        return category
     
     logger.info(f"⚠️ 未匹配到品类: {product_name}，归类为其他")
     return "其他"
 
-def force_categorize_product(product_name):
-    """强制将产品名称匹配到八个预定义品类之一"""
-    if not isinstance(product_name, str):
-        return "冰箱"
-    
-    product_name_lower = product_name.lower()
-    
-    # 八个预定义品类的关键词
-    category_keywords = {
-        "洗碗机": ["洗碗机", "洗碗", "洗碟机", "洗碟"],
-        "冰箱": ["冰箱", "冷藏", "冷冻", "保鲜"],
-        "洗衣机": ["洗衣机", "洗烘一体", "滚筒", "波轮", "洗衣"],
-        "冷柜": ["冷柜", "冰柜", "展示柜", "冷藏柜", "冷冻柜"],
-        "家用空调": ["空调", "挂机", "柜机", "分体式", "壁挂", "立式"],
-        "商空空调": ["商用", "商用空调", "多联机", "风管机", "中央空调", "商空"],
-        "厨电": ["厨电", "油烟机", "燃气灶", "消毒柜", "蒸箱", "烤箱", "灶具"],
-        "热水器": ["热水器", "电热水器", "燃气热水器", "多能源热水器", "热水"]
-    }
-    
-    # 优先匹配
-    for category, keywords in category_keywords.items():
-        if any(keyword in product_name_lower for keyword in keywords):
-            return category
-    
-    # 智能判断逻辑
-    if any(word in product_name_lower for word in ["海尔", "美的", "格力", "tcl", "容声"]):
-        if any(word in product_name_lower for word in ["升", "l", "容量"]):
-            return "冰箱"
-        elif any(word in product_name_lower for word in ["kg", "公斤", "洗"]):
-            return "洗衣机"
-        elif any(word in product_name_lower for word in ["匹", "p", "制冷", "制热"]):
-            return "家用空调"
-    
-    # 默认兜底
-    return "冰箱"
-
 def categorize_product_for_fenxiao(product_name):
     """从产品名称中识别品类，优先使用数据库匹配"""
     if not isinstance(product_name, str):
@@ -948,25 +760,9 @@ def categorize_product_for_fenxiao(product_name):
     if db_category:
         return db_category
     
-    # 如果数据库匹配失败，使用关键词识别
-    product_name_lower = product_name.lower()
-    
-    # 品类关键词映射
-    category_keywords = {
-        "家用空调": ["空调", "挂机", "柜机", "中央空调", "分体式"],
-        "商用空调": ["商用", "商用空调", "多联机", "风管机"],
-        "冰箱": ["冰箱", "冷柜", "冰柜", "冷藏", "冷冻"],
-        "洗衣机": ["洗衣机", "洗烘一体", "滚筒", "波轮"],
-        "洗碗机": ["洗碗机", "洗碗", "洗碟机"],  # 洗碗机独立为一个品类
-        "热水器": ["热水器", "电热水器", "燃气热水器", "多能源热水器"],
-        "净水": ["净水", "净水器", "净水机", "过滤器"],
-        "采暖": ["采暖", "暖气", "地暖", "壁挂炉"],
-        "厨电": ["厨电", "油烟机", "燃气灶", "消毒柜", "蒸箱", "烤箱"]  # 移除洗碗机
-    }
-    
-    for category, keywords in category_keywords.items():
-        if any(keyword in product_name_lower for keyword in keywords):
-            return category
+    category = DEPT_CATEGORY.classify(product_name)
+    if category:
+        return category
     
     logger.info(f"⚠️ 未匹配到品类: {product_name}，归类为其他")
     return "其他"
@@ -1002,7 +798,7 @@ def identify_tianmao_fenxiao(df):
             # 添加分销标识
             tianmao_fenxiao['数据来源'] = '分销'
             # 使用原有的货品名称进行品类识别
-            tianmao_fenxiao[CATEGORY_COL] = tianmao_fenxiao[CATEGORY_COL].apply(categorize_product_for_fenxiao)
+            tianmao_fenxiao[CATEGORY_COL] = map_unique(tianmao_fenxiao[CATEGORY_COL], categorize_product_for_fenxiao)
             logger.info(f"📊 识别到天猫分销数据: {len(tianmao_fenxiao)}行")
             logger.info(f"📊 天猫分销数据示例:")
             for i, row in tianmao_fenxiao.head(3).iterrows():
@@ -1020,14 +816,7 @@ def identify_tianmao_fenxiao(df):
 # 新增函数：从数据库获取ERP数据
 def get_erp_data(report_date):
     try:
-        conn = pymysql.connect(
-            host=DB_HOST, port=DB_PORT, user=DB_USER, 
-            password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
-            connect_timeout=10
-        )
-        df = pd.read_sql(f"SELECT * FROM Daysales WHERE 交易时间 LIKE '{report_date}%'", conn)
-        conn.close()
-        return df
+        return load_daysales(report_date, connect=connect_db)
     except Exception as e:
         logger.error(f"❌ 从数据库获取ERP数据失败: {e}")
         return None
@@ -1035,14 +824,7 @@ def get_erp_data(report_date):
 # 新增函数：从数据库获取同期数据
 def get_prev_data(prev_date):
     try:
-        conn = pymysql.connect(
-            host=DB_HOST, port=DB_PORT, user=DB_USER, 
-            password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
-            connect_timeout=10
-        )
-        df = pd.read_sql(f"SELECT * FROM Daysales WHERE 交易时间 LIKE '{prev_date}%'", conn)
-        conn.close()
-        return df
+        return load_daysales(prev_date, connect=connect_db)
     except Exception as e:
         logger.error(f"❌ 从数据库获取同期数据失败: {e}")
         return None
@@ -1065,61 +847,12 @@ def preprocess_data(df, df_fenxiao=None, df_tianmao_fenxiao=None):
         df = df[df[AMOUNT_COL] > 0]
         after_amount_filter = len(df)
         
-        # 添加客服备注关键词过滤
-        def is_brushing_order(row):
-            """判断是否为刷单订单"""
-            keywords = ['抽纸', '纸巾', '刷单', '测试', '虚拟']
-            exact_match_keywords = ['完全=不发货', '不发货']  # 精确匹配
-            
-            # 检查客服备注
-            if '客服备注' in row.index and pd.notna(row['客服备注']):
-                remark = str(row['客服备注']).strip()
-                # 检查精确匹配
-                for exact_keyword in exact_match_keywords:
-                    if exact_keyword == remark:
-                        return True
-                # 检查包含关键词
-                remark_lower = remark.lower()
-                for keyword in keywords:
-                    if keyword.lower() in remark_lower:
-                        return True
-            
-            # 检查买家留言
-            if '买家留言' in row.index and pd.notna(row['买家留言']):
-                message = str(row['买家留言']).strip()
-                # 检查精确匹配
-                for exact_keyword in exact_match_keywords:
-                    if exact_keyword == message:
-                        return True
-                # 检查包含关键词
-                message_lower = message.lower()
-                for keyword in keywords:
-                    if keyword.lower() in message_lower:
-                        return True
-            
-            # 检查备注字段
-            if '备注' in row.index and pd.notna(row['备注']):
-                note = str(row['备注']).strip()
-                # 检查精确匹配
-                for exact_keyword in exact_match_keywords:
-                    if exact_keyword == note:
-                        return True
-                # 检查包含关键词
-                note_lower = note.lower()
-                for keyword in keywords:
-                    if keyword.lower() in note_lower:
-                        return True
-            
-            return False
-        
-        # 应用刷单过滤
-        brushing_mask = df.apply(is_brushing_order, axis=1)
-        df = df[~brushing_mask]
+        # 客服备注/买家留言/备注关键词过滤（规则见 brushing_rules.DEPT_ERP_RULES）
+        df, filtered_count = DEPT_ERP_RULES.apply(df, log=logger.info)
         after_brushing_filter = len(df)
         
         logger.info(f"📊 刷单过滤: {initial_count} -> {after_amount_filter} (金额过滤) -> {after_brushing_filter} (客服备注过滤)")
         if initial_count > after_brushing_filter:
-            filtered_count = brushing_mask.sum()
             logger.info(f"📊 客服备注刷单过滤: 过滤掉 {filtered_count} 条记录")
         
         # 3. 订单状态过滤 - 只过滤掉：未付款、已取消、已退货
@@ -1131,7 +864,7 @@ def preprocess_data(df, df_fenxiao=None, df_tianmao_fenxiao=None):
         
         # 4. 过滤线上店铺
         initial_count = len(df)
-        df = df[df[SHOP_COL].apply(is_online_shop)]
+        df = df[ONLINE_SHOP.mask(df[SHOP_COL])]
         logger.info(f"📊 线上店铺过滤: {initial_count} -> {len(df)}")
         
         # 5. 过滤五大渠道
@@ -1167,48 +900,10 @@ def preprocess_data(df, df_fenxiao=None, df_tianmao_fenxiao=None):
             # 确保天猫分销数据也进行订单状态过滤
             df_tianmao_fenxiao = df_tianmao_fenxiao[~df_tianmao_fenxiao['订单状态'].isin(invalid_status)]
             
-            # 为分销数据添加客服备注刷单筛选
+            # 为分销数据添加刷单筛选（订单备注/买家留言/备注）
             def filter_fenxiao_brushing(df_fenxiao):
                 """为分销数据添加刷单筛选"""
-                if df_fenxiao.empty:
-                    return df_fenxiao
-                
-                keywords = ['抽纸', '纸巾', '刷单', '测试', '虚拟']
-                exact_match_keywords = ['完全=不发货', '不发货']  # 精确匹配
-                
-                # 检查订单备注和买家留言字段
-                def is_brushing_fenxiao(row):
-                    fields_to_check = []
-                    
-                    # 收集所有需要检查的字段
-                    if '订单备注' in row.index and pd.notna(row['订单备注']):
-                        fields_to_check.append(str(row['订单备注']).strip())
-                    if '买家留言' in row.index and pd.notna(row['买家留言']):
-                        fields_to_check.append(str(row['买家留言']).strip())
-                    if '备注' in row.index and pd.notna(row['备注']):
-                        fields_to_check.append(str(row['备注']).strip())
-                    
-                    # 检查每个字段
-                    for field in fields_to_check:
-                        # 检查精确匹配
-                        for exact_keyword in exact_match_keywords:
-                            if exact_keyword == field:
-                                return True
-                        
-                        # 检查包含关键词
-                        field_lower = field.lower()
-                        for keyword in keywords:
-                            if keyword.lower() in field_lower:
-                                return True
-                    
-                    return False
-                
-                brushing_mask = df_fenxiao.apply(is_brushing_fenxiao, axis=1)
-                filtered_df = df_fenxiao[~brushing_mask]
-                
-                if brushing_mask.sum() > 0:
-                    logger.info(f"📊 分销数据刷单过滤: 过滤掉 {brushing_mask.sum()} 条记录")
-                
+                filtered_df, _ = DEPT_FENXIAO_RULES.apply(df_fenxiao, log=logger.info)
                 return filtered_df
             
             df_tianmao_fenxiao = filter_fenxiao_brushing(df_tianmao_fenxiao)
@@ -1264,46 +959,107 @@ CHANNEL_NAME_MAP = {
     "抖音渠道": "抖音渠道",
     "快手渠道": "抖音渠道"
 }
-def classify_channel(shop_name):
-    if not isinstance(shop_name, str):
-        return "其他"
-    # 卡萨帝优先
-    if any(kw in shop_name for kw in CHANNEL_GROUPS['卡萨帝渠道']['keywords']):
-        return "卡萨帝渠道"
-    if any(kw in shop_name for kw in CHANNEL_GROUPS['京东渠道']['keywords']):
-        return "京东渠道"
-    if any(kw in shop_name for kw in CHANNEL_GROUPS['天猫渠道']['keywords']) and not any(kw in shop_name for kw in CHANNEL_GROUPS['卡萨帝渠道']['keywords']):
-        return "天猫渠道"
-    if any(kw in shop_name for kw in CHANNEL_GROUPS['拼多多渠道']['keywords']):
-        return "拼多多渠道"
-    if any(kw in shop_name for kw in CHANNEL_GROUPS['抖音渠道']['keywords']):
-        return "抖音渠道"
-    return "其他"
+# 渠道归类：卡萨帝优先，其后京东、天猫、拼多多、抖音（按去重店铺名计算后广播）
+CHANNEL_CLASSIFIER = KeywordClassifier.from_groups(
+    CHANNEL_GROUPS, order=["卡萨帝渠道", "京东渠道", "天猫渠道", "拼多多渠道", "抖音渠道"], default="其他"
+)
 
-def generate_group_report(group_name, group_type, keywords, df, df_prev, report_date):
-    if group_type == 'business':
-        # 修复事业部筛选逻辑：对于分销数据使用品类列，对于ERP数据使用货品名称列
-        def business_filter(row):
-            # 如果是分销数据，使用品类列筛选
-            if '数据来源' in row and row['数据来源'] == '分销' and '品类' in row:
-                return any(kw in str(row['品类']) for kw in keywords)
-            # 如果是ERP数据，使用货品名称列筛选
-            else:
-                return any(kw in str(row[CATEGORY_COL]) for kw in keywords)
-        
-        group_df = df[df.apply(business_filter, axis=1)]
-        prev_group_df = df_prev[df_prev.apply(business_filter, axis=1)] if df_prev is not None else None
+def classify_channel(shop_name):
+    return CHANNEL_CLASSIFIER.classify(shop_name)
+
+# 事业部/渠道成员矩阵：每个分组一个布尔列，品类/店铺名去重后只匹配一次
+BUSINESS_MEMBERSHIP = KeywordClassifier.from_groups(business_groups, default=None)
+CHANNEL_MEMBERSHIP = KeywordClassifier([
+    # 卡萨帝优先：天猫渠道排除卡萨帝/小红书店铺，其余渠道按关键词直接归属
+    Rule(name, conf['keywords'], none_of=CHANNEL_GROUPS['卡萨帝渠道']['keywords'] if name == '天猫渠道' else ())
+    for name, conf in CHANNEL_GROUPS.items()
+], default=None)
+
+def build_group_membership(df):
+    """返回与df逐行对齐的布尔矩阵，列为各事业部和渠道分组"""
+    if df is None:
+        return None
+    if df.empty or CATEGORY_COL not in df.columns or SHOP_COL not in df.columns:
+        # 同期无数据（空表可能连列都没有）：返回列齐全的全False矩阵，各分组按无同期处理
+        category_text = shop_text = None
     else:
-        # 渠道分组，卡萨帝优先
-        if group_name == '卡萨帝渠道':
-            group_df = df[df[SHOP_COL].apply(lambda x: any(kw in str(x) for kw in CHANNEL_GROUPS['卡萨帝渠道']['keywords']))]
-            prev_group_df = df_prev[df_prev[SHOP_COL].apply(lambda x: any(kw in str(x) for kw in CHANNEL_GROUPS['卡萨帝渠道']['keywords']))] if df_prev is not None else None
-        elif group_name == '天猫渠道':
-            group_df = df[df[SHOP_COL].apply(lambda x: (any(kw in str(x) for kw in CHANNEL_GROUPS['天猫渠道']['keywords'])) and not any(kw in str(x) for kw in CHANNEL_GROUPS['卡萨帝渠道']['keywords']))]
-            prev_group_df = df_prev[df_prev[SHOP_COL].apply(lambda x: (any(kw in str(x) for kw in CHANNEL_GROUPS['天猫渠道']['keywords'])) and not any(kw in str(x) for kw in CHANNEL_GROUPS['卡萨帝渠道']['keywords']))] if df_prev is not None else None
-        else:
-            group_df = df[df[SHOP_COL].apply(lambda x: any(kw in str(x) for kw in CHANNEL_GROUPS[group_name]['keywords']))]
-            prev_group_df = df_prev[df_prev[SHOP_COL].apply(lambda x: any(kw in str(x) for kw in CHANNEL_GROUPS[group_name]['keywords']))] if df_prev is not None else None
+        category_text = df[CATEGORY_COL]
+        shop_text = df[SHOP_COL]
+        if '数据来源' in df.columns and '品类' in df.columns:
+            # 分销数据使用品类列筛选，ERP数据使用货品名称列筛选
+            category_text = df['品类'].where(df['数据来源'] == '分销', df[CATEGORY_COL])
+    return pd.concat([
+        BUSINESS_MEMBERSHIP.membership(category_text, index=df.index),
+        CHANNEL_MEMBERSHIP.membership(shop_text, index=df.index),
+    ], axis=1)
+
+# ========== 事业部日报页面片段 ==========
+GROUP_REPORT_HEAD = Template('''<div class="report-container">
+    <h1>🏢 {group_name}日报</h1>
+    <p class="report-date">📅 数据日期: {report_date}</p>
+    
+    <div class="section">
+        <h2>📊 整体数据</h2>''', 'GROUP_REPORT_HEAD')
+METRIC_ROW = Template('''
+        <div class="metric-row">
+            <span class="metric-label">{label}:</span>
+            <span class="metric-value">{prefix}{value:,}{suffix}</span>
+            <span class="metric-change {change_class}">{ratio}</span>
+        </div>''', 'METRIC_ROW')
+SECTION_BREAK = Template('''
+    </div>
+    
+    <div class="section">
+        <h2>{title}</h2>''', 'SECTION_BREAK')
+CATEGORY_ITEM = Template('''
+        <div class="category-item {row_class}">
+            <div class="product-name">{name}</div>
+            <div class="product-stats">销售额: ¥{amount:,} ({ratio}) | 销量: {qty:,}件 ({qty_ratio}) | 单价: ¥{price:,}</div>''', 'CATEGORY_ITEM')
+# 渠道和TOP单品
+PRICED_ITEM = Template('''
+        <div class="shop-item {row_class}">
+            <div class="product-name">{name}</div>
+            <div class="product-stats">¥{amount:,} | {qty:,}件 | ¥{price:,}/件（对比:¥{prev_amount:,}，环比:{ratio}）</div>''', 'PRICED_ITEM')
+SHOP_ITEM = Template('''
+        <div class="shop-item {row_class}">
+            <div class="product-name">{name}</div>
+            <div class="product-stats">¥{amount:,} | {qty:,}件（对比:¥{prev_amount:,}，环比:{ratio}）</div>''', 'SHOP_ITEM')
+FENXIAO_INFO_PRICED = Template('''
+            <div class="fenxiao-info">分销数据: ¥{amount:,} | {qty:,}件 | ¥{price:,}/件</div>''', 'FENXIAO_INFO_PRICED')
+FENXIAO_INFO = Template('''
+            <div class="fenxiao-info">分销数据: ¥{amount:,} | {qty:,}件</div>''', 'FENXIAO_INFO')
+ITEM_CLOSE = '''
+        </div>'''
+SHOP_PRODUCT_GROUP = Template('''
+        <div class="shop-item">
+            <h3 style="color: #0056b3; margin-bottom: 15px;">📍 {shop}</h3>''', 'SHOP_PRODUCT_GROUP')
+SHOP_PRODUCT_ROW = Template('''
+            <div class="{row_class}" style="margin: 8px 0; padding: 10px; border-radius: 5px; border-left: 3px solid #ccc;">
+                <div style="font-weight: bold; color: #495057;">{model}</div>
+                <div style="font-size: 14px; color: #6c757d; margin-top: 5px;">
+                    销售额: ¥{amount:,} <span class="metric-change {amount_class}">{amount_ratio}</span> | 
+                    销量: {qty:,}件 <span class="metric-change {qty_class}">{qty_ratio}</span> | 
+                    单价: ¥{price:,}/件
+                </div>''', 'SHOP_PRODUCT_ROW')
+SHOP_PRODUCT_FENXIAO = Template('''
+                <div class="fenxiao-info">分销: ¥{amount:,} | {qty:,}件</div>''', 'SHOP_PRODUCT_FENXIAO')
+SHOP_PRODUCT_ROW_CLOSE = '''
+            </div>'''
+GROUP_REPORT_TAIL = '''
+    </div>
+</div>'''
+
+def generate_group_report(group_name, group_type, keywords, df, df_prev, report_date, membership=None, prev_membership=None):
+    # membership/prev_membership 为 build_group_membership 的结果，多个分组共用，未传入时现算
+    if membership is None:
+        membership = build_group_membership(df)
+    if prev_membership is None:
+        prev_membership = build_group_membership(df_prev)
+    group_df = df[membership[group_name].to_numpy()]
+    prev_group_df = df_prev[prev_membership[group_name].to_numpy()] if df_prev is not None else None
+    if prev_group_df is not None and prev_group_df.empty:
+        # 该分组同期无数据时按无同期处理，同期金额/数量均记0
+        prev_group_df = None
     
     # 添加调试信息
     logger.info(f"🔍 {group_name} 匹配数据量: {len(group_df)} 行")
@@ -1409,12 +1165,12 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
     channel_data = None
     prev_channel_data = None
     if group_type == 'business':
-        group_df_clean['渠道'] = group_df_clean[SHOP_COL].apply(classify_channel)
+        group_df_clean['渠道'] = CHANNEL_CLASSIFIER.classify_series(group_df_clean[SHOP_COL])
         channel_data = group_df_clean.groupby('渠道').agg({AMOUNT_COL: 'sum', QTY_COL: 'sum'}).reset_index()
         channel_data = channel_data[channel_data['渠道'].isin(CHANNEL_GROUPS.keys())]
         channel_data = channel_data.sort_values(AMOUNT_COL, ascending=False)
         if prev_group_df is not None:
-            prev_group_df_clean['渠道'] = prev_group_df_clean[SHOP_COL].apply(classify_channel)
+            prev_group_df_clean['渠道'] = CHANNEL_CLASSIFIER.classify_series(prev_group_df_clean[SHOP_COL])
             prev_channel_data = prev_group_df_clean.groupby('渠道').agg({AMOUNT_COL: 'sum', QTY_COL: 'sum'}).reset_index()
     
     # 渠道分销数据
@@ -1422,7 +1178,7 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
     if group_type == 'business' and '数据来源' in group_df_clean.columns:
         fenxiao_df = group_df_clean[group_df_clean['数据来源'] == '分销']
         if not fenxiao_df.empty:
-            fenxiao_df['渠道'] = fenxiao_df[SHOP_COL].apply(classify_channel)
+            fenxiao_df['渠道'] = CHANNEL_CLASSIFIER.classify_series(fenxiao_df[SHOP_COL])
             channel_fenxiao_data = fenxiao_df.groupby('渠道').agg({AMOUNT_COL: 'sum', QTY_COL: 'sum'}).reset_index()
             channel_fenxiao_data = channel_fenxiao_data.sort_values(AMOUNT_COL, ascending=False)
             logger.info(f"📊 渠道分销数据: {len(channel_fenxiao_data)}个渠道")
@@ -1511,43 +1267,21 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
         product_data = product_data.sort_values(AMOUNT_COL, ascending=False)
     
     # ---------- 统一分段版 ----------
-    web_content = f"""<div class="report-container">
-    <h1>🏢 {group_name}日报</h1>
-    <p class="report-date">📅 数据日期: {report_date}</p>
-    
-    <div class="section">
-        <h2>📊 整体数据</h2>
-        <div class="metric-row">
-            <span class="metric-label">总销售额:</span>
-            <span class="metric-value">¥{total_amount:,}</span>
-            <span class="metric-change {'change-positive' if '+' in calculate_ratio(total_amount, prev_amount) and calculate_ratio(total_amount, prev_amount) != '(0%)' else 'change-negative' if '-' in calculate_ratio(total_amount, prev_amount) and calculate_ratio(total_amount, prev_amount) != '(0%)' else 'change-neutral'}">{calculate_ratio(total_amount, prev_amount)}</span>
-        </div>
-        <div class="metric-row">
-            <span class="metric-label">总销量:</span>
-            <span class="metric-value">{total_qty:,}件</span>
-            <span class="metric-change {'change-positive' if '+' in calculate_ratio(total_qty, prev_qty) and calculate_ratio(total_qty, prev_qty) != '(0%)' else 'change-negative' if '-' in calculate_ratio(total_qty, prev_qty) and calculate_ratio(total_qty, prev_qty) != '(0%)' else 'change-neutral'}">{calculate_ratio(total_qty, prev_qty)}</span>
-        </div>
-        <div class="metric-row">
-            <span class="metric-label">平均单价:</span>
-            <span class="metric-value">¥{avg_price:,}</span>
-            <span class="metric-change {'change-positive' if '+' in calculate_ratio(avg_price, prev_avg_price) and calculate_ratio(avg_price, prev_avg_price) != '(0%)' else 'change-negative' if '-' in calculate_ratio(avg_price, prev_avg_price) and calculate_ratio(avg_price, prev_avg_price) != '(0%)' else 'change-neutral'}">{calculate_ratio(avg_price, prev_avg_price)}</span>
-        </div>"""
+    web = HtmlWriter()
+    web.render(GROUP_REPORT_HEAD, group_name=group_name, report_date=report_date)
+    for label, prefix, value, prev_value, suffix in (('总销售额', '¥', total_amount, prev_amount, ''),
+                                                      ('总销量', '', total_qty, prev_qty, '件'),
+                                                      ('平均单价', '¥', avg_price, prev_avg_price, '')):
+        ratio = calculate_ratio(value, prev_value)
+        web.render(METRIC_ROW, label=label, prefix=prefix, value=value, suffix=suffix, change_class=ratio_class(ratio), ratio=ratio)
 
     # 添加分销数据到整体数据
     if fenxiao_amount > 0:
-        web_content += f"""
-        <div class="metric-row">
-            <span class="metric-label">分销销售:</span>
-            <span class="metric-value">¥{fenxiao_amount:,}</span>
-            <span class="metric-change {'change-positive' if '+' in calculate_ratio(fenxiao_amount, prev_fenxiao_amount) and calculate_ratio(fenxiao_amount, prev_fenxiao_amount) != '(0%)' else 'change-negative' if '-' in calculate_ratio(fenxiao_amount, prev_fenxiao_amount) and calculate_ratio(fenxiao_amount, prev_fenxiao_amount) != '(0%)' else 'change-neutral'}">{calculate_ratio(fenxiao_amount, prev_fenxiao_amount)}</span>
-        </div>"""
+        ratio = calculate_ratio(fenxiao_amount, prev_fenxiao_amount)
+        web.render(METRIC_ROW, label='分销销售', prefix='¥', value=fenxiao_amount, suffix='', change_class=ratio_class(ratio), ratio=ratio)
+
+    web.render(SECTION_BREAK, title='📋 品类明细')
 
-    web_content += """
-    </div>
-    
-    <div class="section">
-        <h2>📋 品类明细</h2>"""
-    
     for _, row in category_data.iterrows():
         cat = row[CATEGORY_COL]
         amount = to_number(row[AMOUNT_COL])
@@ -1556,19 +1290,10 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
         prev_amount_cat = to_number(prev_category_data.loc[prev_category_data[CATEGORY_COL] == cat, AMOUNT_COL].sum()) if prev_category_data is not None else 0
         prev_qty_cat = to_number(prev_category_data.loc[prev_category_data[CATEGORY_COL] == cat, QTY_COL].sum()) if prev_category_data is not None else 0
         ratio = calculate_ratio(amount, prev_amount_cat)
-        qty_ratio = calculate_ratio(qty, prev_qty_cat)
-        
+
         # 根据销售额环比设置样式
-        if '+' in ratio and ratio != '0%':
-            row_class = 'growth-row'
-        elif '-' in ratio and ratio != '0%':
-            row_class = 'decline-row'
-        else:
-            row_class = 'neutral-row'
-        web_content += f"""
-        <div class=\"category-item {row_class}\">
-            <div class=\"product-name\">{cat}</div>
-            <div class=\"product-stats\">销售额: ¥{amount:,} ({ratio}) | 销量: {qty:,}件 ({qty_ratio}) | 单价: ¥{price:,}</div>"""
+        web.render(CATEGORY_ITEM, row_class=ratio_class(ratio, ROW_CLASSES), name=cat, amount=amount, ratio=ratio,
+                   qty=qty, qty_ratio=calculate_ratio(qty, prev_qty_cat), price=price)
         # 添加品类分销数据
         if category_fenxiao_data is not None:
             cat_fenxiao = category_fenxiao_data[category_fenxiao_data[CATEGORY_COL] == cat]
@@ -1576,39 +1301,22 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
                 fenxiao_amt = to_number(cat_fenxiao.iloc[0][AMOUNT_COL])
                 fenxiao_qty_cat = to_number(cat_fenxiao.iloc[0][QTY_COL])
                 fenxiao_price = int(fenxiao_amt / fenxiao_qty_cat) if fenxiao_qty_cat else 0
-                web_content += f"""
-            <div class=\"fenxiao-info\">分销数据: ¥{fenxiao_amt:,} | {fenxiao_qty_cat:,}件 | ¥{fenxiao_price:,}/件</div>"""
-        web_content += """
-        </div>"""
+                web.render(FENXIAO_INFO_PRICED, amount=fenxiao_amt, qty=fenxiao_qty_cat, price=fenxiao_price)
+        web.write(ITEM_CLOSE)
 
     if group_type == 'business' and channel_data is not None and not channel_data.empty:
-        web_content += """
-    </div>
-    
-    <div class="section">
-        <h2>🏪 渠道数据</h2>"""
-        
+        web.render(SECTION_BREAK, title='🏪 渠道数据')
+
         for _, row in channel_data.iterrows():
             channel = row['渠道']
             amount = to_number(row[AMOUNT_COL])
             qty = to_number(row[QTY_COL])
             price = int(amount / qty) if qty else 0
             prev_amount_channel = to_number(prev_channel_data.loc[prev_channel_data['渠道'] == channel, AMOUNT_COL].sum()) if prev_channel_data is not None else 0
-            prev_qty_channel = to_number(prev_channel_data.loc[prev_channel_data['渠道'] == channel, QTY_COL].sum()) if prev_channel_data is not None else 0
             ratio = calculate_ratio(amount, prev_amount_channel)
-            qty_ratio = calculate_ratio(qty, prev_qty_channel)
-            if '+' in ratio and ratio != '(0%)':
-                row_class = 'growth-row'
-            elif '-' in ratio and ratio != '(0%)':
-                row_class = 'decline-row'
-            else:
-                row_class = 'neutral-row'
-            
-            web_content += f"""
-        <div class=\"shop-item {row_class}\">
-            <div class=\"product-name\">{channel}</div>
-            <div class=\"product-stats\">¥{amount:,} | {qty:,}件 | ¥{price:,}/件（对比:¥{prev_amount_channel:,}，环比:{ratio}）</div>"""
-            
+            web.render(PRICED_ITEM, row_class=ratio_class(ratio, ROW_CLASSES), name=channel, amount=amount, qty=qty,
+                       price=price, prev_amount=prev_amount_channel, ratio=ratio)
+
             # 添加渠道分销数据
             if channel_fenxiao_data is not None:
                 channel_fenxiao = channel_fenxiao_data[channel_fenxiao_data['渠道'] == channel]
@@ -1616,58 +1324,35 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
                     fenxiao_amt = to_number(channel_fenxiao.iloc[0][AMOUNT_COL])
                     fenxiao_qty_channel = to_number(channel_fenxiao.iloc[0][QTY_COL])
                     fenxiao_price = int(fenxiao_amt / fenxiao_qty_channel) if fenxiao_qty_channel else 0
-                    web_content += f"""
-            <div class=\"fenxiao-info\">分销数据: ¥{fenxiao_amt:,} | {fenxiao_qty_channel:,}件 | ¥{fenxiao_price:,}/件</div>"""
-            
-            web_content += """
-        </div>"""
+                    web.render(FENXIAO_INFO_PRICED, amount=fenxiao_amt, qty=fenxiao_qty_channel, price=fenxiao_price)
+
+            web.write(ITEM_CLOSE)
 
     if shop_data is not None and not shop_data.empty:
-        web_content += """
-    </div>
-    
-    <div class="section">
-        <h2>🏪 店铺数据</h2>"""
-        
+        web.render(SECTION_BREAK, title='🏪 店铺数据')
+
         for _, row in shop_data.head(10).iterrows():
             shop = row[SHOP_COL]
             amount = to_number(row[AMOUNT_COL])
             qty = to_number(row[QTY_COL])
             prev_amount_shop = to_number(prev_shop_data.loc[prev_shop_data[SHOP_COL] == shop, AMOUNT_COL].sum()) if prev_shop_data is not None else 0
-            prev_qty_shop = to_number(prev_shop_data.loc[prev_shop_data[SHOP_COL] == shop, QTY_COL].sum()) if prev_shop_data is not None else 0
             ratio = calculate_ratio(amount, prev_amount_shop)
-            qty_ratio = calculate_ratio(qty, prev_qty_shop)
-            if '+' in ratio and ratio != '(0%)':
-                row_class = 'growth-row'
-            elif '-' in ratio and ratio != '(0%)':
-                row_class = 'decline-row'
-            else:
-                row_class = 'neutral-row'
-            
-            web_content += f"""
-        <div class=\"shop-item {row_class}\">
-            <div class=\"product-name\">{shop}</div>
-            <div class=\"product-stats\">¥{amount:,} | {qty:,}件（对比:¥{prev_amount_shop:,}，环比:{ratio}）</div>"""
-            
+            web.render(SHOP_ITEM, row_class=ratio_class(ratio, ROW_CLASSES), name=shop, amount=amount, qty=qty,
+                       prev_amount=prev_amount_shop, ratio=ratio)
+
             # 添加店铺分销数据
             if shop_fenxiao_data is not None:
                 shop_fenxiao = shop_fenxiao_data[shop_fenxiao_data[SHOP_COL] == shop]
                 if not shop_fenxiao.empty:
                     fenxiao_amt = to_number(shop_fenxiao.iloc[0][AMOUNT_COL])
                     fenxiao_qty_shop = to_number(shop_fenxiao.iloc[0][QTY_COL])
-                    web_content += f"""
-            <div class=\"fenxiao-info\">分销数据: ¥{fenxiao_amt:,} | {fenxiao_qty_shop:,}件</div>"""
-            
-            web_content += """
-        </div>"""
+                    web.render(FENXIAO_INFO, amount=fenxiao_amt, qty=fenxiao_qty_shop)
+
+            web.write(ITEM_CLOSE)
 
     if product_data is not None and not product_data.empty:
-        web_content += """
-    </div>
-    
-    <div class="section">
-        <h2>🏆 TOP 单品</h2>"""
-        
+        web.render(SECTION_BREAK, title='🏆 TOP 单品')
+
         for _, row in product_data.head(10).iterrows():
             model = row[MODEL_COL]
             amount = to_number(row[AMOUNT_COL])
@@ -1679,95 +1364,66 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
                 if not prev_product.empty:
                     prev_amount_product = int(to_number(prev_product[AMOUNT_COL].sum()))
             ratio = calculate_ratio(amount, prev_amount_product)
-            if '+' in ratio and ratio != '(0%)':
-                row_class = 'growth-row'
-            elif '-' in ratio and ratio != '(0%)':
-                row_class = 'decline-row'
-            else:
-                row_class = 'neutral-row'
-            web_content += f"""
-        <div class=\"shop-item {row_class}\">
-            <div class=\"product-name\">{model}</div>
-            <div class=\"product-stats\">¥{int(amount):,} | {qty:,}件 | ¥{price:,}/件（对比:¥{prev_amount_product:,}，环比:{ratio}）</div>\n        </div>"""
+            web.render(PRICED_ITEM, row_class=ratio_class(ratio, ROW_CLASSES), name=model, amount=int(amount), qty=qty,
+                       price=price, prev_amount=prev_amount_product, ratio=ratio)
+            web.write(ITEM_CLOSE)
 
     # 新增：店铺单品明细部分，带环比数据
     if shop_product_data is not None and not shop_product_data.empty:
-        web_content += """
-    </div>
-    
-    <div class="section">
-        <h2>🏪 店铺单品明细</h2>"""
-        
+        web.render(SECTION_BREAK, title='🏪 店铺单品明细')
+
         # 按店铺分组显示单品数据
         top_shops = shop_data.head(5)[SHOP_COL].tolist()  # 只显示前5个店铺的单品
-        
+
         for shop in top_shops:
             shop_products = shop_product_data[shop_product_data[SHOP_COL] == shop]
             if not shop_products.empty:
-                web_content += f"""
-        <div class="shop-item">
-            <h3 style="color: #0056b3; margin-bottom: 15px;">📍 {shop}</h3>"""
-                
+                web.render(SHOP_PRODUCT_GROUP, shop=shop)
+
                 # 显示该店铺的前5个单品
                 for _, row in shop_products.head(5).iterrows():
                     model = row[MODEL_COL]
                     amount = to_number(row[AMOUNT_COL])
                     qty = to_number(row[QTY_COL])
                     price = int(amount / qty) if qty else 0
-                    
+
                     # 计算环比数据
                     prev_amount_shop_product = 0
                     prev_qty_shop_product = 0
                     if prev_shop_product_data is not None:
                         prev_row = prev_shop_product_data[
-                            (prev_shop_product_data[SHOP_COL] == shop) & 
+                            (prev_shop_product_data[SHOP_COL] == shop) &
                             (prev_shop_product_data[MODEL_COL] == model)
                         ]
                         if not prev_row.empty:
                             prev_amount_shop_product = to_number(prev_row.iloc[0][AMOUNT_COL])
                             prev_qty_shop_product = to_number(prev_row.iloc[0][QTY_COL])
-                    
+
                     amount_ratio = calculate_ratio(amount, prev_amount_shop_product)
                     qty_ratio = calculate_ratio(qty, prev_qty_shop_product)
-                    
+
                     # 根据环比变化设置样式类
-                    if '+' in amount_ratio and amount_ratio != '(0%)':
-                        row_class = 'growth-row'
-                    elif '-' in amount_ratio and amount_ratio != '(0%)':
-                        row_class = 'decline-row'
-                    else:
-                        row_class = 'neutral-row'
-                    
-                    web_content += f"""
-            <div class="{row_class}" style="margin: 8px 0; padding: 10px; border-radius: 5px; border-left: 3px solid #ccc;">
-                <div style="font-weight: bold; color: #495057;">{model}</div>
-                <div style="font-size: 14px; color: #6c757d; margin-top: 5px;">
-                    销售额: ¥{amount:,} <span class="metric-change {'change-positive' if '+' in amount_ratio and amount_ratio != '(0%)' else 'change-negative' if '-' in amount_ratio and amount_ratio != '(0%)' else 'change-neutral'}">{amount_ratio}</span> | 
-                    销量: {qty:,}件 <span class="metric-change {'change-positive' if '+' in qty_ratio and qty_ratio != '(0%)' else 'change-negative' if '-' in qty_ratio and qty_ratio != '(0%)' else 'change-neutral'}">{qty_ratio}</span> | 
-                    单价: ¥{price:,}/件
-                </div>"""
-                    
+                    web.render(SHOP_PRODUCT_ROW, row_class=ratio_class(amount_ratio, ROW_CLASSES), model=model,
+                               amount=amount, amount_class=ratio_class(amount_ratio), amount_ratio=amount_ratio,
+                               qty=qty, qty_class=ratio_class(qty_ratio), qty_ratio=qty_ratio, price=price)
+
                     # 添加分销数据
                     if shop_product_fenxiao_data is not None:
                         shop_product_fenxiao = shop_product_fenxiao_data[
-                            (shop_product_fenxiao_data[SHOP_COL] == shop) & 
+                            (shop_product_fenxiao_data[SHOP_COL] == shop) &
                             (shop_product_fenxiao_data[MODEL_COL] == model)
                         ]
                         if not shop_product_fenxiao.empty:
                             fenxiao_amt = to_number(shop_product_fenxiao.iloc[0][AMOUNT_COL])
                             fenxiao_qty = to_number(shop_product_fenxiao.iloc[0][QTY_COL])
-                            web_content += f"""
-                <div class="fenxiao-info">分销: ¥{fenxiao_amt:,} | {fenxiao_qty:,}件</div>"""
-                    
-                    web_content += """
-            </div>"""
-                
-                web_content += """
-        </div>"""
+                            web.render(SHOP_PRODUCT_FENXIAO, amount=fenxiao_amt, qty=fenxiao_qty)
 
-    web_content += """
-    </div>
-</div>"""
+                    web.write(SHOP_PRODUCT_ROW_CLOSE)
+
+                web.write(ITEM_CLOSE)
+
+    web.write(GROUP_REPORT_TAIL)
+    web_content = web.getvalue()
 
     # 生成纯文本版本用于微信发送 - 简化内容，移除店铺单品明细，保持原有格式
     content = f"🏢 {group_name}日报\n📅 数据日期: {report_date}\n\n"
@@ -1823,7 +1479,7 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
             
             # 获取该渠道的品类细分数据
             channel_categories = []
-            channel_df = group_df_clean[group_df_clean[SHOP_COL].apply(classify_channel) == channel]
+            channel_df = group_df_clean[CHANNEL_CLASSIFIER.classify_series(group_df_clean[SHOP_COL]) == channel]
             if not channel_df.empty:
                 channel_cat_data = channel_df.groupby(CATEGORY_COL).agg({AMOUNT_COL: 'sum', QTY_COL: 'sum'}).reset_index()
                 channel_cat_data = channel_cat_data.sort_values(AMOUNT_COL, ascending=False)
@@ -1848,7 +1504,7 @@ def generate_group_report(group_name, group_type, keywords, df, df_prev, report_
                     
                     # 获取该渠道分销的品类细分数据
                     channel_fenxiao_categories = []
-                    channel_fenxiao_df = group_df_clean[(group_df_clean[SHOP_COL].apply(classify_channel) == channel) & 
+                    channel_fenxiao_df = group_df_clean[(CHANNEL_CLASSIFIER.classify_series(group_df_clean[SHOP_COL]) == channel) & 
                                                        (group_df_clean['数据来源'] == '分销')]
                     if not channel_fenxiao_df.empty:
                         channel_fenxiao_cat_data = channel_fenxiao_df.groupby(CATEGORY_COL).agg({AMOUNT_COL: 'sum', QTY_COL: 'sum'}).reset_index()
@@ -2208,6 +1864,10 @@ all_group_links = []
 
 try:
     # 第一步：生成所有分组的HTML文件到reports目录
+    # 所有分组共用一次成员匹配，之后每个分组只是按列取行
+    membership = build_group_membership(df_erp)
+    prev_membership = build_group_membership(df_prev)
+    logger.info(f"🧮 分组成员矩阵: {membership.sum().to_dict()}")
     for dept, keywords in business_groups.items():
         try:
             logger.info(f"\n🔄 正在处理 {dept}...")
@@ -2215,7 +1875,8 @@ try:
             target_users = get_target_users(dept, 'business')
             logger.info(f"📤 {dept} 目标用户: {', '.join(target_users)}")
             
-            content, filename = generate_group_report(dept, 'business', keywords['keywords'], df_erp, df_prev, yesterday_str)
+            content, filename = generate_group_report(dept, 'business', keywords['keywords'], df_erp, df_prev, yesterday_str,
+                                                      membership, prev_membership)
             # 无论是否有数据都要处理，避免跳过
             if content and filename:
                 all_group_files.append({
@@ -2239,7 +1900,8 @@ try:
             target_users = get_target_users(channel, 'channel')
             logger.info(f"📤 {channel} 目标用户: {', '.join(target_users)}")
             
-            content, filename = generate_group_report(channel, 'channel', keywords['keywords'], df_erp, df_prev, yesterday_str)
+            content, filename = generate_group_report(channel, 'channel', keywords['keywords'], df_erp, df_prev, yesterday_str,
+                                                      membership, prev_membership)
             if content and filename:
                 all_group_files.append({
                     'name': channel,
@@ -110,6 +110,21 @@ else:
     # print(f"所有店铺列表: {shops}")
 
     # ======================= 辅助：时间标准化 =======================
+    # 同一报表的时间格式基本一致：先试上一次成功的格式（各格式互斥，不影响结果），同一字符串只解析一次
+    time_formats = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H", "%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d", "%Y.%m.%d"]
+    parsed_times = {}
+
+    def parse_time_text(text):
+        for i, fmt in enumerate(time_formats):
+            try:
+                parsed = datetime.strptime(text, fmt)
+            except:
+                continue
+            if i:
+                time_formats.insert(0, time_formats.pop(i))
+            return parsed
+        return None
+
     def parse_time(val):
         if isinstance(val, datetime):
             return val
@@ -119,11 +134,10 @@ else:
             except:
                 return None
         if isinstance(val, str):
-            for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H", "%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d", "%Y.%m.%d"):
-                try:
-                    return datetime.strptime(val.strip(), fmt)
-                except:
-                    continue
+            text = val.strip()
+            if text not in parsed_times:
+                parsed_times[text] = parse_time_text(text)
+            return parsed_times[text]
         return None
 
     # ======================= 主体分析 =======================
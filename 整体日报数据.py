@@ -30,7 +30,20 @@ import traceback
 import platform
 import io
 import subprocess
-import pymysql
+from report_sync import load_daysales, daysales_availability
+from report_schema import CORE_COLUMNS, missing_required_columns
+from report_sql import date_range_predicate
+from report_db import get_connection
+from schema_registry import get_schema_registry, HT_FENXIAO_FIELDS
+from brushing_rules import REMARK_RULES
+from keyword_classifier import (
+    ONLINE_SHOP, SHOP_CHANNEL, map_unique, normalize_category,
+    categorize_product_for_fenxiao, force_categorize_product
+)
+from product_matcher import resolve_product_mapping, apply_product_mapping, add_shop_prefix
+from report_cube import SalesCube, ensure_cube, FENXIAO_ONLY
+from period_compare import calculate_ratio, compare_periods, growth_view, decline_view, change_tuples
+from report_template import Template, HtmlWriter, change_background, LIST_OPEN, LIST_CLOSE, EMPTY_NOTE, DETAILS_OPEN, DETAILS_CLOSE, NOTE_BOX_OPEN, BOX_CLOSE
 import base64
 import threading
 import signal
@@ -458,8 +471,8 @@ qty_col = QTY_COL
 
 def check_required_columns(df):
     """检查必需的列是否存在，如果不存在直接报错退出"""
-    required_cols = [DATE_COL, AMOUNT_COL, QTY_COL, SHOP_COL, CATEGORY_COL, MODEL_COL]
-    missing_cols = [col for col in required_cols if col not in df.columns]
+    required_cols = CORE_COLUMNS
+    missing_cols = missing_required_columns(df)
     
     if missing_cols:
         error_msg = f"❌ 缺少必要的列: {', '.join(missing_cols)}"
@@ -470,12 +483,6 @@ def check_required_columns(df):
     print(f"✅ 所有必需列存在: {', '.join(required_cols)}")
     return True
 
-def is_online_shop(shop_name):
-    if not isinstance(shop_name, str):
-        return False
-    online_keywords = ['京东','天猫','拼多多','抖音','卡萨帝','小红书','淘宝','苏宁','国美']
-    return any(kw in shop_name for kw in online_keywords)
-
 def save_report_to_local(content, report_type="overall_daily"):
     os.makedirs("reports", exist_ok=True)
     # 添加时间戳确保文件名唯一，避免测试时覆盖旧报告
@@ -938,39 +945,21 @@ DB_PASSWORD = "c973ee9b500cc638"
 DB_NAME = "Date"
 DB_CHARSET = "utf8mb4"
 
+def connect_db():
+    """从进程级连接池借出数据库连接（close()即归还）"""
+    return get_connection()
+
 # ========== 分销数据获取函数 ==========
 def get_fenxiao_data(report_date):
     """从HT_fenxiao表获取分销数据"""
     try:
-        conn = pymysql.connect(
-            host=DB_HOST, port=DB_PORT, user=DB_USER, 
-            password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
-            connect_timeout=10
-        )
+        conn = connect_db()
         
-        # 使用fenxiaochanpin表进行商品匹配（已确认存在数据）
-        cursor = conn.cursor()
-        
-        # 获取HT_fenxiao表结构
-        cursor.execute("DESCRIBE HT_fenxiao")
-        columns = [row[0] for row in cursor.fetchall()]
-        logging.info(f"📊 HT_fenxiao表字段: {columns}")
-        
-        # 查找可能的字段名
-        amount_fields = [col for col in columns if '金额' in col or '实付' in col or '支付' in col]
-        shop_fields = [col for col in columns if '店铺' in col or '商店' in col]
-        status_fields = [col for col in columns if '状态' in col or '订单' in col]
-        time_fields = [col for col in columns if '时间' in col or '支付' in col]
-        product_fields = [col for col in columns if '产品' in col or '名称' in col]
-        qty_fields = [col for col in columns if '数量' in col or '采购数量' in col]
-        
-        # 选择最合适的字段名
-        amount_col = '用户实际支付总额' if '用户实际支付总额' in columns else (amount_fields[0] if amount_fields else '用户实际支付金额')
-        shop_col = '分销商店铺名称' if '分销商店铺名称' in columns else (shop_fields[0] if shop_fields else '分销商店铺名称')
-        status_col = '订单状态' if '订单状态' in columns else (status_fields[0] if status_fields else '订单状态')
-        time_col = '采购单支付时间' if '采购单支付时间' in columns else (time_fields[0] if time_fields else '采购单支付时间')
-        product_col = '产品名称' if '产品名称' in columns else (product_fields[0] if product_fields else '产品名称')
-        qty_col = '采购数量' if '采购数量' in columns else (qty_fields[0] if qty_fields else '采购数量')
+        # HT_fenxiao字段名不固定：列清单登记在本地，过期后才复核（见 schema_registry）
+        fields = get_schema_registry().resolve(conn, 'HT_fenxiao', HT_FENXIAO_FIELDS)
+        logging.info(f"📊 HT_fenxiao字段映射: {fields}")
+        amount_col, shop_col, status_col = fields['amount'], fields['shop'], fields['status']
+        time_col, product_col, qty_col = fields['time'], fields['product'], fields['qty']
         
         # 查询分销数据，使用动态字段名，确保订单状态过滤生效
         # 只过滤掉：未付款、已取消、已退货
@@ -985,7 +974,7 @@ def get_fenxiao_data(report_date):
             {qty_col} as 实发数量,
             '分销' as 数据来源
         FROM HT_fenxiao 
-        WHERE {time_col} LIKE '{report_date}%'
+        WHERE {date_range_predicate(time_col, report_date)}
         AND {status_col} NOT IN ('已取消', '未付款', '已退货')
         """
         
@@ -1002,111 +991,29 @@ def get_fenxiao_data(report_date):
             for status, count in status_counts.items():
                 logging.info(f"   {status}: {count}条")
             
-            # 优化产品匹配逻辑：批量处理避免重复查询
+            # 产品名称匹配：映射缓存 -> fenxiaochanpin精确 -> 模糊候选 -> 规则分类（见 product_matcher）
             logging.info("🔄 尝试从fenxiaochanpin表匹配规格名称和货品名称...")
             
             # 获取所有唯一的产品名称
             unique_products = df_fenxiao['规格名称'].dropna().unique()
             logging.info(f"📊 需要匹配的唯一产品数量: {len(unique_products)}")
             
-            # 构建最终的产品映射缓存
-            final_product_mapping = {}
-            
-            # 批量查询fenxiaochanpin表
-            if len(unique_products) > 0:
-                placeholders = ','.join(['%s'] * len(unique_products))
-                batch_sql = f"SELECT 产品名称, 规格名称, 货品名称 FROM fenxiaochanpin WHERE 产品名称 IN ({placeholders})"
-                cursor.execute(batch_sql, tuple(unique_products))
-                fenxiao_results = cursor.fetchall()
-                
-                # 构建fenxiaochanpin映射
-                fenxiao_mapping = {}
-                for product_name, model_name, goods_name in fenxiao_results:
-                    fenxiao_mapping[product_name] = (model_name, goods_name)
-                
-                logging.info(f"📊 fenxiaochanpin表匹配到 {len(fenxiao_mapping)} 个产品")
-                
-                # 处理每个唯一产品
-                for product_name in unique_products:
-                    if not isinstance(product_name, str):
-                        continue
-                        
-                    if product_name in fenxiao_mapping:
-                        matched_model_name, matched_product_name = fenxiao_mapping[product_name]
-                        
-                        # 如果货品名称为空，从ERP数据查询
-                        if matched_product_name is None or matched_product_name == '':
-                            erp_sql = "SELECT 货品名称 FROM Daysales WHERE 规格名称 = %s AND 货品名称 IS NOT NULL AND 货品名称 != '' LIMIT 1"
-                            cursor.execute(erp_sql, (matched_model_name,))
-                            erp_result = cursor.fetchone()
-                            if erp_result:
-                                matched_product_name = erp_result[0]
-                                logging.info(f"   ✅ 从ERP数据匹配货品名称: {matched_model_name} -> {matched_product_name}")
-                            else:
-                                # 关键词匹配
-                                import re
-                                keywords = []
-                                model_patterns = re.findall(r'[A-Z0-9]{3,}', product_name.upper())
-                                keywords.extend(model_patterns)
-                                chinese_words = re.findall(r'[\u4e00-\u9fff]+', product_name)
-                                for word in chinese_words:
-                                    if len(word) >= 2 and word not in ['大容量', '家用', '独立式', '变频', '超一级', '水效', '升级款', '就近仓', '新品上市', '超大容量']:
-                                        keywords.append(word)
-                                
-                                matched_by_keyword = False
-                                for keyword in keywords[:3]:
-                                    keyword_sql = "SELECT 货品名称 FROM Daysales WHERE 货品名称 LIKE %s AND 货品名称 IS NOT NULL AND 货品名称 != '' LIMIT 1"
-                                    cursor.execute(keyword_sql, (f'%{keyword}%',))
-                                    keyword_result = cursor.fetchone()
-                                    if keyword_result:
-                                        matched_product_name = keyword_result[0]
-                                        logging.info(f"   ✅ 通过关键词'{keyword}'匹配到货品名称: {matched_product_name}")
-                                        matched_by_keyword = True
-                                        break
-                                
-                                if not matched_by_keyword:
-                                    matched_product_name = force_categorize_product(product_name)
-                                    logging.info(f"   ⚠️ 所有匹配方式都失败，强制通过产品名称匹配到品类: {product_name} -> {matched_product_name}")
-                        
-                        final_product_mapping[product_name] = {
-                            '规格名称': matched_model_name,
-                            '货品名称': matched_product_name
-                        }
-                        logging.info(f"   ✅ 匹配成功: {product_name} -> 规格名称:{matched_model_name}, 货品名称:{matched_product_name}")
-                    else:
-                        logging.info(f"   ⚠️ 未匹配到: {product_name}，使用原产品名称")
-                        final_product_mapping[product_name] = {
-                            '规格名称': product_name,
-                            '货品名称': product_name
-                        }
+            final_product_mapping = resolve_product_mapping(
+                conn, unique_products,
+                categorize=categorize_product_for_fenxiao,
+                force_categorize=force_categorize_product
+            )
             
-            # 批量应用映射结果
+            # 批量应用映射结果（按去重产品名称广播，不逐行iterrows）
             logging.info("🔄 批量应用产品映射结果...")
-            for index, row in df_fenxiao.iterrows():
-                product_name = row['规格名称']
-                if isinstance(product_name, str) and product_name in final_product_mapping:
-                    mapping = final_product_mapping[product_name]
-                    df_fenxiao.at[index, '规格名称'] = mapping['规格名称']
-                    df_fenxiao.at[index, '货品名称'] = mapping['货品名称']
+            apply_product_mapping(df_fenxiao, final_product_mapping)
             
             # 添加品类字段
             logging.info("🔄 添加品类字段...")
-            df_fenxiao['品类'] = df_fenxiao['货品名称'].apply(categorize_product_for_fenxiao)
-            
-            # 为所有ht_fenxiao数据统一添加"京东-"前缀
-            def add_jingdong_prefix(shop_name):
-                if not isinstance(shop_name, str):
-                    return shop_name
-                
-                # 如果已经有"京东-"前缀，直接返回
-                if shop_name.startswith('京东-'):
-                    return shop_name
-                
-                # 统一添加"京东-"前缀
-                return f"京东-{shop_name}"
+            df_fenxiao['品类'] = map_unique(df_fenxiao['货品名称'], categorize_product_for_fenxiao)
             
-            # 为所有分销商店铺名称添加"京东-"前缀
-            df_fenxiao['店铺'] = df_fenxiao['店铺'].apply(add_jingdong_prefix)
+            # 为所有分销商店铺名称统一添加"京东-"前缀
+            df_fenxiao['店铺'] = add_shop_prefix(df_fenxiao['店铺'])
             
             logging.info(f"📊 分销数据字段: {df_fenxiao.columns.tolist()}")
             logging.info(f"📊 分销数据前3行:")
@@ -1122,88 +1029,12 @@ def get_fenxiao_data(report_date):
             
     except Exception as e:
         logging.error(f"❌ 获取分销数据失败: {e}")
+        # 字段可能已变化，下次查询前重新登记HT_fenxiao表结构
+        get_schema_registry().invalidate('HT_fenxiao')
         if 'conn' in locals():
             conn.close()
         return pd.DataFrame()
 
-def categorize_product_for_fenxiao(product_name):
-    """从产品名称中识别品类，用于分销数据"""
-    if not isinstance(product_name, str):
-        return "其他"
-    
-    product_name_lower = product_name.lower()
-    
-    # 品类关键词映射
-    category_keywords = {
-        "家用空调": ["空调", "挂机", "柜机", "中央空调", "分体式"],
-        "商用空调": ["商用", "商用空调", "多联机", "风管机"],
-        "冰箱": ["冰箱", "冷柜", "冰柜", "冷藏", "冷冻"],
-        "洗衣机": ["洗衣机", "洗烘一体", "滚筒", "波轮"],
-        "洗碗机": ["洗碗机"],  # 洗碗机独立为一个品类
-        "热水器": ["热水器", "电热水器", "燃气热水器", "多能源热水器"],
-        "净水": ["净水", "净水器", "净水机", "过滤器"],
-        "采暖": ["采暖", "暖气", "地暖", "壁挂炉"],
-        "厨电": ["消毒柜", "燃气灶", "油烟机", "厨电", "蒸箱", "烤箱"],  # 移除洗碗机，添加蒸箱烤箱
-        "干衣机": ["干衣机", "烘干机"],
-        "除湿机": ["除湿机", "抽湿机"],
-        "新风": ["新风", "新风机", "新风系统"],
-        "其他": []
-    }
-    
-    # 遍历品类关键词进行匹配
-    for category, keywords in category_keywords.items():
-        if any(keyword in product_name_lower for keyword in keywords):
-            return category
-    
-    return "其他"
-
-def force_categorize_product(product_name):
-    """强制通过产品名称关键词匹配到八个预定义品类之一"""
-    if not product_name:
-        return "冰箱"  # 默认返回冰箱
-    
-    product_name = str(product_name).lower()
-    
-    # 洗碗机独立为一个品类
-    if any(keyword in product_name for keyword in ['洗碗机']):
-        return "洗碗机"
-    
-    # 冰箱
-    if any(keyword in product_name for keyword in ['冰箱', '冰柜', '冷藏', '冷冻']):
-        return "冰箱"
-    
-    # 洗衣机
-    if any(keyword in product_name for keyword in ['洗衣机', '洗烘', '干衣机']):
-        return "洗衣机"
-    
-    # 冷柜
-    if any(keyword in product_name for keyword in ['冷柜', '展示柜', '商用冷柜']):
-        return "冷柜"
-    
-    # 家用空调
-    if any(keyword in product_name for keyword in ['空调', '挂机', '柜机', '变频', '定频']) and not any(keyword in product_name for keyword in ['商用', '中央', '多联']):
-        return "家用空调"
-    
-    # 商空空调
-    if any(keyword in product_name for keyword in ['商用空调', '中央空调', '多联机', '风管机', '天花机']):
-        return "商空空调"
-    
-    # 厨电（移除洗碗机，增加蒸箱、烤箱）
-    if any(keyword in product_name for keyword in ['消毒柜', '燃气灶', '油烟机', '蒸箱', '烤箱']):
-        return "厨电"
-    
-    # 热水器
-    if any(keyword in product_name for keyword in ['热水器', '燃气热水器', '电热水器']):
-        return "热水器"
-    
-    # 如果都不匹配，根据产品名称中的关键词进行智能判断
-    # 海尔洗碗机的例子：包含"海尔"、"嵌入式"、"洗"、"消"、"烘干"等关键词
-    if any(keyword in product_name for keyword in ['嵌入式', '洗', '消', '烘干', '分区洗', '洗消烘']):
-        return "洗碗机"
-    
-    # 默认返回冰箱（八个品类中的第一个）
-    return "冰箱"
-
 def identify_tianmao_fenxiao(df):
     """从原有数据中识别天猫分销数据（仓库字段为'菜鸟仓自流转'）"""
     try:
@@ -1244,7 +1075,7 @@ def identify_tianmao_fenxiao(df):
             
             # 使用原有的货品名称进行品类识别
             if category_col in tianmao_fenxiao.columns:
-                tianmao_fenxiao[category_col] = tianmao_fenxiao[category_col].apply(categorize_product_for_fenxiao)
+                tianmao_fenxiao[category_col] = map_unique(tianmao_fenxiao[category_col], categorize_product_for_fenxiao)
             else:
                 logging.warning(f"⚠️ 列 '{category_col}' 也不存在，跳过品类识别")
             
@@ -1275,17 +1106,9 @@ report_date = yesterday_str
 
 # 检查数据库是否有昨天的数据
 def check_data_availability(date_str):
-    """检查指定日期是否有数据"""
+    """检查指定日期是否有数据（基于水位线，同时增量同步该日分区）"""
     try:
-        conn = pymysql.connect(
-            host=DB_HOST, port=DB_PORT, user=DB_USER, 
-            password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
-            connect_timeout=10
-        )
-        df_check = pd.read_sql(f"SELECT COUNT(*) as count FROM Daysales WHERE 交易时间 LIKE '{date_str}%'", conn)
-        conn.close()
-        count = df_check.iloc[0]['count']
-        return count > 0, count
+        return daysales_availability(date_str, connect=connect_db)
     except Exception as e:
         print(f"❌ 检查数据可用性失败: {e}")
         return False, 0
@@ -1333,13 +1156,7 @@ if not has_yesterday_data:
 print(f"✅ 数据库中找到 {yesterday_str} 的数据，共 {yesterday_count} 条记录")
 
 try:
-    conn = pymysql.connect(
-        host=DB_HOST, port=DB_PORT, user=DB_USER, 
-        password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
-        connect_timeout=10
-    )
-    df_erp = pd.read_sql(f"SELECT * FROM Daysales WHERE 交易时间 LIKE '{yesterday_str}%'", conn)
-    conn.close()
+    df_erp = load_daysales(yesterday_str, connect=connect_db)
     print(f"📊 ERP数据读取成功，共{len(df_erp)}行")
 except Exception as e:
     print(f"❌ 直接连接数据库失败: {e}")
@@ -1382,13 +1199,7 @@ if not has_prev_data:
 else:
     print(f"✅ 数据库中找到 {day_before_yesterday_str} 的数据，共 {prev_count} 条记录")
     try:
-        conn = pymysql.connect(
-            host=DB_HOST, port=DB_PORT, user=DB_USER, 
-            password=DB_PASSWORD, database=DB_NAME, charset=DB_CHARSET,
-            connect_timeout=10
-        )
-        df_prev = pd.read_sql(f"SELECT * FROM Daysales WHERE 交易时间 LIKE '{day_before_yesterday_str}%'", conn)
-        conn.close()
+        df_prev = load_daysales(day_before_yesterday_str, connect=connect_db)
         print(f"📊 前前一天ERP数据读取成功，共{len(df_prev)}行")
         
         # 获取前前一天的分销数据
@@ -1420,24 +1231,7 @@ else:
 
 # 后续分析逻辑保持不变，df_erp即为主数据源
 
-# 1. 替换渠道归类函数
-
-def classify_channel(shop_name):
-    if not isinstance(shop_name, str):
-        return "其他"
-    shop_name = shop_name.strip()
-    # 优先卡萨帝和小红书
-    if "卡萨帝" in shop_name or "小红书" in shop_name:
-        return "卡萨帝"
-    if shop_name.startswith("京东"):
-        return "京东"
-    if shop_name.startswith("天猫") or "淘宝" in shop_name:
-        return "天猫"
-    if shop_name.startswith("拼多多"):
-        return "拼多多"
-    if shop_name.startswith("抖音"):
-        return "抖音"
-    return "其他"
+# 1. 渠道归类规则见 keyword_classifier.SHOP_CHANNEL（按去重店铺名计算后广播）
 
 # 使用固定列名
 amount_col = AMOUNT_COL
@@ -1450,35 +1244,11 @@ df_erp[qty_col] = pd.to_numeric(df_erp[qty_col], errors='coerce').fillna(0)
 # 过滤掉金额或数量为0的记录
 df_erp = df_erp[(df_erp[amount_col] > 0) & (df_erp[qty_col] > 0)]
 
-# 刷单剔除逻辑（只认"客服备注"列，严格匹配，剔除包含"抽纸""纸巾"或完全等于"不发货"）
-remark_col = None
-for col in df_erp.columns:
-    if col == '客服备注':
-        remark_col = col
-        break
-if remark_col and remark_col in df_erp.columns:
-    before_rows = len(df_erp)
-    df_erp[remark_col] = df_erp[remark_col].astype(str).fillna('')
-    filter_condition = ~(
-        df_erp[remark_col].str.contains('抽纸', na=False) |
-        df_erp[remark_col].str.contains('纸巾', na=False) |
-        (df_erp[remark_col] == '不发货')
-    )
-    df_erp = df_erp[filter_condition]
-    after_rows = len(df_erp)
-    print(f"刷单剔除：{before_rows} -> {after_rows}")
+# 刷单剔除（只认"客服备注"列：包含"抽纸""纸巾"或完全等于"不发货"，规则见 brushing_rules.REMARK_RULES）
+df_erp, _ = REMARK_RULES.apply(df_erp)
 # 同期数据也做同样处理
-if df_prev is not None and remark_col and remark_col in df_prev.columns:
-    before_rows_prev = len(df_prev)
-    df_prev[remark_col] = df_prev[remark_col].astype(str).fillna('')
-    filter_condition_prev = ~(
-        df_prev[remark_col].str.contains('抽纸', na=False) |
-        df_prev[remark_col].str.contains('纸巾', na=False) |
-        (df_prev[remark_col] == '不发货')
-    )
-    df_prev = df_prev[filter_condition_prev]
-    after_rows_prev = len(df_prev)
-    print(f"同期刷单剔除：{before_rows_prev} -> {after_rows_prev}")
+if df_prev is not None:
+    df_prev, _ = REMARK_RULES.apply(df_prev, label='同期')
 
 # 2. 识别订单状态列，剔除"未付款"和"已取消"订单
 order_status_col = None
@@ -1490,49 +1260,21 @@ if order_status_col and order_status_col in df_erp.columns:
     df_erp = df_erp[~df_erp[order_status_col].astype(str).str.contains('未付款|已取消', na=False)]
 
 # 过滤线下店铺
-df_erp = df_erp[df_erp[SHOP_COL].apply(is_online_shop)]
+df_erp = df_erp[ONLINE_SHOP.mask(df_erp[SHOP_COL])]
 
 # 添加渠道列
-df_erp['渠道'] = df_erp[SHOP_COL].apply(classify_channel)
+df_erp['渠道'] = SHOP_CHANNEL.classify_series(df_erp[SHOP_COL])
 
 # 清洗前一天数据
 if df_prev is not None:
     df_prev[amount_col] = pd.to_numeric(df_prev[amount_col], errors='coerce').fillna(0)
     df_prev[qty_col] = pd.to_numeric(df_prev[qty_col], errors='coerce').fillna(0)
     df_prev = df_prev[(df_prev[amount_col] > 0) & (df_prev[qty_col] > 0)]
-    df_prev = df_prev[df_prev[SHOP_COL].apply(is_online_shop)]  # 修复：使用df_prev的店铺列
-    df_prev['渠道'] = df_prev[SHOP_COL].apply(classify_channel)
+    df_prev = df_prev[ONLINE_SHOP.mask(df_prev[SHOP_COL])]  # 修复：使用df_prev的店铺列
+    df_prev['渠道'] = SHOP_CHANNEL.classify_series(df_prev[SHOP_COL])
     print(f"📊 前一天数据过滤后行数: {len(df_prev)}")
 
-# 环比计算函数
-def calculate_ratio(current, previous):
-    """计算增长比例"""
-    if previous == 0:
-        return "📈 100%" if current > 0 else "0%"
-    
-    ratio = ((current - previous) / previous) * 100
-    if ratio > 0:
-        return f"📈 {ratio:.1f}%"
-    elif ratio < 0:
-        return f"📉 {ratio:.1f}%"
-    else:
-        return "📊 0%"
-
-# 1. 新增归类函数
-def normalize_category(name):
-    """品类标准化函数，优化热水器品类归类"""
-    if pd.isna(name) or name == '':
-        return '其他'
-    
-    name_str = str(name).strip()
-    
-    # 热水器相关 - 包含采暖、空气能、多能源、电热、燃热等涵盖热水器字样的品类
-    if any(keyword in name_str for keyword in ['热水器', '采暖', '空气能', '多能源', '电热', '燃热']):
-        return '热水器'
-    
-    # 其他保持原样
-    return name_str
-
+# 1. 品类标准化规则见 keyword_classifier.normalize_category
 # 2. 在清洗数据后，强制归类
 print(f"🔍 检查数据框列名: {list(df_erp.columns)}")
 print(f"🔍 使用CATEGORY_COL: {CATEGORY_COL}")
@@ -1555,18 +1297,20 @@ if CATEGORY_COL not in df_erp.columns:
 
 print(f"✅ 最终使用列名: {CATEGORY_COL}")
 
-df_erp[CATEGORY_COL] = df_erp[CATEGORY_COL].apply(normalize_category)
+df_erp[CATEGORY_COL] = map_unique(df_erp[CATEGORY_COL], normalize_category)
 if df_prev is not None:
-    df_prev[CATEGORY_COL] = df_prev[CATEGORY_COL].apply(normalize_category)
+    df_prev[CATEGORY_COL] = map_unique(df_prev[CATEGORY_COL], normalize_category)
+
+# 排行用的汇总立方体：(品类, 店铺, 规格名称, 渠道, 数据来源) 只汇总一次，各排行生成函数从中取切片
+CUBE_DIMS = [CATEGORY_COL, SHOP_COL, MODEL_COL, '渠道', '数据来源']
+sales_cube = SalesCube(df_erp, amount_col, qty_col, CUBE_DIMS)
+prev_sales_cube = SalesCube(df_prev, amount_col, qty_col, CUBE_DIMS)
+print(f"🧮 排行汇总立方体: {len(df_erp)}行 -> {len(sales_cube)}行")
 
 # ========== HTML生成函数 ==========
 
-def generate_category_ranking_html(category_data, df_erp, prev_category_data, amount_col, qty_col, CATEGORY_COL, MODEL_COL, category_icons, df_prev=None, SHOP_COL='店铺'):
-    """生成品类销售排行榜HTML，标题后固定两个按钮控制所有品类的店铺/单品排行切换，增加环比数据和底色，屏蔽'其他'品类"""
-    html = ''
-    
-    # 添加全局切换按钮和JavaScript
-    html += '''
+# 品类排行顶部的店铺/单品排行切换按钮
+CATEGORY_RANKING_SWITCH = '''
     <div style="margin: 10px 0; padding: 10px; background: #e3f2fd; border-radius: 8px; border-left: 4px solid #2196f3;">
         <button onclick="showAllShopRanking()" id="btn_all_shop" style="margin-right: 10px; padding: 8px 15px; background: #007bff; color: white; border: none; border-radius: 4px; cursor: pointer; font-weight: bold;">店铺排行</button>
         <button onclick="showAllProductRanking()" id="btn_all_product" style="padding: 8px 15px; background: #6c757d; color: white; border: none; border-radius: 4px; cursor: pointer;">单品排行</button>
@@ -1601,578 +1345,400 @@ def generate_category_ranking_html(category_data, df_erp, prev_category_data, am
     }
     </script>
     '''
-    
+CATEGORY_TITLE = Template('{icon} {idx}. {cat} ─ 销售额: ¥{amount:,} ({ratio}) ─ 销量: {qty:,}件 | 单价: ¥{price:,}', 'CATEGORY_TITLE')
+FENXIAO_LINE = Template('<br>其中分销: ¥{amount:,}（{qty}件）', 'FENXIAO_LINE')
+# 本期/对比期对比行（品类下的店铺、单品），结尾的 </li> 在追加分销信息后再写
+COMPARE_ROW = Template('<li style="margin-bottom: 5px; {bg}">{label}<br>本期: ¥{amount:,}（{qty}件），对比期: ¥{prev_amount:,}（{prev_qty}件），环比 {ratio}', 'COMPARE_ROW')
+RANKING_PANELS = Template('''
+        <div id="shop_ranking_{category_id}" style="display: block;">
+            {shop_html}
+        </div>
+        <div id="product_ranking_{category_id}" style="display: none;">
+            {product_html}
+        </div>
+        ''', 'RANKING_PANELS')
+
+
+def generate_category_ranking_html(category_data, df_erp, prev_category_data, amount_col, qty_col, CATEGORY_COL, MODEL_COL, category_icons, df_prev=None, SHOP_COL='店铺', cube=None, prev_cube=None):
+    """生成品类销售排行榜HTML，标题后固定两个按钮控制所有品类的店铺/单品排行切换，增加环比数据和底色，屏蔽'其他'品类"""
+    cube = ensure_cube(cube, df_erp, amount_col, qty_col, CUBE_DIMS)
+    prev_cube = ensure_cube(prev_cube, df_prev, amount_col, qty_col, CUBE_DIMS)
+    html = HtmlWriter()
+
+    # 添加全局切换按钮和JavaScript
+    html.write(CATEGORY_RANKING_SWITCH)
+
     # 过滤掉"其他"品类
     filtered_category_data = category_data[category_data[CATEGORY_COL] != '其他']
-    
-    for idx, row in enumerate(filtered_category_data.iterrows(), 1):
+
+    for idx, row in enumerate(compare_periods(filtered_category_data, prev_category_data, CATEGORY_COL, amount_col, qty_col).iterrows(), 1):
         _, row_data = row
         cat = row_data[CATEGORY_COL]
         amount = int(row_data[amount_col])
         qty = int(row_data[qty_col])
         price = int(amount / qty) if qty else 0
         # 查找昨日该品类数据
-        prev_amount = 0
-        if prev_category_data is not None:
-            prev_cat_data = prev_category_data[prev_category_data[CATEGORY_COL] == cat]
-            if not prev_cat_data.empty:
-                prev_amount = int(prev_cat_data.iloc[0][amount_col])
+        prev_amount = int(row_data['prev_amount'])
         icon = category_icons.get(cat, '📦')
-        
+
         # 生成唯一的ID用于JavaScript切换
         category_id = f"category_{idx}_{cat.replace(' ', '_').replace('/', '_')}"
-        
+
         # 计算该品类的分销数据
-        fenxiao_amount = 0
-        fenxiao_qty = 0
-        if '数据来源' in df_erp.columns:
-            fenxiao_data = df_erp[(df_erp[CATEGORY_COL] == cat) & (df_erp['数据来源'] == '分销')]
-            if not fenxiao_data.empty:
-                fenxiao_amount = int(fenxiao_data[amount_col].sum())
-                fenxiao_qty = int(fenxiao_data[qty_col].sum())
-        
+        fenxiao_amount, fenxiao_qty = map(int, cube.value(CATEGORY_COL, cat, FENXIAO_ONLY))
+
         # 构建品类标题，包含分销信息
-        category_title = f'{icon} {idx}. {cat} ─ 销售额: ¥{amount:,} ({calculate_ratio(amount, prev_amount)}) ─ 销量: {qty:,}件 | 单价: ¥{price:,}'
+        category_title = CATEGORY_TITLE.render(icon=icon, idx=idx, cat=cat, amount=amount, ratio=calculate_ratio(amount, prev_amount), qty=qty, price=price)
         if fenxiao_amount > 0:
-            category_title += f'<br>其中分销: ¥{fenxiao_amount:,}（{fenxiao_qty}件）'
-        
-        html += f'<details><summary>{category_title}</summary>'
+            category_title += FENXIAO_LINE.render(amount=fenxiao_amount, qty=fenxiao_qty)
+
+        html.render(DETAILS_OPEN, title=category_title)
         # 生成店铺排行数据
-        shop_summary = df_erp[df_erp[CATEGORY_COL] == cat].groupby(SHOP_COL).agg({
-            amount_col: 'sum',
-            qty_col: 'sum'
-        }).reset_index()
-        shop_summary = shop_summary.sort_values(amount_col, ascending=False)
-        
+        shop_summary = cube.group(CATEGORY_COL, cat, SHOP_COL).sort_values(amount_col, ascending=False)
+
         # 生成店铺排行HTML
-        shop_html = ''
+        shop_html = HtmlWriter()
         if len(shop_summary) > 0:
-            shop_html += '<ul style="margin-left: 20px; padding-left: 10px;">'
+            shop_html.write(LIST_OPEN)
             for shop_idx, (_, shop_row) in enumerate(shop_summary.iterrows(), 1):
                 shop = shop_row[SHOP_COL]
                 shop_amount = int(shop_row[amount_col])
                 shop_qty = int(shop_row[qty_col])
-                shop_price = int(shop_amount / shop_qty) if shop_qty else 0
-                
+
                 # 查找前一天该店铺在该品类的数据
-                prev_shop_amount = 0
-                prev_shop_qty = 0
-                if df_prev is not None:
-                    prev_shop_data = df_prev[(df_prev[SHOP_COL] == shop) & (df_prev[CATEGORY_COL] == cat)]
-                    if not prev_shop_data.empty:
-                        prev_shop_amount = int(prev_shop_data[amount_col].sum())
-                        prev_shop_qty = int(prev_shop_data[qty_col].sum())
-                
-                # 背景色
-                if shop_qty > prev_shop_qty:
-                    bg = 'background: #f0fff0;'
-                elif shop_qty < prev_shop_qty:
-                    bg = 'background: #fff0f0;'
-                else:
-                    bg = ''
-                
+                prev_shop_amount, prev_shop_qty = map(int, prev_cube.value([SHOP_COL, CATEGORY_COL], (shop, cat)))
+
                 # 计算该店铺的分销数据
-                fenxiao_amount = 0
-                fenxiao_qty = 0
-                prev_fenxiao_amount = 0
-                prev_fenxiao_qty = 0
-                
-                # 当天分销数据
-                if '数据来源' in df_erp.columns:
-                    fenxiao_data = df_erp[(df_erp[SHOP_COL] == shop) & (df_erp[CATEGORY_COL] == cat) & (df_erp['数据来源'] == '分销')]
-                    if not fenxiao_data.empty:
-                        fenxiao_amount = int(fenxiao_data[amount_col].sum())
-                        fenxiao_qty = int(fenxiao_data[qty_col].sum())
-                
-                # 昨日分销数据
-                if df_prev is not None and '数据来源' in df_prev.columns:
-                    prev_fenxiao_data = df_prev[(df_prev[SHOP_COL] == shop) & (df_prev[CATEGORY_COL] == cat) & (df_prev['数据来源'] == '分销')]
-                    if not prev_fenxiao_data.empty:
-                        prev_fenxiao_amount = int(prev_fenxiao_data[amount_col].sum())
-                        prev_fenxiao_qty = int(prev_fenxiao_data[qty_col].sum())
-                
-                shop_html += f'<li style="margin-bottom: 5px; {bg}">🏪 TOP{shop_idx} {shop}<br>本期: ¥{shop_amount:,}（{shop_qty}件），对比期: ¥{prev_shop_amount:,}（{prev_shop_qty}件），环比 {calculate_ratio(shop_qty, prev_shop_qty)}'
-                
+                fenxiao_amount, fenxiao_qty = map(int, cube.value([SHOP_COL, CATEGORY_COL], (shop, cat), FENXIAO_ONLY))
+
+                shop_html.render(COMPARE_ROW, bg=change_background(shop_qty, prev_shop_qty), label=f'🏪 TOP{shop_idx} {shop}',
+                                 amount=shop_amount, qty=shop_qty, prev_amount=prev_shop_amount, prev_qty=prev_shop_qty,
+                                 ratio=calculate_ratio(shop_qty, prev_shop_qty))
+
                 # 添加分销数据展示（如果有分销数据）
                 if fenxiao_amount > 0:
-                    shop_html += f'<br>其中分销: ¥{fenxiao_amount:,}（{fenxiao_qty}件）'
-                
-                shop_html += '</li>'
-            shop_html += '</ul>'
+                    shop_html.render(FENXIAO_LINE, amount=fenxiao_amount, qty=fenxiao_qty)
+
+                shop_html.write('</li>')
+            shop_html.write(LIST_CLOSE)
         else:
-            shop_html += '<p style="margin-left: 20px; color: #666;">暂无店铺数据</p>'
-        
+            shop_html.render(EMPTY_NOTE, text='暂无店铺数据')
+
         # 生成单品排行数据（原有逻辑）
-        product_summary = df_erp[df_erp[CATEGORY_COL] == cat].groupby(MODEL_COL).agg({
-            amount_col: 'sum', 
-            qty_col: 'sum'
-        }).reset_index()
-        prev_product_summary = None
-        if prev_category_data is not None and df_prev is not None:
-            prev_cat_df = df_prev[df_prev[CATEGORY_COL] == cat]
-            if not prev_cat_df.empty:
-                prev_product_summary = prev_cat_df.groupby(MODEL_COL).agg({
-                    amount_col: 'sum',
-                    qty_col: 'sum'
-                }).reset_index()
-        current_products = set(product_summary[MODEL_COL])
-        prev_products = set(prev_product_summary[MODEL_COL]) if prev_product_summary is not None else set()
-        all_products = list(current_products | prev_products)
+        product_summary = cube.group(CATEGORY_COL, cat, MODEL_COL)
+        prev_products = set()
+        if prev_category_data is not None:
+            prev_products = set(prev_cube.group(CATEGORY_COL, cat, MODEL_COL)[MODEL_COL])
+        all_products = list(set(product_summary[MODEL_COL]) | prev_products)
         # 按本期销售额排序
-        all_products.sort(key=lambda p: int(product_summary[product_summary[MODEL_COL]==p][amount_col].values[0]) if not product_summary[product_summary[MODEL_COL]==p].empty else 0, reverse=True)
-        
+        all_products.sort(key=lambda p: int(cube.value([CATEGORY_COL, MODEL_COL], (cat, p))[0]), reverse=True)
+
         # 生成单品排行HTML
-        product_html = ''
+        product_html = HtmlWriter()
         if all_products:
-            product_html += '<ul style="margin-left: 20px; padding-left: 10px;">'
+            product_html.write(LIST_OPEN)
             for product in all_products:
                 # 本期
-                cur_row = product_summary[product_summary[MODEL_COL] == product]
-                cur_amount = int(cur_row[amount_col].values[0]) if not cur_row.empty else 0
-                cur_qty = int(cur_row[qty_col].values[0]) if not cur_row.empty else 0
+                cur_amount, cur_qty = map(int, cube.value([CATEGORY_COL, MODEL_COL], (cat, product)))
                 # 对比期
-                prev_amount = 0
-                prev_qty = 0
-                if prev_product_summary is not None:
-                    prev_row = prev_product_summary[prev_product_summary[MODEL_COL] == product]
-                    prev_amount = int(prev_row[amount_col].values[0]) if not prev_row.empty else 0
-                    prev_qty = int(prev_row[qty_col].values[0]) if not prev_row.empty else 0
+                prev_amount, prev_qty = map(int, prev_cube.value([CATEGORY_COL, MODEL_COL], (cat, product)))
                 # 只要有一方大于1000就展示
                 if cur_amount > 1000 or prev_amount > 1000:
-                    ratio_str = calculate_ratio(cur_qty, prev_qty)
-                    # 背景色
-                    if cur_qty > prev_qty:
-                        bg = 'background: #f0fff0;'
-                    elif cur_qty < prev_qty:
-                        bg = 'background: #fff0f0;'
-                    else:
-                        bg = ''
-                    
                     # 计算该单品的分销数据
-                    fenxiao_amount = 0
-                    fenxiao_qty = 0
-                    prev_fenxiao_amount = 0
-                    prev_fenxiao_qty = 0
-                    
-                    # 当天分销数据
-                    if '数据来源' in df_erp.columns:
-                        fenxiao_product_data = df_erp[(df_erp[MODEL_COL] == product) & (df_erp['数据来源'] == '分销')]
-                        if not fenxiao_product_data.empty:
-                            fenxiao_amount = int(fenxiao_product_data[amount_col].sum())
-                            fenxiao_qty = int(fenxiao_product_data[qty_col].sum())
-                    
-                    # 前一天分销数据
-                    if df_prev is not None and '数据来源' in df_prev.columns:
-                        prev_fenxiao_product_data = df_prev[(df_prev[MODEL_COL] == product) & (df_prev['数据来源'] == '分销')]
-                        if not prev_fenxiao_product_data.empty:
-                            prev_fenxiao_amount = int(prev_fenxiao_product_data[amount_col].sum())
-                            prev_fenxiao_qty = int(prev_fenxiao_product_data[qty_col].sum())
-                    
+                    fenxiao_amount, fenxiao_qty = map(int, cube.value(MODEL_COL, product, FENXIAO_ONLY))
+
                     # 判断是否100%分销
                     is_100_percent_fenxiao = (fenxiao_amount == cur_amount and cur_amount > 0)
-                    
+
                     # 产品名称显示
                     product_display = f'{product}（分销）' if is_100_percent_fenxiao else product
-                    
-                    product_html += f'<li style="margin-bottom: 5px; {bg}">🔸 {product_display}<br>本期: ¥{cur_amount:,}（{cur_qty}件），对比期: ¥{prev_amount:,}（{prev_qty}件），环比 {ratio_str}'
-                    
+
+                    product_html.render(COMPARE_ROW, bg=change_background(cur_qty, prev_qty), label=f'🔸 {product_display}',
+                                        amount=cur_amount, qty=cur_qty, prev_amount=prev_amount, prev_qty=prev_qty,
+                                        ratio=calculate_ratio(cur_qty, prev_qty))
+
                     # 如果不是100%分销但有分销数据，显示分销详情
                     if not is_100_percent_fenxiao and fenxiao_amount > 0:
-                        product_html += f'<br>其中分销: ¥{fenxiao_amount:,}（{fenxiao_qty}件）'
-                    
-                    product_html += '</li>'
-            product_html += '</ul>'
+                        product_html.render(FENXIAO_LINE, amount=fenxiao_amount, qty=fenxiao_qty)
+
+                    product_html.write('</li>')
+            product_html.write(LIST_CLOSE)
         else:
-            product_html += '<p style="margin-left: 20px; color: #666;">暂无单品数据</p>'
-        
+            product_html.render(EMPTY_NOTE, text='暂无单品数据')
+
         # 添加店铺排行和单品排行的容器，默认显示店铺排行
-        html += f'''
-        <div id="shop_ranking_{category_id}" style="display: block;">
-            {shop_html}
-        </div>
-        <div id="product_ranking_{category_id}" style="display: none;">
-            {product_html}
-        </div>
-        '''
-        
-        html += '</details>'
-    return html
+        html.render(RANKING_PANELS, category_id=category_id, shop_html=shop_html.getvalue(), product_html=product_html.getvalue())
 
-def generate_channel_ranking_html(channel_summary, df_erp, prev_channel_summary, amount_col, qty_col, SHOP_COL):
+        html.write(DETAILS_CLOSE)
+    return html.getvalue()
+
+CHANNEL_TITLE = Template('🏪 {idx}. {channel}渠道: ¥{amount:,} ({ratio}) | ¥{price:,}/件', 'CHANNEL_TITLE')
+CHANNEL_SHOP_ROW = Template('<li style="margin-bottom: 5px;">🏪 {shop}<br>销售额: ¥{amount:,}（{qty}件）| 单价: ¥{price:,}，环比 {ratio}</li>', 'CHANNEL_SHOP_ROW')
+
+def generate_channel_ranking_html(channel_summary, df_erp, prev_channel_summary, amount_col, qty_col, SHOP_COL, df_prev=None, prev_cube=None):
     """生成渠道销售分析HTML，每个渠道下折叠店铺明细，增加环比数据"""
-    html = ''
-    for idx, row in enumerate(channel_summary.iterrows(), 1):
+    # 店铺环比按对比期全部渠道合计（与原来按店铺名筛选 df_prev 一致）
+    prev_cube = ensure_cube(prev_cube, df_prev, amount_col, qty_col, CUBE_DIMS)
+    prev_shop_totals = prev_cube.rollup(SHOP_COL)
+    html = HtmlWriter()
+    for idx, row in enumerate(compare_periods(channel_summary, prev_channel_summary, '渠道', amount_col, qty_col).iterrows(), 1):
         _, row_data = row
         channel = row_data['渠道']
         amount = int(row_data[amount_col])
         qty = int(row_data[qty_col])
         price = int(amount / qty) if qty else 0
-        
+
         # 查找前一天该渠道数据
-        prev_amount = 0
-        if prev_channel_summary is not None:
-            prev_data = prev_channel_summary[prev_channel_summary['渠道'] == channel]
-            if not prev_data.empty:
-                prev_amount = int(prev_data.iloc[0][amount_col])
-        
-        html += f'<details><summary>🏪 {idx}. {channel}渠道: ¥{amount:,} ({calculate_ratio(amount, prev_amount)}) | ¥{price:,}/件</summary>'
-        
+        prev_amount = int(row_data['prev_amount'])
+
+        html.render(DETAILS_OPEN, title=CHANNEL_TITLE.render(idx=idx, channel=channel, amount=amount, ratio=calculate_ratio(amount, prev_amount), price=price))
+
         # 店铺明细（折叠内容）- 增加环比
         shop_summary = df_erp[df_erp['渠道'] == channel].groupby(SHOP_COL).agg({
-            amount_col: 'sum', 
+            amount_col: 'sum',
             qty_col: 'sum'
         }).reset_index()
         shop_summary = shop_summary.sort_values(amount_col, ascending=False)
-        
+
         if len(shop_summary) > 0:
-            html += '<ul style="margin-left: 20px; padding-left: 10px;">'
-            for _, s_row in shop_summary.iterrows():
-                shop = s_row[SHOP_COL]
+            html.write(LIST_OPEN)
+            for _, s_row in compare_periods(shop_summary, prev_shop_totals, SHOP_COL, amount_col, qty_col).iterrows():
                 s_amount = int(s_row[amount_col])
                 s_qty = int(s_row[qty_col])
                 s_price = int(s_amount / s_qty) if s_qty else 0
-                
-                # 查找昨日该店铺数据
-                prev_s_amount = 0
-                prev_s_qty = 0
-                if df_prev is not None:
-                    prev_shop_data = df_prev[df_prev[SHOP_COL] == shop]
-                    if not prev_shop_data.empty:
-                        prev_s_amount = int(prev_shop_data[amount_col].sum())
-                        prev_s_qty = int(prev_shop_data[qty_col].sum())
-                
-                html += f'<li style="margin-bottom: 5px;">🏪 {shop}<br>销售额: ¥{s_amount:,}（{s_qty}件）| 单价: ¥{s_price:,}，环比 {calculate_ratio(s_amount, prev_s_amount)}</li>'
-            html += '</ul>'
+                html.render(CHANNEL_SHOP_ROW, shop=s_row[SHOP_COL], amount=s_amount, qty=s_qty, price=s_price,
+                            ratio=calculate_ratio(s_amount, int(s_row['prev_amount'])))
+            html.write(LIST_CLOSE)
         else:
-            html += '<p style="margin-left: 20px; color: #666;">暂无店铺数据</p>'
-        
-        html += '</details>'
-    return html
+            html.render(EMPTY_NOTE, text='暂无店铺数据')
+
+        html.write(DETAILS_CLOSE)
+    return html.getvalue()
 
-def generate_shop_ranking_html(shop_summary, df_erp, prev_shop_summary, amount_col, qty_col, MODEL_COL, df_prev=None):
+SHOP_TITLE = Template('🏪 TOP{idx} {shop} ─ 销售额: ¥{amount:,} ({ratio}) ─ 单价: ¥{price:,}', 'SHOP_TITLE')
+SHOP_FENXIAO_LINE = Template('<br>其中分销: ¥{amount:,}', 'SHOP_FENXIAO_LINE')
+SHOP_PRODUCT_ROW = Template('<li style="margin-bottom: 5px; {bg}">🔸 {product}<br>本期: ¥{amount:,}，对比期: ¥{prev_amount:,}，环比 {ratio}</li>', 'SHOP_PRODUCT_ROW')
+
+def generate_shop_ranking_html(shop_summary, df_erp, prev_shop_summary, amount_col, qty_col, MODEL_COL, df_prev=None, cube=None, prev_cube=None):
     """生成TOP店铺排行HTML，每个店铺下折叠单品明细，增加环比数据和底色"""
-    html = ''
-    for idx, row in enumerate(shop_summary.iterrows(), 1):
+    cube = ensure_cube(cube, df_erp, amount_col, qty_col, CUBE_DIMS)
+    prev_cube = ensure_cube(prev_cube, df_prev, amount_col, qty_col, CUBE_DIMS)
+    html = HtmlWriter()
+    for idx, row in enumerate(compare_periods(shop_summary, prev_shop_summary, '店铺', amount_col, qty_col).iterrows(), 1):
         _, row_data = row
         shop = row_data['店铺']
         amount = int(row_data[amount_col])
         qty = int(row_data[qty_col])
         price = int(amount / qty) if qty else 0
-        
+
         # 查找前一天该店铺数据
-        prev_amount = 0
-        if prev_shop_summary is not None:
-            prev_data = prev_shop_summary[prev_shop_summary['店铺'] == shop]
-            if not prev_data.empty:
-                prev_amount = int(prev_data.iloc[0][amount_col])
-        
+        prev_amount = int(row_data['prev_amount'])
+
         # 计算该店铺的分销数据
-        fenxiao_amount = 0
-        fenxiao_qty = 0
-        prev_fenxiao_amount = 0
-        prev_fenxiao_qty = 0
-        
-        # 当天分销数据
-        if '数据来源' in df_erp.columns:
-            fenxiao_data = df_erp[(df_erp['店铺'] == shop) & (df_erp['数据来源'] == '分销')]
-            if not fenxiao_data.empty:
-                fenxiao_amount = int(fenxiao_data[amount_col].sum())
-                fenxiao_qty = int(fenxiao_data[qty_col].sum())
-        
-        # 前一天分销数据
-        if df_prev is not None and '数据来源' in df_prev.columns:
-            prev_fenxiao_data = df_prev[(df_prev['店铺'] == shop) & (df_prev['数据来源'] == '分销')]
-            if not prev_fenxiao_data.empty:
-                prev_fenxiao_amount = int(prev_fenxiao_data[amount_col].sum())
-                prev_fenxiao_qty = int(prev_fenxiao_data[qty_col].sum())
-        
+        fenxiao_amount, fenxiao_qty = map(int, cube.value('店铺', shop, FENXIAO_ONLY))
+
         # 构建店铺标题，包含分销数据
-        shop_title = f'🏪 TOP{idx} {shop} ─ 销售额: ¥{amount:,} ({calculate_ratio(amount, prev_amount)}) ─ 单价: ¥{price:,}'
+        shop_title = SHOP_TITLE.render(idx=idx, shop=shop, amount=amount, ratio=calculate_ratio(amount, prev_amount), price=price)
         if fenxiao_amount > 0:
-            shop_title += f'<br>其中分销: ¥{fenxiao_amount:,}'
-        
-        html += f'<details><summary>{shop_title}</summary>'
+            shop_title += SHOP_FENXIAO_LINE.render(amount=fenxiao_amount)
+
+        html.render(DETAILS_OPEN, title=shop_title)
         # 单品明细（折叠内容）- 用并集遍历，按本期销售额排序
-        product_summary = df_erp[df_erp['店铺'] == shop].groupby(MODEL_COL).agg({
-            amount_col: 'sum', 
-            qty_col: 'sum'
-        }).reset_index()
-        prev_product_summary = None
-        if df_prev is not None:
-            prev_shop_df = df_prev[df_prev['店铺'] == shop]
-            if not prev_shop_df.empty:
-                prev_product_summary = prev_shop_df.groupby(MODEL_COL).agg({
-                    amount_col: 'sum',
-                    qty_col: 'sum'
-                }).reset_index()
-        current_products = set(product_summary[MODEL_COL])
-        prev_products = set(prev_product_summary[MODEL_COL]) if prev_product_summary is not None else set()
-        all_products = list(current_products | prev_products)
+        product_summary = cube.group('店铺', shop, MODEL_COL)
+        prev_products = set(prev_cube.group('店铺', shop, MODEL_COL)[MODEL_COL])
+        all_products = list(set(product_summary[MODEL_COL]) | prev_products)
         # 按本期销售额排序
-        all_products.sort(key=lambda p: int(product_summary[product_summary[MODEL_COL]==p][amount_col].values[0]) if not product_summary[product_summary[MODEL_COL]==p].empty else 0, reverse=True)
+        all_products.sort(key=lambda p: int(cube.value(['店铺', MODEL_COL], (shop, p))[0]), reverse=True)
         if all_products:
-            html += '<ul style="margin-left: 20px; padding-left: 10px;">'
+            html.write(LIST_OPEN)
             for product in all_products:
                 # 本期
-                cur_row = product_summary[product_summary[MODEL_COL] == product]
-                cur_amount = int(cur_row[amount_col].values[0]) if not cur_row.empty else 0
-                cur_qty = int(cur_row[qty_col].values[0]) if not cur_row.empty else 0
+                cur_amount, cur_qty = map(int, cube.value(['店铺', MODEL_COL], (shop, product)))
                 # 对比期
-                prev_amount = 0
-                prev_qty = 0
-                if prev_product_summary is not None:
-                    prev_row = prev_product_summary[prev_product_summary[MODEL_COL] == product]
-                    prev_amount = int(prev_row[amount_col].values[0]) if not prev_row.empty else 0
-                    prev_qty = int(prev_row[qty_col].values[0]) if not prev_row.empty else 0
+                prev_amount, prev_qty = map(int, prev_cube.value(['店铺', MODEL_COL], (shop, product)))
                 # 只要有一方大于1000就展示
                 if cur_amount > 1000 or prev_amount > 1000:
-                    ratio_str = calculate_ratio(cur_amount, prev_amount)
-                    # 背景色
-                    if cur_amount > prev_amount:
-                        bg = 'background: #f0fff0;'
-                    elif cur_amount < prev_amount:
-                        bg = 'background: #fff0f0;'
-                    else:
-                        bg = ''
-                    html += f'<li style="margin-bottom: 5px; {bg}">🔸 {product}<br>本期: ¥{cur_amount:,}，对比期: ¥{prev_amount:,}，环比 {ratio_str}</li>'
-            html += '</ul>'
+                    html.render(SHOP_PRODUCT_ROW, bg=change_background(cur_amount, prev_amount), product=product,
+                                amount=cur_amount, prev_amount=prev_amount, ratio=calculate_ratio(cur_amount, prev_amount))
+            html.write(LIST_CLOSE)
         else:
-            html += '<p style="margin-left: 20px; color: #666;">暂无单品数据</p>'
-        html += '</details>'
-    return html
+            html.render(EMPTY_NOTE, text='暂无单品数据')
+        html.write(DETAILS_CLOSE)
+    return html.getvalue()
 
-def generate_category_trend_html(category_data, prev_category_data, category_icons, shop_summary, prev_shop_summary, df_erp, df_prev, amount_col, qty_col, MODEL_COL):
+TREND_HEADLINE = Template('<strong>{emoji} {category}: {arrow}{growth_rate:.1f}%</strong><br>', 'TREND_HEADLINE')
+TREND_AMOUNT_CHANGE = Template('销售额变化: ¥{prev_amount:,} → ¥{current_amount:,}<br>', 'TREND_AMOUNT_CHANGE')
+TREND_FENXIAO = Template('其中分销: ¥{amount:,}，环比 {ratio}', 'TREND_FENXIAO')
+SHOP_MONITOR_ROW = Template('🏪 {shop}: {sign}{growth_rate:.1f}% (¥{prev_amount:,}→¥{current_amount:,})<br>', 'SHOP_MONITOR_ROW')
+PRODUCT_MONITOR_ROW = Template('🔸 {product}: {sign}{growth_rate:.1f}% ({prev_qty}→{current_qty}件)<br>', 'PRODUCT_MONITOR_ROW')
+
+def generate_category_trend_html(category_data, prev_category_data, category_icons, shop_summary, prev_shop_summary, df_erp, df_prev, amount_col, qty_col, MODEL_COL, cube=None, prev_cube=None):
     """生成品类变化趋势HTML，增加店铺和单品环比监控"""
-    html = ''
-    
+    cube = ensure_cube(cube, df_erp, amount_col, qty_col, CUBE_DIMS)
+    prev_cube = ensure_cube(prev_cube, df_prev, amount_col, qty_col, CUBE_DIMS)
+    html = HtmlWriter()
+
     # 品类变化趋势 - 按销售额从高到低排序
-    html += '<h3>📊 品类变化趋势</h3>'
+    html.write('<h3>📊 品类变化趋势</h3>')
     # 按销售额排序
     category_data_sorted = category_data.sort_values(amount_col, ascending=False)
-    
-    for _, row in category_data_sorted.iterrows():
+
+    for _, row in compare_periods(category_data_sorted, prev_category_data, CATEGORY_COL, amount_col, qty_col).iterrows():
         category = row[CATEGORY_COL]
         current_amount = int(row[amount_col])
-        current_qty = int(row[qty_col])
-        
+
         # 查找前一天该品类数据
-        prev_amount = 0
-        prev_qty = 0
-        if prev_category_data is not None:
-            prev_data = prev_category_data[prev_category_data[CATEGORY_COL] == category]
-            if not prev_data.empty:
-                prev_amount = int(prev_data.iloc[0][amount_col])
-                prev_qty = int(prev_data.iloc[0][qty_col])
-        
+        prev_amount = int(row['prev_amount'])
+
         # 计算分销数据
-        fenxiao_amount = 0
-        fenxiao_qty = 0
-        prev_fenxiao_amount = 0
-        prev_fenxiao_qty = 0
-        
-        # 当天分销数据
-        if '数据来源' in df_erp.columns:
-            fenxiao_data = df_erp[(df_erp[CATEGORY_COL] == category) & (df_erp['数据来源'] == '分销')]
-            if not fenxiao_data.empty:
-                fenxiao_amount = int(fenxiao_data[amount_col].sum())
-                fenxiao_qty = int(fenxiao_data[qty_col].sum())
-        
-        # 前一天分销数据
-        if df_prev is not None and '数据来源' in df_prev.columns:
-            prev_fenxiao_data = df_prev[(df_prev[CATEGORY_COL] == category) & (df_prev['数据来源'] == '分销')]
-            if not prev_fenxiao_data.empty:
-                prev_fenxiao_amount = int(prev_fenxiao_data[amount_col].sum())
-                prev_fenxiao_qty = int(prev_fenxiao_data[qty_col].sum())
-        
+        fenxiao_amount, fenxiao_qty = map(int, cube.value(CATEGORY_COL, category, FENXIAO_ONLY))
+        prev_fenxiao_amount, prev_fenxiao_qty = map(int, prev_cube.value(CATEGORY_COL, category, FENXIAO_ONLY))
+
         if prev_amount > 0:
             growth_rate = ((current_amount - prev_amount) / prev_amount) * 100
-            emoji = category_icons.get(category, '📦')
-            if growth_rate > 0:
-                html += f'<div style="margin-bottom: 8px; padding: 6px; background: #f0f8ff; border-radius: 4px;">'
-                html += f'<strong>{emoji} {category}: 📈 +{growth_rate:.1f}%</strong><br>'
-                html += f'销售额变化: ¥{prev_amount:,} → ¥{current_amount:,}<br>'
-                # 添加分销数据展示（如果有分销数据）
-                if fenxiao_amount > 0 or prev_fenxiao_amount > 0:
-                    html += f'其中分销: ¥{fenxiao_amount:,}，环比 {calculate_ratio(fenxiao_amount, prev_fenxiao_amount)}'
-                html += '</div>'
-            else:
-                html += f'<div style="margin-bottom: 8px; padding: 6px; background: #fff0f0; border-radius: 4px;">'
-                html += f'<strong>{emoji} {category}: 📉 {growth_rate:.1f}%</strong><br>'
-                html += f'销售额变化: ¥{prev_amount:,} → ¥{current_amount:,}<br>'
-                # 添加分销数据展示（如果有分销数据）
-                if fenxiao_amount > 0 or prev_fenxiao_amount > 0:
-                    html += f'其中分销: ¥{fenxiao_amount:,}，环比 {calculate_ratio(fenxiao_amount, prev_fenxiao_amount)}'
-                html += '</div>'
-    
+            growing = growth_rate > 0
+            html.render(NOTE_BOX_OPEN, margin=8, padding=6, background='#f0f8ff' if growing else '#fff0f0')
+            html.render(TREND_HEADLINE, emoji=category_icons.get(category, '📦'), category=category,
+                        arrow='📈 +' if growing else '📉 ', growth_rate=growth_rate)
+            html.render(TREND_AMOUNT_CHANGE, prev_amount=prev_amount, current_amount=current_amount)
+            # 添加分销数据展示（如果有分销数据）
+            if fenxiao_amount > 0 or prev_fenxiao_amount > 0:
+                html.render(TREND_FENXIAO, amount=fenxiao_amount, ratio=calculate_ratio(fenxiao_amount, prev_fenxiao_amount))
+            html.write(BOX_CLOSE)
+
     # 店铺环比监控（>20%增长或下滑）
-    html += '<h3>⚠️ 店铺环比监控</h3>'
-    growth_shops = []
-    decline_shops = []
-    
-    for _, row in shop_summary.iterrows():
-        shop = row['店铺']
-        current_amount = int(row[amount_col])
-        current_qty = int(row[qty_col])
-        
-        # 查找前一天该店铺数据
-        prev_amount = 0
-        prev_qty = 0
-        if prev_shop_summary is not None:
-            prev_data = prev_shop_summary[prev_shop_summary['店铺'] == shop]
-            if not prev_data.empty:
-                prev_amount = int(prev_data.iloc[0][amount_col])
-                prev_qty = int(prev_data.iloc[0][qty_col])
-        
-        if prev_amount > 0:
-            growth_rate = ((current_amount - prev_amount) / prev_amount) * 100
-            if growth_rate > 20:
-                growth_shops.append((shop, growth_rate, prev_amount, current_amount))
-            elif growth_rate < -20:
-                decline_shops.append((shop, growth_rate, prev_amount, current_amount))
-    
+    html.write('<h3>⚠️ 店铺环比监控</h3>')
+    shop_compare = compare_periods(shop_summary, prev_shop_summary, '店铺', amount_col, qty_col)
+    growth_shops = change_tuples(growth_view(shop_compare, above=20, sort=False), '店铺', amount_col)
+    decline_shops = change_tuples(decline_view(shop_compare, below=-20, sort=False), '店铺', amount_col)
+
     # 显示增长店铺
     if growth_shops:
-        html += '<div style="margin-bottom: 10px; padding: 8px; background: #f0fff0; border-radius: 4px;">'
-        html += '<strong>📈 高速增长店铺 (>20%)</strong><br>'
+        html.render(NOTE_BOX_OPEN, margin=10, padding=8, background='#f0fff0')
+        html.write('<strong>📈 高速增长店铺 (>20%)</strong><br>')
         for shop, growth_rate, prev_amount, current_amount in growth_shops[:5]:
-            html += f'🏪 {shop}: +{growth_rate:.1f}% (¥{prev_amount:,}→¥{current_amount:,})<br>'
-        html += '</div>'
-    
+            html.render(SHOP_MONITOR_ROW, shop=shop, sign='+', growth_rate=growth_rate, prev_amount=prev_amount, current_amount=current_amount)
+        html.write(BOX_CLOSE)
+
     # 显示下滑店铺
     if decline_shops:
-        html += '<div style="margin-bottom: 10px; padding: 8px; background: #fff0f0; border-radius: 4px;">'
-        html += '<strong>📉 严重下滑店铺 (>20%)</strong><br>'
+        html.render(NOTE_BOX_OPEN, margin=10, padding=8, background='#fff0f0')
+        html.write('<strong>📉 严重下滑店铺 (>20%)</strong><br>')
         for shop, growth_rate, prev_amount, current_amount in decline_shops[:5]:
-            html += f'🏪 {shop}: {growth_rate:.1f}% (¥{prev_amount:,}→¥{current_amount:,})<br>'
-        html += '</div>'
-    
+            html.render(SHOP_MONITOR_ROW, shop=shop, sign='', growth_rate=growth_rate, prev_amount=prev_amount, current_amount=current_amount)
+        html.write(BOX_CLOSE)
+
     # 单品环比监控（>20%增长或下滑）- 按品类分组显示所有满足条件的单品
-    html += '<h3>⚠️ 单品环比监控</h3>'
-    
+    html.write('<h3>⚠️ 单品环比监控</h3>')
+
     # 按品类分组处理单品
     categories = df_erp[CATEGORY_COL].unique()
-    
+
     for cat in categories:
         if cat == '其他':
             continue
-            
+
         icon = category_icons.get(cat, '📦')
-        cat_df = df_erp[df_erp[CATEGORY_COL] == cat]
-        
         # 获取该品类所有单品数据
-        cat_products = cat_df.groupby(MODEL_COL).agg({
-            amount_col: 'sum',
-            qty_col: 'sum'
-        }).reset_index()
+        cat_products = cube.group(CATEGORY_COL, cat, MODEL_COL)
         cat_products = cat_products[(cat_products[amount_col] > 1000) & ~cat_products[MODEL_COL].str.contains('运费|外机|虚拟|赠品')]
-        
+
         growth_products = []
         decline_products = []
-        
+
         for _, row in cat_products.iterrows():
             product = row[MODEL_COL]
             current_qty = int(row[qty_col])
-            
+
             # 查找昨日该单品数据
-            prev_qty = 0
-            if df_prev is not None:
-                prev_product_data = df_prev[df_prev[MODEL_COL] == product]
-                if not prev_product_data.empty:
-                    prev_qty = int(prev_product_data[qty_col].sum())
-            
+            prev_qty = int(prev_cube.value(MODEL_COL, product)[1])
+
             if prev_qty > 0:
                 growth_rate = ((current_qty - prev_qty) / prev_qty) * 100
                 if growth_rate > 20:
                     growth_products.append((product, growth_rate, prev_qty, current_qty))
                 elif growth_rate < -20:
                     decline_products.append((product, growth_rate, prev_qty, current_qty))
-        
+
         # 按件数排序
         growth_products.sort(key=lambda x: x[3], reverse=True)  # 按当前件数排序
         decline_products.sort(key=lambda x: x[3], reverse=True)  # 按当前件数排序
-        
+
         # 显示该品类的增长单品
         if growth_products:
-            html += f'<div style="margin-bottom: 10px; padding: 8px; background: #f0fff0; border-radius: 4px;">'
-            html += f'<strong>📈 {icon} {cat} - 高速增长单品 (>20%)</strong><br>'
+            html.render(NOTE_BOX_OPEN, margin=10, padding=8, background='#f0fff0')
+            html.write(f'<strong>📈 {icon} {cat} - 高速增长单品 (>20%)</strong><br>')
             for product, growth_rate, prev_qty, current_qty in growth_products:
-                html += f'🔸 {product}: +{growth_rate:.1f}% ({prev_qty}→{current_qty}件)<br>'
-            html += '</div>'
-        
+                html.render(PRODUCT_MONITOR_ROW, product=product, sign='+', growth_rate=growth_rate, prev_qty=prev_qty, current_qty=current_qty)
+            html.write(BOX_CLOSE)
+
         # 显示该品类的下滑单品
         if decline_products:
-            html += f'<div style="margin-bottom: 10px; padding: 8px; background: #fff0f0; border-radius: 4px;">'
-            html += f'<strong>📉 {icon} {cat} - 严重下滑单品 (>20%)</strong><br>'
+            html.render(NOTE_BOX_OPEN, margin=10, padding=8, background='#fff0f0')
+            html.write(f'<strong>📉 {icon} {cat} - 严重下滑单品 (>20%)</strong><br>')
             for product, growth_rate, prev_qty, current_qty in decline_products:
-                html += f'🔸 {product}: {growth_rate:.1f}% ({prev_qty}→{current_qty}件)<br>'
-            html += '</div>'
-    
-    return html
+                html.render(PRODUCT_MONITOR_ROW, product=product, sign='', growth_rate=growth_rate, prev_qty=prev_qty, current_qty=current_qty)
+            html.write(BOX_CLOSE)
+
+    return html.getvalue()
 
-def generate_top_product_html(df_erp, amount_col, qty_col, MODEL_COL, CATEGORY_COL, category_icons, top_n=5):
+TOP_PRODUCT_ROW = Template('🔸 TOP{idx} {product}<br>销售额: ¥{amount:,} | 单价: ¥{price:,}<br>', 'TOP_PRODUCT_ROW')
+
+def generate_top_product_html(df_erp, amount_col, qty_col, MODEL_COL, CATEGORY_COL, category_icons, top_n=5, cube=None):
     """分品类展示TOP单品，每个品类下展示TOP N"""
-    html = ''
+    cube = ensure_cube(cube, df_erp, amount_col, qty_col, CUBE_DIMS)
+    html = HtmlWriter()
     # 获取所有品类
     categories = df_erp[CATEGORY_COL].unique()
     for cat in categories:
         if cat == '其他':
             continue
         icon = category_icons.get(cat, '📦')
-        cat_df = df_erp[df_erp[CATEGORY_COL] == cat]
-        product_summary = cat_df.groupby(MODEL_COL).agg({
-            amount_col: 'sum',
-            qty_col: 'sum'
-        }).reset_index()
+        product_summary = cube.group(CATEGORY_COL, cat, MODEL_COL)
         # 只保留销售额>1000且不含"运费""外机""虚拟""赠品"
         product_summary = product_summary[(product_summary[amount_col] > 1000) & ~product_summary[MODEL_COL].str.contains('运费|外机|虚拟|赠品')]
         product_summary = product_summary.sort_values(amount_col, ascending=False)
         if len(product_summary) > 0:
-            html += f'<div style="margin-bottom: 10px; padding: 8px; background: #f8f9fa; border-radius: 4px;">'
-            html += f'<strong>{icon} {cat} TOP单品</strong><br>'
-            for idx, row in enumerate(product_summary.iterrows(), 1):
-                if idx > top_n:
-                    break
-                _, p_row = row
-                product = p_row[MODEL_COL]
+            html.render(NOTE_BOX_OPEN, margin=10, padding=8, background='#f8f9fa')
+            html.write(f'<strong>{icon} {cat} TOP单品</strong><br>')
+            for idx, (_, p_row) in enumerate(product_summary.head(top_n).iterrows(), 1):
                 p_amount = int(p_row[amount_col])
                 p_qty = int(p_row[qty_col])
                 p_price = int(p_amount / p_qty) if p_qty else 0
-                html += f'🔸 TOP{idx} {product}<br>销售额: ¥{p_amount:,} | 单价: ¥{p_price:,}<br>'
-            html += '</div>'
-    return html
+                html.render(TOP_PRODUCT_ROW, idx=idx, product=p_row[MODEL_COL], amount=p_amount, price=p_price)
+            html.write(BOX_CLOSE)
+    return html.getvalue()
 
-def generate_shop_product_html(shop_summary, df_erp, amount_col, qty_col, MODEL_COL):
+SHOP_CARD_OPEN = Template('<div style="margin-bottom: 20px; padding: 10px; border: 1px solid #ddd; border-radius: 4px;"><h4 style="margin-top: 0; color: #0056b3;">🏪 {shop}</h4>', 'SHOP_CARD_OPEN')
+PRODUCT_ROW = Template('<li style="margin-bottom: 5px;">🔸 {product}<br>销售额: ¥{amount:,} | 单价: ¥{price:,}</li>', 'PRODUCT_ROW')
+
+def generate_shop_product_html(shop_summary, df_erp, amount_col, qty_col, MODEL_COL, cube=None):
     """生成店铺单品数据HTML，直接展示，无折叠"""
-    html = ''
+    cube = ensure_cube(cube, df_erp, amount_col, qty_col, CUBE_DIMS)
+    html = HtmlWriter()
     for _, row in shop_summary.iterrows():
         shop = row['店铺']
-        html += f'<div style="margin-bottom: 20px; padding: 10px; border: 1px solid #ddd; border-radius: 4px;">'
-        html += f'<h4 style="margin-top: 0; color: #0056b3;">🏪 {shop}</h4>'
-        
+        html.render(SHOP_CARD_OPEN, shop=shop)
+
         # 获取该店铺的单品数据
-        shop_df = df_erp[df_erp['店铺'] == shop]
-        product_summary = shop_df.groupby(MODEL_COL).agg({
-            amount_col: 'sum',
-            qty_col: 'sum'
-        }).reset_index()
+        product_summary = cube.group('店铺', shop, MODEL_COL)
         # 只保留销售额>1000且不含"运费""外机""虚拟""赠品"
         product_summary = product_summary[(product_summary[amount_col] > 1000) & ~product_summary[MODEL_COL].str.contains('运费|外机|虚拟|赠品')]
         product_summary = product_summary.sort_values(amount_col, ascending=False)
-        
+
         if len(product_summary) > 0:
-            html += '<ul style="margin-left: 20px; padding-left: 10px;">'
+            html.write(LIST_OPEN)
             for _, p_row in product_summary.iterrows():
-                product = p_row[MODEL_COL]
                 p_amount = int(p_row[amount_col])
                 p_qty = int(p_row[qty_col])
                 p_price = int(p_amount / p_qty) if p_qty else 0
-                html += f'<li style="margin-bottom: 5px;">🔸 {product}<br>销售额: ¥{p_amount:,} | 单价: ¥{p_price:,}</li>'
-            html += '</ul>'
+                html.render(PRODUCT_ROW, product=p_row[MODEL_COL], amount=p_amount, price=p_price)
+            html.write(LIST_CLOSE)
         else:
-            html += '<p style="margin-left: 20px; color: #666;">暂无单品数据</p>'
-        
-        html += '</div>'
-    return html
+            html.render(EMPTY_NOTE, text='暂无单品数据')
+
+        html.write(BOX_CLOSE)
+    return html.getvalue()
 
 # ========== Part 1: 整体销售到品类 ==========
 # 计算分销数据（单独统计）
@@ -2256,7 +1822,7 @@ category_data = category_data.sort_values(amount_col, ascending=False)
 
 part1 = f"""💰 【整体销售概况】\n├─ 总销售额: ¥{total_amount:,}\n├─ 总销量: {total_qty:,}件  \n├─ 单价: ¥{total_price:,}\n└─ 环比: {calculate_ratio(total_amount, prev_total_amount)}\n\n🏆 【品类销售排行榜】"""
 
-for idx, row in enumerate(category_data.iterrows(), 1):
+for idx, row in enumerate(compare_periods(category_data, prev_category_data, CATEGORY_COL, amount_col, qty_col).iterrows(), 1):
     _, row_data = row
     cat = row_data[CATEGORY_COL]
     amount = int(row_data[amount_col])
@@ -2264,36 +1830,19 @@ for idx, row in enumerate(category_data.iterrows(), 1):
     price = int(amount / qty) if qty else 0
     
     # 查找前一天该品类数据
-    prev_amount = 0
-    if prev_category_data is not None:
-        prev_cat_data = prev_category_data[prev_category_data[CATEGORY_COL] == cat]
-        if not prev_cat_data.empty:
-            prev_amount = int(prev_cat_data.iloc[0][amount_col])
+    prev_amount = int(row_data['prev_amount'])
     
-    # 获取该品类的渠道分解
-    category_channel_data = df_erp[df_erp[CATEGORY_COL] == cat].groupby('渠道').agg({
-        amount_col: 'sum'
-    }).reset_index().sort_values(amount_col, ascending=False)
-    
-    # 获取前一天该品类的渠道分解
-    prev_category_channel_data = None
-    if df_prev is not None:
-        prev_category_channel_data = df_prev[df_prev[CATEGORY_COL] == cat].groupby('渠道').agg({
-            amount_col: 'sum'
-        }).reset_index()
+    # 获取该品类的渠道分解（本期与对比期按渠道合并）
+    category_channel_data = compare_periods(
+        sales_cube.group(CATEGORY_COL, cat, '渠道').sort_values(amount_col, ascending=False),
+        prev_sales_cube.group(CATEGORY_COL, cat, '渠道'), '渠道', amount_col, qty_col)
     
     # 构建渠道分解字符串
     channel_breakdown = []
     for _, ch_row in category_channel_data.iterrows():
         channel = ch_row['渠道']
         ch_amount = int(ch_row[amount_col])
-        
-        # 查找前一天该渠道数据
-        prev_ch_amount = 0
-        if prev_category_channel_data is not None:
-            prev_ch_data = prev_category_channel_data[prev_category_channel_data['渠道'] == channel]
-            if not prev_ch_data.empty:
-                prev_ch_amount = int(prev_ch_data.iloc[0][amount_col])
+        prev_ch_amount = int(ch_row['prev_amount'])
         
         channel_breakdown.append(f"{channel}¥{ch_amount:,}({calculate_ratio(ch_amount, prev_ch_amount)})")
     
@@ -2301,13 +1850,7 @@ for idx, row in enumerate(category_data.iterrows(), 1):
     fenxiao_data = category_channel_data[category_channel_data['渠道'] == '分销']
     if not fenxiao_data.empty:
         fenxiao_amount = int(fenxiao_data.iloc[0][amount_col])
-        
-        # 查找前一天分销数据
-        prev_fenxiao_amount = 0
-        if prev_category_channel_data is not None:
-            prev_fenxiao_data = prev_category_channel_data[prev_category_channel_data['渠道'] == '分销']
-            if not prev_fenxiao_data.empty:
-                prev_fenxiao_amount = int(prev_fenxiao_data.iloc[0][amount_col])
+        prev_fenxiao_amount = int(fenxiao_data.iloc[0]['prev_amount'])
         
         # 如果分销金额大于0，添加特殊标识
         if fenxiao_amount > 0:
@@ -2354,36 +1897,32 @@ if df_prev is not None:
     }).reset_index()
 
 # 为Web版本生成完整店铺列表
+SHOP_RANKING_ENTRY = Template('├─ 🏪 TOP{idx} {shop}\n├─ 销售额: ¥{amount:,} ({ratio})\n├─ 销量: {qty:,}件 | 单价: ¥{price:,}\n\n', 'SHOP_RANKING_ENTRY')
+
 def generate_shop_ranking(shop_summary, prev_shop_summary, for_web=False):
-    shop_list = ""
-    limit = None if for_web else 10  # Web版本无限制，微信版本限制10个
-    
-    for idx, row in enumerate(shop_summary.iterrows(), 1):
-        if not for_web and idx > 10:  # 微信版本只显示前10个
-            break
-            
-        _, row_data = row
+    shop_list = HtmlWriter()
+    comparison = compare_periods(shop_summary, prev_shop_summary, '店铺', amount_col, qty_col)
+    if not for_web:  # 微信版本只显示前10个，Web版本无限制
+        comparison = comparison.head(10)
+
+    for idx, (_, row_data) in enumerate(comparison.iterrows(), 1):
         shop = row_data['店铺']
         amount = int(row_data[amount_col])
         qty = int(row_data[qty_col])
         price = int(amount / qty) if qty else 0
-        
+
         # 查找前一天该店铺数据
-        prev_amount = 0
-        if prev_shop_summary is not None:
-            prev_shop_data = prev_shop_summary[prev_shop_summary['店铺'] == shop]
-            if not prev_shop_data.empty:
-                prev_amount = int(prev_shop_data.iloc[0][amount_col])
-        
-        shop_list += f"├─ 🏪 TOP{idx} {shop}\n├─ 销售额: ¥{amount:,} ({calculate_ratio(amount, prev_amount)})\n├─ 销量: {qty:,}件 | 单价: ¥{price:,}\n\n"
-    
-    return shop_list
+        prev_amount = int(row_data['prev_amount'])
+
+        shop_list.render(SHOP_RANKING_ENTRY, idx=idx, shop=shop, amount=amount, ratio=calculate_ratio(amount, prev_amount), qty=qty, price=price)
+
+    return shop_list.getvalue()
 
 part2 = f"""📊 【渠道销售分析】
 """
 
 channel_summary = channel_summary.sort_values(amount_col, ascending=False)
-for idx, row in enumerate(channel_summary.iterrows(), 1):
+for idx, row in enumerate(compare_periods(channel_summary, prev_channel_summary, '渠道', amount_col, qty_col).iterrows(), 1):
     _, row_data = row
     channel = row_data['渠道']
     amount = int(row_data[amount_col])
@@ -2391,11 +1930,7 @@ for idx, row in enumerate(channel_summary.iterrows(), 1):
     price = int(amount / qty) if qty else 0
     
     # 查找前一天该渠道数据
-    prev_amount = 0
-    if prev_channel_summary is not None:
-        prev_channel_data = prev_channel_summary[prev_channel_summary['渠道'] == channel]
-        if not prev_channel_data.empty:
-            prev_amount = int(prev_channel_data.iloc[0][amount_col])
+    prev_amount = int(row_data['prev_amount'])
     
     part2 += f"🏪 {idx}. {channel}渠道: ¥{amount:,} ({calculate_ratio(amount, prev_amount)}) | {qty:,}件 | ¥{price:,}/件\n"
 
@@ -2439,7 +1974,10 @@ part2_wechat = part2 + generate_shop_ranking(shop_summary, prev_shop_summary, fo
 part2_web = part2 + generate_shop_ranking(shop_summary, prev_shop_summary, for_web=True)
 
 # ========== Part 3: 单品销售分析（按品类分类） ==========
-part3 = f"""💎 【单品销售分析】\n"""
+# 单品对比行（Part 3/4 共用），单品和店铺都可能上千行，逐行写入缓冲最后一次拼接
+PRODUCT_COMPARE_LINE = Template('🔸 {product}：本期¥{amount:,}（{qty}件），对比期¥{prev_amount:,}（{prev_qty}件）\n', 'PRODUCT_COMPARE_LINE')
+part3_buffer = HtmlWriter()
+part3_buffer.write("💎 【单品销售分析】\n")
 for idx, row in enumerate(category_data.iterrows(), 1):
     _, row_data = row
     category = row_data[CATEGORY_COL]
@@ -2468,32 +2006,25 @@ for idx, row in enumerate(category_data.iterrows(), 1):
                 amount_col: 'sum',
                 qty_col: 'sum'
             }).reset_index()
-    # 获取所有单品全集
-    current_products = set(product_summary[MODEL_COL])
-    prev_products = set()
-    if prev_product_summary is not None:
-        prev_products = set(prev_product_summary[MODEL_COL])
-    all_products = current_products | prev_products
+    # 本期、对比期单品全集（对比期独有的单品本期记为0）
+    product_compare = compare_periods(product_summary, prev_product_summary, MODEL_COL, amount_col, qty_col, how='outer')
     icon = category_icons.get(category, '📦')
-    part3 += f"\n{icon} 【{category}】单品对比\n"
-    for product in all_products:
-        # 本期数据
-        cur_row = product_summary[product_summary[MODEL_COL] == product]
-        cur_amount = int(cur_row[amount_col].values[0]) if not cur_row.empty else 0
-        cur_qty = int(cur_row[qty_col].values[0]) if not cur_row.empty else 0
-        # 对比期数据
-        prev_amount = 0
-        prev_qty = 0
-        if prev_product_summary is not None:
-            prev_row = prev_product_summary[prev_product_summary[MODEL_COL] == product]
-            prev_amount = int(prev_row[amount_col].values[0]) if not prev_row.empty else 0
-            prev_qty = int(prev_row[qty_col].values[0]) if not prev_row.empty else 0
+    part3_buffer.write(f"\n{icon} 【{category}】单品对比\n")
+    for _, p_row in product_compare.iterrows():
+        product = p_row[MODEL_COL]
+        cur_amount = int(p_row[amount_col])
+        cur_qty = int(p_row[qty_col])
+        prev_amount = int(p_row['prev_amount'])
+        prev_qty = int(p_row['prev_qty'])
         # 只要有一方大于1000就展示
         if cur_amount > 1000 or prev_amount > 1000:
-            part3 += f"🔸 {product}：本期¥{cur_amount:,}（{cur_qty}件），对比期¥{prev_amount:,}（{prev_qty}件）\n"
+            part3_buffer.render(PRODUCT_COMPARE_LINE, product=product, amount=cur_amount, qty=cur_qty, prev_amount=prev_amount, prev_qty=prev_qty)
+
+part3 = part3_buffer.getvalue()
 
 # ========== Part 4: 店铺核心产品销售分析 ==========
-part4 = f"""🎯 【店铺核心产品分析】\n"""
+part4_buffer = HtmlWriter()
+part4_buffer.write("🎯 【店铺核心产品分析】\n")
 for idx, row in enumerate(shop_summary.iterrows(), 1):
     _, row_data = row
     shop = row_data['店铺']
@@ -2520,28 +2051,20 @@ for idx, row in enumerate(shop_summary.iterrows(), 1):
                 amount_col: 'sum',
                 qty_col: 'sum'
             }).reset_index()
-    # 获取所有单品全集
-    current_products = set(product_summary[MODEL_COL])
-    prev_products = set()
-    if prev_product_summary is not None:
-        prev_products = set(prev_product_summary[MODEL_COL])
-    all_products = current_products | prev_products
-    part4 += f"\n🏪 【{shop}】单品对比\n"
-    for product in all_products:
-        # 本期数据
-        cur_row = product_summary[product_summary[MODEL_COL] == product]
-        cur_amount = int(cur_row[amount_col].values[0]) if not cur_row.empty else 0
-        cur_qty = int(cur_row[qty_col].values[0]) if not cur_row.empty else 0
-        # 对比期数据
-        prev_amount = 0
-        prev_qty = 0
-        if prev_product_summary is not None:
-            prev_row = prev_product_summary[prev_product_summary[MODEL_COL] == product]
-            prev_amount = int(prev_row[amount_col].values[0]) if not prev_row.empty else 0
-            prev_qty = int(prev_row[qty_col].values[0]) if not prev_row.empty else 0
+    # 本期、对比期单品全集（对比期独有的单品本期记为0）
+    product_compare = compare_periods(product_summary, prev_product_summary, MODEL_COL, amount_col, qty_col, how='outer')
+    part4_buffer.write(f"\n🏪 【{shop}】单品对比\n")
+    for _, p_row in product_compare.iterrows():
+        product = p_row[MODEL_COL]
+        cur_amount = int(p_row[amount_col])
+        cur_qty = int(p_row[qty_col])
+        prev_amount = int(p_row['prev_amount'])
+        prev_qty = int(p_row['prev_qty'])
         # 只要有一方大于1000就展示
         if cur_amount > 1000 or prev_amount > 1000:
-            part4 += f"🔸 {product}：本期¥{cur_amount:,}（{cur_qty}件），对比期¥{prev_amount:,}（{prev_qty}件）\n"
+            part4_buffer.render(PRODUCT_COMPARE_LINE, product=product, amount=cur_amount, qty=cur_qty, prev_amount=prev_amount, prev_qty=prev_qty)
+
+part4 = part4_buffer.getvalue()
 
 # ========== Part 5: 重点关注分析 ==========
 part5 = f"""⚠️ 【重点关注：同比增长与下滑分析】
@@ -2550,31 +2073,10 @@ part5 = f"""⚠️ 【重点关注：同比增长与下滑分析】
 🌟 渠道增长排行：
 """
 
-# 计算渠道增长率
-growth_channels = []
-decline_channels = []
-
-for _, row in channel_summary.iterrows():
-    channel = row['渠道']
-    current_amount = int(row[amount_col])
-    
-    # 查找前一天该渠道数据
-    prev_amount = 0
-    if prev_channel_summary is not None:
-        prev_data = prev_channel_summary[prev_channel_summary['渠道'] == channel]
-        if not prev_data.empty:
-            prev_amount = int(prev_data.iloc[0][amount_col])
-    
-    if prev_amount > 0:
-        growth_rate = ((current_amount - prev_amount) / prev_amount) * 100
-        if growth_rate > 0:
-            growth_channels.append((channel, growth_rate, prev_amount, current_amount))
-        elif growth_rate < -10:  # 下滑超过10%才显示
-            decline_channels.append((channel, growth_rate, prev_amount, current_amount))
-
-# 按增长率排序
-growth_channels.sort(key=lambda x: x[1], reverse=True)
-decline_channels.sort(key=lambda x: x[1])
+# 计算渠道增长率（增长按增长率从高到低，下滑超过10%的按从低到高）
+channel_compare = compare_periods(channel_summary, prev_channel_summary, '渠道', amount_col, qty_col)
+growth_channels = change_tuples(growth_view(channel_compare, above=0), '渠道', amount_col)
+decline_channels = change_tuples(decline_view(channel_compare, below=-10), '渠道', amount_col)
 
 # 显示增长渠道
 for channel, growth_rate, prev_amount, current_amount in growth_channels[:5]:
@@ -2594,31 +2096,10 @@ part5 += f"""
 🏆 店铺增长排行：
 """
 
-# 计算店铺增长率
-growth_shops = []
-decline_shops = []
-
-for _, row in shop_summary.iterrows():
-    shop = row['店铺']
-    current_amount = int(row[amount_col])
-    
-    # 查找前一天该店铺数据
-    prev_amount = 0
-    if prev_shop_summary is not None:
-        prev_data = prev_shop_summary[prev_shop_summary['店铺'] == shop]
-        if not prev_data.empty:
-            prev_amount = int(prev_data.iloc[0][amount_col])
-    
-    if prev_amount > 0:
-        growth_rate = ((current_amount - prev_amount) / prev_amount) * 100
-        if growth_rate > 50:  # 增长超过50%才显示
-            growth_shops.append((shop, growth_rate, prev_amount, current_amount))
-        elif growth_rate < -30:  # 下滑超过30%才显示
-            decline_shops.append((shop, growth_rate, prev_amount, current_amount))
-
-# 按增长率排序
-growth_shops.sort(key=lambda x: x[1], reverse=True)
-decline_shops.sort(key=lambda x: x[1])
+# 计算店铺增长率（增长超过50%、下滑超过30%才显示）
+shop_compare = compare_periods(shop_summary, prev_shop_summary, '店铺', amount_col, qty_col)
+growth_shops = change_tuples(growth_view(shop_compare, above=50), '店铺', amount_col)
+decline_shops = change_tuples(decline_view(shop_compare, below=-30), '店铺', amount_col)
 
 # 显示增长店铺
 for shop, growth_rate, prev_amount, current_amount in growth_shops[:5]:
@@ -2653,25 +2134,9 @@ part5 += f"""
 🔍 【品类变化趋势】
 """
 
-# 计算品类变化
-category_changes = []
-for _, row in category_data.iterrows():
-    category = row[CATEGORY_COL]
-    current_amount = int(row[amount_col])
-    
-    # 查找前一天该品类数据
-    prev_amount = 0
-    if prev_category_data is not None:
-        prev_data = prev_category_data[prev_category_data[CATEGORY_COL] == category]
-        if not prev_data.empty:
-            prev_amount = int(prev_data.iloc[0][amount_col])
-    
-    if prev_amount > 0:
-        growth_rate = ((current_amount - prev_amount) / prev_amount) * 100
-        category_changes.append((category, growth_rate, prev_amount, current_amount))
-
-# 按增长率排序
-category_changes.sort(key=lambda x: x[1], reverse=True)
+# 计算品类变化（对比期有数据的品类，按增长率从高到低）
+category_compare = compare_periods(category_data, prev_category_data, CATEGORY_COL, amount_col, qty_col)
+category_changes = change_tuples(growth_view(category_compare, above=-np.inf), CATEGORY_COL, amount_col)
 
 # 显示品类变化
 for category, growth_rate, prev_amount, current_amount in category_changes:
@@ -2760,22 +2225,22 @@ try:
         try:
             # 分步骤生成HTML，添加进度提示
             print("📊 步骤1: 生成品类趋势HTML...")
-            category_trend_html = generate_category_trend_html(category_data, prev_category_data, category_icons, shop_summary, prev_shop_summary, df_erp, df_prev, amount_col, qty_col, MODEL_COL)
+            category_trend_html = generate_category_trend_html(category_data, prev_category_data, category_icons, shop_summary, prev_shop_summary, df_erp, df_prev, amount_col, qty_col, MODEL_COL, cube=sales_cube, prev_cube=prev_sales_cube)
             
             print("📊 步骤2: 生成品类排行HTML...")
-            category_ranking_html = generate_category_ranking_html(category_data, df_erp, prev_category_data, amount_col, qty_col, CATEGORY_COL, MODEL_COL, category_icons, df_prev)
+            category_ranking_html = generate_category_ranking_html(category_data, df_erp, prev_category_data, amount_col, qty_col, CATEGORY_COL, MODEL_COL, category_icons, df_prev, cube=sales_cube, prev_cube=prev_sales_cube)
             
             print("📊 步骤3: 生成渠道分析HTML...")
-            channel_ranking_html = generate_channel_ranking_html(channel_summary, df_erp, prev_channel_summary, amount_col, qty_col, SHOP_COL)
+            channel_ranking_html = generate_channel_ranking_html(channel_summary, df_erp, prev_channel_summary, amount_col, qty_col, SHOP_COL, df_prev, prev_cube=prev_sales_cube)
             
             print("📊 步骤4: 生成店铺排行HTML...")
-            shop_ranking_html = generate_shop_ranking_html(shop_summary, df_erp, prev_shop_summary, amount_col, qty_col, MODEL_COL, df_prev)
+            shop_ranking_html = generate_shop_ranking_html(shop_summary, df_erp, prev_shop_summary, amount_col, qty_col, MODEL_COL, df_prev, cube=sales_cube, prev_cube=prev_sales_cube)
             
             print("📊 步骤5: 生成TOP单品HTML...")
-            top_product_html = generate_top_product_html(df_erp, amount_col, qty_col, MODEL_COL, CATEGORY_COL, category_icons, top_n=5)
+            top_product_html = generate_top_product_html(df_erp, amount_col, qty_col, MODEL_COL, CATEGORY_COL, category_icons, top_n=5, cube=sales_cube)
             
             print("📊 步骤6: 生成店铺单品HTML...")
-            shop_product_html = generate_shop_product_html(shop_summary, df_erp, amount_col, qty_col, MODEL_COL)
+            shop_product_html = generate_shop_product_html(shop_summary, df_erp, amount_col, qty_col, MODEL_COL, cube=sales_cube)
             
             signal.alarm(0)  # 取消超时
             
@@ -2952,18 +2417,14 @@ try:
     print("📱 正在生成微信推送内容...")
     wechat_content = f"""📊 {yesterday_str} 每日销售分析报告\n💰 【整体销售概况】\n├─ 总销售额: ¥{total_amount:,}\n├─ 单价: ¥{total_price:,}\n├─ 环比: {calculate_ratio(total_amount, prev_total_amount)}\n🔄 【分销数据】\n├─ 分销销售额: ¥{fenxiao_amount:,} ({calculate_ratio(fenxiao_amount, prev_fenxiao_amount)})\n\n📊 【渠道销售分析】\n"""
     channel_summary = channel_summary.sort_values(amount_col, ascending=False)
-    for idx, row in enumerate(channel_summary.iterrows(), 1):
+    for idx, row in enumerate(compare_periods(channel_summary, prev_channel_summary, '渠道', amount_col, qty_col).iterrows(), 1):
         _, row_data = row
         channel = row_data['渠道']
         amount = int(row_data[amount_col])
         qty = int(row_data[qty_col])
         price = int(amount / qty) if qty else 0
         # 修复：正确获取昨日该渠道数据
-        prev_amount = 0
-        if prev_channel_summary is not None:
-            prev_channel_data = prev_channel_summary[prev_channel_summary['渠道'] == channel]
-            if not prev_channel_data.empty:
-                prev_amount = int(prev_channel_data.iloc[0][amount_col])
+        prev_amount = int(row_data['prev_amount'])
         wechat_content += f"🏪 {idx}. {channel}渠道: ¥{amount:,} ({calculate_ratio(amount, prev_amount)}) | ¥{price:,}/件\n"
     wechat_content += "\n🔍 【品类变化趋势】\n"
     # 品类变化趋势排序：按本期销售额从高到低
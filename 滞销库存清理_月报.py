@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 import re
 import time
 import sys
+from brushing_rules import REMARK_RULES
+from report_parsing import to_number_series
 
 # 文件路径设置
 erp_folder = r"E:\电商数据\虹图\ERP订单明细"
@@ -64,28 +66,6 @@ def check_required_columns(df):
     print(f"✅ 所有必需列存在: {', '.join(required_cols)}")
     return True
 
-def to_number(val):
-    """将各种格式的数值转换为数字"""
-    if pd.isnull(val):
-        return 0
-    val = str(val).replace('，', '').replace(',', '').replace(' ', '').replace('\u3000', '')
-    # 处理可能的科学计数法或其他格式
-    try:
-        # 先尝试直接转换
-        return int(float(val))  # 直接返回整数，避免小数位
-    except ValueError:
-        try:
-            # 如果失败，尝试提取数字部分
-            import re
-            numbers = re.findall(r'[\d.]+', val)
-            if numbers:
-                # 如果找到多个数字，取第一个
-                return int(float(numbers[0]))  # 直接返回整数
-            else:
-                return 0
-        except:
-            return 0
-
 def is_online_shop(shop_name):
     if not isinstance(shop_name, str):
         return False
@@ -269,18 +249,8 @@ try:
     check_required_columns(df_erp)
 
     # 1. 固定使用客服备注列，剔除包含"抽纸"、"纸巾"或完全等于"不发货"的订单
-    remark_col = '客服备注'
-    if remark_col in df_erp.columns:
-        before_rows = len(df_erp)
-        df_erp[remark_col] = df_erp[remark_col].astype(str).fillna('')
-        filter_condition = ~(
-            df_erp[remark_col].str.contains('抽纸', na=False) |
-            df_erp[remark_col].str.contains('纸巾', na=False) |
-            (df_erp[remark_col] == '不发货')
-        )
-        df_erp = df_erp[filter_condition]
-        after_rows = len(df_erp)
-        print(f"刷单剔除：{before_rows} -> {after_rows}")
+    if '客服备注' in df_erp.columns:
+        df_erp, _ = REMARK_RULES.apply(df_erp)
     else:
         print(f"⚠️ 未找到客服备注列，跳过刷单剔除")
 
@@ -321,7 +291,7 @@ try:
     # 数据处理
     df_erp[qty_col] = pd.to_numeric(df_erp[qty_col], errors='coerce').fillna(0)
     # 添加金额列的处理
-    df_erp[AMOUNT_COL] = df_erp[AMOUNT_COL].apply(to_number)
+    df_erp[AMOUNT_COL] = to_number_series(df_erp[AMOUNT_COL])
     spec_col_clean = spec_col + '_CLEAN'
     df_erp[spec_col_clean] = df_erp[spec_col].astype(str).str.strip().str.upper()
     zhixiao_spec_col_clean = zhixiao_spec_col + '_CLEAN'